@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emirates Gifts - Order Ingestion Server
+Resident replacement for api/save-order.py: one process accepts orders
+concurrently (HTTP or an NDJSON stream on stdin) and queues them.
+
+A single writer task commits the queue in batches (group commit): each
+batch is one write and one fsync per sink, and an order waits at most
+--max-latency-ms before its batch is committed. A client gets its answer
+only after the batch holding its order is on disk.
+
+Sinks:
+    - data/orders.csv: same columns as save_order_to_csv(). This is the primary
+      sink: an order is saved (and acknowledged) once it is in this file.
+    - data/orders.jsonl: one order per line with savedAt (read by
+      scripts/convert_orders.py). A failed write here is reported on stderr
+      and in /health, but does not fail the batch.
+
+Usage:
+    python api/order-server.py
+    python api/order-server.py --port 8787 --max-latency-ms 20 --max-batch 1000
+    cat orders.ndjson | python api/order-server.py --stdin
+
+HTTP:
+    POST /api/save-order   body: the order, or {"order": {...}} like api/save-order.js
+    GET  /health
+"""
+
+import io
+import os
+import csv
+import sys
+import json
+import signal
+import asyncio
+import argparse
+import importlib.util
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent
+
+JSONL_FILE = 'data/orders.jsonl'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8787
+DEFAULT_MAX_LATENCY_MS = 5
+DEFAULT_MAX_BATCH = 500
+DEFAULT_QUEUE_SIZE = 10000
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADERS = 100
+ORDER_PATHS = ('/api/save-order', '/orders')
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+}
+STATUS_TEXT = {
+    200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 411: 'Length Required', 413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+
+def load_script(filename):
+    """
+    استيراد سكربت اسمه يحتوي على '-' (لا يمكن استيراده بـ import العادي)
+    """
+    name = Path(filename).stem.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, API_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+save_order = load_script('save-order.py')
+
+
+class CsvOrderSink:
+    """
+    data/orders.csv بنفس أعمدة save_order_to_csv، مع الـ header إذا كان الملف جديد
+    """
+
+    def __init__(self, path=save_order.CSV_FILE):
+        self.path = path
+        self.f = None
+        self.needs_header = False
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.f = open(self.path, 'a', newline='', encoding='utf-8')
+        self.needs_header = os.fstat(self.f.fileno()).st_size == 0
+
+    def write(self, orders, saved_at):
+        # نفس صيغة datetime.now().isoformat() في save_order_to_csv
+        saved_at = saved_at.astimezone().replace(tzinfo=None).isoformat()
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=save_order.CSV_FIELDS)
+        if self.needs_header:
+            writer.writeheader()
+        for order in orders:
+            writer.writerow(save_order.order_csv_row(order, saved_at))
+        self.f.write(buffer.getvalue())
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.needs_header = False
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+
+
+class JsonlOrderSink:
+    """
+    data/orders.jsonl: الطلب كما هو مع savedAt، سطر لكل طلب
+    """
+
+    def __init__(self, path=JSONL_FILE):
+        self.path = path
+        self.f = None
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.f = open(self.path, 'a', encoding='utf-8')
+
+    def write(self, orders, saved_at):
+        saved_at = saved_at.strftime('%Y-%m-%dT%H:%M:%SZ')
+        self.f.write(''.join(
+            json.dumps({**order, 'savedAt': saved_at}, ensure_ascii=False, separators=(',', ':')) + '\n'
+            for order in orders
+        ))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+
+
+class GroupCommitWriter:
+    """
+    طابور الطلبات ومهمة الكتابة الوحيدة.
+
+    تجمع المهمة ما وصل من طلبات في دفعة حتى max_batch طلب، أو حتى تمر
+    max_latency ثانية على وصول أول طلب فيها، ثم تكتبها في كل sink مرة
+    واحدة مع fsync واحد. وقت الحفظ واحد لكل الدفعة.
+
+    أول sink هو الأساسي: فشل الكتابة فيه فقط يُفشل الدفعة، لأن الطلب الموجود
+    فيه محفوظ، وإعادة إرساله بعد خطأ ستكرره.
+    """
+
+    def __init__(self, sinks, max_latency=DEFAULT_MAX_LATENCY_MS / 1000,
+                 max_batch=DEFAULT_MAX_BATCH, queue_size=DEFAULT_QUEUE_SIZE):
+        self.sinks = sinks
+        self.max_latency = max_latency
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue(queue_size)
+        self.stats = {'orders': 0, 'batches': 0, 'failed': 0, 'sink_errors': 0}
+        self.error = None
+
+    async def enqueue(self, order):
+        """
+        إضافة طلب للطابور (تنتظر إذا كان ممتلئًا)، وتعيد future بوقت حفظه
+        """
+        if self.error is not None:
+            raise self.error
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        await self.queue.put((order, future, loop.time()))
+        return future
+
+    async def submit(self, order):
+        """
+        حفظ طلب واحد: تعود بعد كتابة الدفعة التي تحتويه على القرص
+        """
+        return await (await self.enqueue(order))
+
+    def open(self):
+        """
+        فتح كل الـ sinks قبل قبول أي طلب، حتى يظهر خطأ مثل مسار غير صالح عند البدء
+        """
+        opened = []
+        try:
+            for sink in self.sinks:
+                sink.open()
+                opened.append(sink)
+        except Exception:
+            for sink in opened:
+                sink.close()
+            raise
+
+    def fail_pending(self, error):
+        """
+        مهمة الكتابة توقفت: رفض الطلبات الجديدة وإنهاء كل ما في الطابور بالخطأ
+        """
+        self.error = error
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not None and not item[1].done():
+                item[1].set_exception(error)
+
+    async def close(self):
+        """
+        لا طلبات جديدة بعد الآن: تنتهي run() بعد كتابة ما في الطابور
+        """
+        await self.queue.put(None)
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        item = await self.queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = item[2] + self.max_latency
+        while len(batch) < self.max_batch:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, orders, saved_at):
+        """
+        الكتابة في الـ sink الأساسي (أي خطأ فيه يُرفع)، ثم في الباقي؛ تعيد أخطاء الباقي
+        """
+        primary, *others = self.sinks
+        primary.write(orders, saved_at)
+        errors = []
+        for sink in others:
+            try:
+                sink.write(orders, saved_at)
+            except Exception as e:
+                errors.append((sink, e))
+        return errors
+
+    async def _commit(self, batch):
+        orders = [order for order, _, _ in batch]
+        saved_at = datetime.now(timezone.utc)
+        try:
+            errors = await asyncio.to_thread(self._write, orders, saved_at)
+        except Exception as e:
+            self.stats['failed'] += len(batch)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            print(f'❌ Failed to save {len(batch)} orders: {e}', file=sys.stderr)
+            return
+        for sink, e in errors:
+            self.stats['sink_errors'] += 1
+            print(f'⚠️ {len(batch)} orders saved to {self.sinks[0].path} but not to {sink.path}: {e}', file=sys.stderr)
+        self.stats['orders'] += len(batch)
+        self.stats['batches'] += 1
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_result(saved_at)
+
+    async def run(self):
+        """
+        مهمة الكتابة؛ تُستدعى بعد open() وتغلق الـ sinks عند انتهائها
+        """
+        try:
+            done = False
+            while not done:
+                batch, done = await self._next_batch()
+                if batch:
+                    await self._commit(batch)
+        finally:
+            for sink in self.sinks:
+                try:
+                    sink.close()
+                except OSError as e:
+                    # بيانات لم تُكتب بعد خطأ سابق في نفس الـ sink (تم الإبلاغ عنه)
+                    print(f'⚠️ Closing {sink.path}: {e}', file=sys.stderr)
+
+
+# --- HTTP ---
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader):
+    """
+    قراءة طلب HTTP/1.1 واحد: (method, path, headers, body)، أو None إذا أُغلق الاتصال
+    """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HttpError(400, 'Malformed request line')
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HttpError(400, 'Too many headers')
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    headers[':version'] = version
+
+    if 'transfer-encoding' in headers:
+        raise HttpError(411, 'Content-Length required')
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HttpError(400, 'Invalid Content-Length')
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, 'Order too large')
+    body = await reader.readexactly(length) if length else b''
+    return method, target.split('?', 1)[0], headers, body
+
+
+def parse_order(body):
+    """
+    الطلب من جسم الرسالة: الطلب نفسه أو {"order": {...}} كما في api/save-order.js
+    """
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        raise HttpError(400, 'Invalid JSON')
+    if isinstance(data, dict) and isinstance(data.get('order'), dict):
+        data = data['order']
+    if not isinstance(data, dict) or not data:
+        raise HttpError(400, 'No order data')
+    return data
+
+
+async def route(method, path, body, ingest):
+    if path == '/health' and method == 'GET':
+        status = 'ok' if ingest.error is None else 'failed'
+        return 200, {'status': status, 'queued': ingest.queue.qsize(), **ingest.stats}
+    if path not in ORDER_PATHS:
+        return 404, {'error': 'Not found'}
+    if method == 'OPTIONS':
+        return 200, None
+    if method != 'POST':
+        return 405, {'error': 'Method not allowed'}
+
+    order = parse_order(body)
+    try:
+        saved_at = await ingest.submit(order)
+    except Exception as e:
+        return 500, {'success': False, 'error': str(e)}
+    return 201, {'success': True, 'orderId': order.get('orderId'), 'savedAt': saved_at.isoformat()}
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    headers = {
+        **CORS_HEADERS,
+        'Content-Length': str(len(body)),
+        'Connection': 'keep-alive' if keep_alive else 'close',
+    }
+    if payload is not None:
+        headers['Content-Type'] = 'application/json; charset=utf-8'
+    head = f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n'
+    head += ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+    writer.write(head.encode('latin-1') + b'\r\n' + body)
+
+
+async def handle_connection(reader, writer, ingest):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except HttpError as e:
+                write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+                await writer.drain()
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            try:
+                status, payload = await route(method, path, body, ingest)
+            except HttpError as e:
+                status, payload = e.status, {'error': str(e)}
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection == 'keep-alive' or (headers[':version'] == 'HTTP/1.1' and connection != 'close')
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_http(ingest, host, port, stop):
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(reader, writer, ingest), host, port)
+    print(f'🛒 Order server listening on http://{host}:{port}{ORDER_PATHS[0]}')
+    async with server:
+        await stop.wait()
+
+
+# --- stdin ---
+
+def _ack(line_no, future):
+    try:
+        return {'line': line_no, 'success': True, 'savedAt': future.result().isoformat()}
+    except Exception as e:
+        return {'line': line_no, 'success': False, 'error': str(e)}
+
+
+async def serve_stdin(ingest, stop):
+    """
+    قراءة الطلبات من stdin بصيغة NDJSON (طلب في كل سطر)، وطباعة نتيجة كل
+    طلب بالترتيب بعد حفظه
+    """
+    pending = deque()
+    line_no = 0
+
+    def flush_acks():
+        while pending and pending[0][1].done():
+            print(json.dumps(_ack(*pending.popleft()), ensure_ascii=False), flush=True)
+
+    while not stop.is_set():
+        line = await asyncio.to_thread(sys.stdin.buffer.readline)
+        if not line:
+            break
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            order = parse_order(line)
+        except HttpError as e:
+            future = asyncio.get_running_loop().create_future()
+            future.set_exception(e)
+        else:
+            future = await ingest.enqueue(order)
+        pending.append((line_no, future))
+        flush_acks()
+
+    if pending:
+        await asyncio.wait([future for _, future in pending])
+    flush_acks()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Resident order ingestion server with group commit.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--stdin', action='store_true',
+                        help='read NDJSON orders from stdin instead of serving HTTP')
+    parser.add_argument('--max-latency-ms', type=float, default=DEFAULT_MAX_LATENCY_MS,
+                        help=f'longest an order waits for its batch to be committed (default: {DEFAULT_MAX_LATENCY_MS})')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help=f'most orders per write/fsync (default: {DEFAULT_MAX_BATCH})')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f'queued orders before new ones wait (default: {DEFAULT_QUEUE_SIZE})')
+    parser.add_argument('--csv', default=save_order.CSV_FILE,
+                        help=f'CSV sink, same columns as save-order.py (default: {save_order.CSV_FILE})')
+    parser.add_argument('--jsonl', default=JSONL_FILE,
+                        help=f'JSONL sink (default: {JSONL_FILE})')
+    parser.add_argument('--no-jsonl', action='store_true', help='only write the CSV sink')
+    args = parser.parse_args(argv)
+    if args.max_batch < 1:
+        parser.error('--max-batch must be at least 1')
+    return args
+
+
+async def serve(args):
+    sinks = [CsvOrderSink(args.csv)]
+    if not args.no_jsonl:
+        sinks.append(JsonlOrderSink(args.jsonl))
+    ingest = GroupCommitWriter(sinks, args.max_latency_ms / 1000, args.max_batch, args.queue_size)
+    try:
+        ingest.open()
+    except OSError as e:
+        print(f'❌ Cannot open order sinks: {e}', file=sys.stderr)
+        return 1
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    def writer_done(task):
+        # بدون مهمة الكتابة لن يُحفظ أي طلب: لا نترك العملاء ينتظرون
+        if not task.cancelled() and task.exception() is not None:
+            print(f'❌ Order writer stopped: {task.exception()!r}', file=sys.stderr)
+            ingest.fail_pending(task.exception())
+            stop.set()
+
+    writer_task = asyncio.create_task(ingest.run())
+    writer_task.add_done_callback(writer_done)
+    try:
+        if args.stdin:
+            await serve_stdin(ingest, stop)
+        else:
+            await serve_http(ingest, args.host, args.port, stop)
+    finally:
+        if not writer_task.done():
+            await ingest.close()
+        await asyncio.wait([writer_task])
+
+    stats = ingest.stats
+    print(f'✅ {stats["orders"]} orders saved in {stats["batches"]} batches'
+          + (f', ❌ {stats["failed"]} failed' if stats['failed'] else '')
+          + (f', ⚠️ {stats["sink_errors"]} secondary sink errors' if stats['sink_errors'] else ''),
+          file=sys.stderr)
+    return 1 if stats['failed'] or ingest.error is not None else 0
+
+
+def main(argv=None):
+    return asyncio.run(serve(parse_args(argv)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,11 +11,38 @@ import os
 from datetime import datetime
 import sys
 
+CSV_FILE = 'data/orders.csv'
+CSV_FIELDS = [
+    'رقم الطلب',
+    'الاسم',
+    'الهاتف',
+    'المدينة',
+    'المنتجات',
+    'الإجمالي',
+    'التاريخ',
+    'وقت الحفظ'
+]
+
+def order_csv_row(order_data, saved_at=None):
+    """
+    صف الطلب في ملف CSV (نفس الأعمدة لهذا السكربت ولخدمة api/order-server.py)
+    """
+    return {
+        'رقم الطلب': order_data.get('orderId', ''),
+        'الاسم': order_data.get('fullName', ''),
+        'الهاتف': order_data.get('phone', ''),
+        'المدينة': order_data.get('city', ''),
+        'المنتجات': order_data.get('items', ''),
+        'الإجمالي': order_data.get('total', ''),
+        'التاريخ': order_data.get('date', ''),
+        'وقت الحفظ': saved_at or datetime.now().isoformat()
+    }
+
 def save_order_to_csv(order_data):
     """
     حفظ الطلب في ملف CSV
     """
-    csv_file = 'data/orders.csv'
+    csv_file = CSV_FILE
     
     # تأكد من وجود مجلد data
     os.makedirs('data', exist_ok=True)
@@ -24,32 +51,14 @@ def save_order_to_csv(order_data):
     file_exists = os.path.isfile(csv_file)
     
     with open(csv_file, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            'رقم الطلب',
-            'الاسم',
-            'الهاتف',
-            'المدينة',
-            'المنتجات',
-            'الإجمالي',
-            'التاريخ',
-            'وقت الحفظ'
-        ])
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
         
         # اكتب الـ header إذا كان الملف جديد
         if not file_exists:
             writer.writeheader()
         
         # اكتب البيانات
-        writer.writerow({
-            'رقم الطلب': order_data.get('orderId', ''),
-            'الاسم': order_data.get('fullName', ''),
-            'الهاتف': order_data.get('phone', ''),
-            'المدينة': order_data.get('city', ''),
-            'المنتجات': order_data.get('items', ''),
-            'الإجمالي': order_data.get('total', ''),
-            'التاريخ': order_data.get('date', ''),
-            'وقت الحفظ': datetime.now().isoformat()
-        })
+        writer.writerow(order_csv_row(order_data))
     
     print(f'✅ Order {order_data.get("orderId")} saved to CSV')
     return True
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+واجهة سطر أوامر واحدة لسكربتات Emirates Gifts.
+
+كل أمر فرعي يشغّل السكربت المقابل كما لو شُغّل مباشرة، وباقي الوسائط تُمرر له
+كما هي. المكتبات الثقيلة (pandas و openpyxl و bs4 و slugify) لا تُستورد عند
+بدء أي أمر، بل داخل الدوال التي تحتاجها فقط.
+
+الأمر startup-report يقيس زمن بدء كل أمر بـ python -X importtime، ويعرض أبطأ
+الاستيرادات، ويفشل (رمز خروج 1) إذا استورد أمر مكتبة ثقيلة عند البدء أو
+تجاوز --budget-ms، حتى تظهر تراجعات زمن البدء.
+
+Usage:
+    python emirates-gifts.py pages --jobs 4
+    python emirates-gifts.py merchant-feed --formats tsv --langs en
+    python emirates-gifts.py seo --help
+    python emirates-gifts.py startup-report
+    python emirates-gifts.py startup-report pages merchant-feed --budget-ms 150
+"""
+
+import sys
+import runpy
+import argparse
+import subprocess
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent
+
+# الأمر -> (السكربت، الوصف)
+COMMANDS = {
+    "pages": ("generate_from_excel.py", "توليد صفحات المنتجات من ملف Excel/CSV"),
+    "seo": ("seo_emirates_gifts_products.py", "تحسين SEO لصفحات المنتجات"),
+    "pipeline": ("seo_pipeline.py", "خط SEO الموحّد (قراءة وكتابة واحدة لكل صفحة)"),
+    "fix-schema": ("fix-product-schema.py", "إصلاح سكيما Product و BreadcrumbList"),
+    "enhance-schema": ("enhance-jsonld-schema.py", "إضافة aggregateRating والمراجعات"),
+    "unify-reviews": ("unify_reviews.py", "تنظيف المراجعات وتجميعها حسب الفئة"),
+    "merchant-feed": ("generate_merchant_feed.py", "توليد ملفات Google Merchant"),
+    "sitemap": ("generate_sitemap.py", "توليد خرائط الموقع"),
+    "convert-orders": ("scripts/convert_orders.py", "تحويل الطلبات إلى Excel"),
+    "order-server": ("api/order-server.py", "خدمة استقبال الطلبات (HTTP أو stdin) مع كتابة مجمّعة"),
+}
+
+# مكتبات يجب ألا تُستورد عند بدء أي أمر
+LAZY_IMPORTS = ("pandas", "openpyxl", "bs4", "slugify")
+IMPORTTIME_PREFIX = "import time:"
+
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: emirates-gifts <command> [args...]", "", "commands:"]
+    for name, (script, description) in COMMANDS.items():
+        lines.append(f"  {name:<{width}}  {description} ({script})")
+    lines.append(f"  {'startup-report':<{width}}  قياس زمن بدء الأوامر بـ -X importtime")
+    return "\n".join(lines)
+
+
+def run_command(name, argv):
+    """تشغيل سكربت الأمر كـ __main__ مع sys.argv الخاص به."""
+    script = ROOT_DIR / COMMANDS[name][0]
+    saved_argv = sys.argv
+    sys.argv = [str(script), *argv]
+    try:
+        runpy.run_path(str(script), run_name="__main__")
+    finally:
+        sys.argv = saved_argv
+    return 0
+
+
+# --- تقرير زمن البدء ---
+
+def parse_importtime(stderr):
+    """تحويل مخرجات -X importtime إلى [(الاسم، العمق، self بالميكروثانية، cumulative)]."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        self_us, cumulative_us, name = line[len(IMPORTTIME_PREFIX):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # سطر العناوين
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def _importtime(code):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+    )
+    return result.returncode, parse_importtime(result.stderr)
+
+
+def measure_startup(name, baseline):
+    """زمن استيراد سكربت الأمر (بدون تشغيل main) في مفسر جديد.
+
+    تُستبعد الوحدات التي يستوردها المفسر ومشغّل القياس نفسه (baseline).
+    """
+    script = ROOT_DIR / COMMANDS[name][0]
+    code = (f"import sys, runpy; sys.path.insert(0, {str(ROOT_DIR)!r}); "
+            f"runpy.run_path({str(script)!r}, run_name='startup_report')")
+    returncode, entries = _importtime(code)
+    top = [(module, cumulative) for module, depth, _, cumulative in entries
+           if depth == 0 and module not in baseline]
+    lazy = sorted({module.split(".")[0] for module, *_ in entries
+                   if module.split(".")[0] in LAZY_IMPORTS})
+    return {
+        "command": name,
+        "ok": returncode == 0,
+        "total_ms": sum(cumulative for _, cumulative in top) / 1000,
+        "top": sorted(top, key=lambda item: item[1], reverse=True),
+        "lazy": lazy,
+    }
+
+
+def parse_report_args(argv):
+    parser = argparse.ArgumentParser(prog="emirates-gifts startup-report",
+                                     description="قياس زمن بدء الأوامر بـ python -X importtime.")
+    parser.add_argument("commands", nargs="*", default=list(COMMANDS),
+                        help="الأوامر المطلوب قياسها (الافتراضي: كلها)")
+    parser.add_argument("--top", type=int, default=5, help="عدد أبطأ الاستيرادات المعروضة لكل أمر")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="الفشل إذا تجاوز زمن استيراد أي أمر هذا الحد")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.commands if name not in COMMANDS]
+    if unknown:
+        parser.error(f"أوامر غير معروفة: {', '.join(unknown)} (المتاح: {', '.join(COMMANDS)})")
+    return args
+
+
+def startup_report(argv):
+    args = parse_report_args(argv)
+    _, baseline_entries = _importtime("import sys, runpy, pkgutil")
+    baseline = {module for module, depth, *_ in baseline_entries if depth == 0}
+
+    failed = False
+    for name in args.commands:
+        report = measure_startup(name, baseline)
+        problems = []
+        if not report["ok"]:
+            problems.append("فشل الاستيراد")
+        if report["lazy"]:
+            problems.append(f"مكتبات ثقيلة عند البدء: {', '.join(report['lazy'])}")
+        if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+            problems.append(f"تجاوز الحد {args.budget_ms:g} ms")
+        failed = failed or bool(problems)
+
+        mark = "❌" if problems else "✅"
+        print(f"{mark} {name:<16} {report['total_ms']:8.1f} ms")
+        for module, cumulative in report["top"][:args.top]:
+            print(f"      {cumulative / 1000:8.1f} ms  {module}")
+        for problem in problems:
+            print(f"   ⚠️ {problem}")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    name, rest = argv[0], argv[1:]
+    if name == "startup-report":
+        return startup_report(rest)
+    if name not in COMMANDS:
+        print(f"emirates-gifts: أمر غير معروف: {name}\n\n{usage()}", file=sys.stderr)
+        return 2
+    return run_command(name, rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
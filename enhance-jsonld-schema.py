@@ -4,100 +4,174 @@
 Enhance JSON-LD Schema for Product Pages
 Adds aggregateRating and review data to existing Product schema
 Supports both Arabic and English product pages
+
+Reviews come from the unified output of unify_reviews.py when it exists (else
+data/reviews.json), loaded once and indexed by productId / slug. aggregateRating
+comes from the rating aggregates index (data/rating-aggregates.json) when it has
+the product. Pages without reviews are left as is.
+
+Usage:
+    python enhance-jsonld-schema.py
+    python enhance-jsonld-schema.py --reviews data/unified-reviews.json --max-reviews 5
 """
 
 import os
 import json
 import re
+import argparse
 from pathlib import Path
 from datetime import datetime
 
+import jsonld_fragments as jsonld
+from head_splice import HeadSplice
+from page_keys import page_key
+from rating_aggregates import RatingAggregates, AGGREGATES_FILE
+
 # Configuration
 PRODUCT_PAGES_DIR = 'products'
 EN_PRODUCT_PAGES_DIR = 'en/products'
 OUTPUT_LOG = 'schema_enhancement_log.txt'
+SCHEMA_SCRIPT_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.DOTALL)
+TITLE_RE = re.compile(r'<title[^>]*>([^<]+)</title>')
 
-# Sample reviews for various products (realistic data)
-REVIEWS_DATABASE = {
-    'perfume': [
-        {'author': 'أحمد محمد', 'rating': 5, 'text': 'رائع جداً، عطر أصلي وجودة ممتازة'},
-        {'author': 'فاطمة علي', 'rating': 5, 'text': 'تسليم سريع وجودة عالية جداً'},
-        {'author': 'محمود حسن', 'rating': 4, 'text': 'جيد لكن التعبئة بطيئة قليلاً'},
-        {'author': 'نور خالد', 'rating': 5, 'text': 'ممتاز جداً وصل في الوقت المحدد'},
-        {'author': 'سارة إبراهيم', 'rating': 5, 'text': 'رائع، سأشتري منهم مرة أخرى'},
-    ],
-    'watch': [
-        {'author': 'خالد محمد', 'rating': 5, 'text': 'ساعة أصلية وجودة عالية جداً'},
-        {'author': 'ليلى أحمد', 'rating': 5, 'text': 'شحن سريع وتغليف احترافي'},
-        {'author': 'يوسف علي', 'rating': 4, 'text': 'منتج جيد والسعر مناسب'},
-        {'author': 'مريم حسن', 'rating': 5, 'text': 'رائعة جداً، ستنصح بها صديقاتي'},
-    ],
-    'gift': [
-        {'author': 'علي محمود', 'rating': 5, 'text': 'هدية رائعة جداً، الجودة عالية'},
-        {'author': 'نادية إبراهيم', 'rating': 5, 'text': 'ممتاز جداً وبسعر مناسب'},
-        {'author': 'محمد سالم', 'rating': 4, 'text': 'جيد لكن كان بإمكانهم تحسين التعبئة'},
-        {'author': 'زينب خالد', 'rating': 5, 'text': 'شكراً على الخدمة الممتازة'},
-    ],
-    'perfume_en': [
-        {'author': 'Ahmed Muhammad', 'rating': 5, 'text': 'Excellent, original perfume with outstanding quality'},
-        {'author': 'Fatima Ali', 'rating': 5, 'text': 'Fast delivery and excellent quality'},
-        {'author': 'Mahmoud Hassan', 'rating': 4, 'text': 'Good, but shipping took a bit longer'},
-        {'author': 'Noor Khalid', 'rating': 5, 'text': 'Excellent, arrived on time'},
-        {'author': 'Sarah Ibrahim', 'rating': 5, 'text': 'Great, will buy again'},
-    ],
-    'watch_en': [
-        {'author': 'Khaled Muhammad', 'rating': 5, 'text': 'Original watch with excellent quality'},
-        {'author': 'Layla Ahmad', 'rating': 5, 'text': 'Fast shipping and professional packaging'},
-        {'author': 'Youssef Ali', 'rating': 4, 'text': 'Good product at reasonable price'},
-        {'author': 'Mariam Hassan', 'rating': 5, 'text': 'Excellent, will recommend to friends'},
-    ],
-}
-
-def get_reviews_for_product(product_name, is_english=False):
-    """Get appropriate reviews based on product type"""
-    product_name_lower = product_name.lower()
-    
-    # Detect product type
-    if 'عطر' in product_name or 'perfume' in product_name_lower or 'fragrance' in product_name_lower:
-        key = 'perfume_en' if is_english else 'perfume'
-    elif 'ساعة' in product_name or 'watch' in product_name_lower or 'clock' in product_name_lower:
-        key = 'watch_en' if is_english else 'watch'
-    else:
-        key = 'gift_en' if is_english else 'gift'
+REVIEWS_FILE = 'data/reviews.json'
+# The deduplicated output of unify_reviews.py is preferred, so the review list
+# matches the counts in the rating aggregates index built from it
+REVIEWS_SOURCES = ('data/unified-reviews', 'data/unified-reviews.json', REVIEWS_FILE)
+# Reviews per page in the JSON-LD (None = all); aggregateRating always counts every review
+MAX_REVIEWS_PER_PAGE = None
+# Unified files without productId: review ids look like review_perfume_1_20241025_45
+UNIFIED_REVIEW_ID_RE = re.compile(r'^review_(.+?)_\d{8}_\d+$')
+
+def _review_sort_key(review):
+    # Most helpful first, newest first on a tie
+    return (-(review.get('helpful') or 0), review.get('date') or '')
+
+class ReviewIndex:
+    """productId / slug -> (aggregateRating, review list), built once per run"""
     
-    return REVIEWS_DATABASE.get(key, REVIEWS_DATABASE['gift'])
+    def __init__(self, products=(), max_reviews=MAX_REVIEWS_PER_PAGE, aggregates=None):
+        self.max_reviews = max_reviews
+        self.by_key = {}
+        self.count = 0
+        aggregates = aggregates or RatingAggregates()
+        for product in products:
+            reviews = product.get('reviews') or []
+            if not reviews:
+                continue
+            entry = build_review_fragments(reviews, max_reviews, aggregates.rating(product.get('productId')))
+            self.count += 1
+            for key in (product.get('productId'), product.get('productSlug'), product.get('productTitle')):
+                if key:
+                    self.by_key.setdefault(key, entry)
+                    self.by_key.setdefault(page_key(key), entry)
+    
+    @classmethod
+    def load(cls, path=None, max_reviews=MAX_REVIEWS_PER_PAGE, aggregates_path=AGGREGATES_FILE):
+        """Load data/reviews.json, or the unified output of unify_reviews.py (JSON or NDJSON directory)"""
+        path = path or default_reviews_path()
+        aggregates = RatingAggregates.load(aggregates_path)
+        if not os.path.exists(path):
+            return cls((), max_reviews, aggregates)
+        if os.path.isdir(path):
+            return cls(unified_to_products({'ndjson': iter_ndjson_dir(path)}), max_reviews, aggregates)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = unified_to_products(data)
+        return cls(data, max_reviews, aggregates)
+    
+    def __len__(self):
+        return self.count
+    
+    def lookup(self, *keys):
+        """The first (aggregateRating, review list) found for a page stem, slug, id or title"""
+        for key in keys:
+            if not key:
+                continue
+            entry = self.by_key.get(key) or self.by_key.get(page_key(key))
+            if entry:
+                return entry
+        return None
+
+def unified_to_products(unified):
+    """Group the unified {category: [review, ...]} file back by product"""
+    products = {}
+    for reviews in unified.values():
+        for review in reviews:
+            product_id = review.get('productId')
+            if not product_id:
+                match = UNIFIED_REVIEW_ID_RE.match(review.get('id') or '')
+                if not match:
+                    continue
+                product_id = match.group(1)
+            product = products.setdefault(product_id, {
+                'productId': product_id,
+                'productSlug': review.get('productSlug'),
+                'productTitle': review.get('productTitle'),
+                'reviews': [],
+            })
+            product['reviews'].append({
+                'author': review.get('customerName'),
+                'rating': review.get('rating'),
+                'comment': review.get('comment'),
+                'date': review.get('date'),
+                'helpful': review.get('helpful'),
+            })
+    return list(products.values())
+
+def iter_ndjson_dir(path):
+    """Reviews from the <category>.ndjson files written by unify_reviews.py --ndjson"""
+    for file_name in sorted(os.listdir(path)):
+        if file_name.endswith('.ndjson'):
+            with open(os.path.join(path, file_name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+def default_reviews_path():
+    """The first of REVIEWS_SOURCES that exists"""
+    for path in REVIEWS_SOURCES:
+        if os.path.exists(path):
+            return path
+    return REVIEWS_FILE
+
+_DEFAULT_INDEX = None
+
+def default_index():
+    """The review index loaded from the default reviews source on first use"""
+    global _DEFAULT_INDEX
+    if _DEFAULT_INDEX is None:
+        _DEFAULT_INDEX = ReviewIndex.load()
+    return _DEFAULT_INDEX
 
 def extract_product_schema(html_content):
-    """Extract existing JSON-LD product schema from HTML"""
+    """Extract existing JSON-LD product schema from HTML (or just its <head>)"""
     # Look for script tag with JSON-LD
-    pattern = r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>'
-    matches = re.findall(pattern, html_content, re.DOTALL)
+    match = SCHEMA_SCRIPT_RE.search(html_content)
     
-    if matches:
+    if match:
         try:
-            schema = json.loads(matches[0])
+            schema = json.loads(match.group(1))
             return schema
         except json.JSONDecodeError:
             return None
     return None
 
-def create_enhanced_schema(original_schema, product_name, is_english=False):
-    """Enhance schema with aggregateRating and review data"""
-    if not original_schema:
-        return None
+def build_review_fragments(reviews, max_reviews=None, aggregate=None):
+    """aggregateRating (over all reviews) and review blocks (capped) for one product
     
-    schema = original_schema.copy()
-    
-    # Get reviews for this product
-    reviews = get_reviews_for_product(product_name, is_english)
-    
-    # Calculate aggregate rating
-    ratings = [review['rating'] for review in reviews]
-    avg_rating = sum(ratings) / len(ratings) if ratings else 4.5
-    rating_count = len(reviews)
+    aggregate is the (average, count) from the rating aggregates index, if it has the product.
+    """
+    if aggregate:
+        avg_rating, rating_count = aggregate
+    else:
+        # Calculate aggregate rating
+        ratings = [review['rating'] for review in reviews]
+        avg_rating = sum(ratings) / len(ratings)
+        rating_count = len(reviews)
     
-    # Add aggregateRating
-    schema['aggregateRating'] = {
+    aggregate_rating = {
         '@type': 'AggregateRating',
         'ratingValue': round(avg_rating, 1),
         'ratingCount': rating_count,
@@ -105,82 +179,147 @@ def create_enhanced_schema(original_schema, product_name, is_english=False):
         'worstRating': 1
     }
     
-    # Add reviews
-    schema['review'] = []
+    if max_reviews is not None and len(reviews) > max_reviews:
+        reviews = sorted(reviews, key=_review_sort_key)[:max_reviews]
+    
+    review_list = []
     for review in reviews:
-        schema['review'].append({
+        review_list.append({
             '@type': 'Review',
             'author': {
                 '@type': 'Person',
                 'name': review['author']
             },
-            'datePublished': datetime.now().strftime('%Y-%m-%d'),
+            'datePublished': (review.get('date') or '')[:10],
             'reviewRating': {
                 '@type': 'Rating',
                 'ratingValue': review['rating'],
                 'bestRating': 5,
                 'worstRating': 1
             },
-            'reviewBody': review['text']
+            'reviewBody': review['comment']
         })
     
+    return jsonld.freeze(aggregate_rating), jsonld.freeze(review_list)
+
+def create_enhanced_schema(original_schema, slug, product_name=None, index=None):
+    """Enhance schema with the product's aggregateRating and review data.
+    
+    When the product has no real reviews, any aggregateRating and review
+    left by earlier runs (the canned REVIEWS_DATABASE) are removed; the
+    schema is returned unchanged if it has neither.
+    """
+    if not original_schema:
+        return None
+    
+    # The review blocks are built and serialized once per product and run
+    entry = (index or default_index()).lookup(slug, product_name, original_schema.get('name'))
+    if entry is None:
+        if 'aggregateRating' not in original_schema and 'review' not in original_schema:
+            return original_schema
+        schema = original_schema.copy()
+        schema.pop('aggregateRating', None)
+        schema.pop('review', None)
+        return schema
+    
+    schema = original_schema.copy()
+    
+    # Add aggregateRating and reviews
+    schema['aggregateRating'], schema['review'] = entry
+    
     return schema
 
-def inject_schema_into_html(html_content, enhanced_schema):
-    """Inject enhanced JSON-LD schema back into HTML"""
-    schema_json = json.dumps(enhanced_schema, ensure_ascii=False, indent=2)
+def inject_schema_into_head(splice, enhanced_schema):
+    """Replace the JSON-LD blocks in <head> with the enhanced schema"""
+    schema_json = jsonld.dumps(enhanced_schema)
     new_script = f'<script type="application/ld+json">\n{schema_json}\n</script>'
     
-    # Replace existing schema or add if not present
-    pattern = r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>'
+    # A function replacement keeps backslash escapes in the JSON as they are
+    return splice.sub(SCHEMA_SCRIPT_RE, lambda m: new_script)
+
+def enhance_head(splice, slug, index=None):
+    """Enhance the JSON-LD in the <head> of one page in memory.
+
+    Only the <head> text is searched and edited; returns the enhanced schema,
+    or None when the <head> has no JSON-LD. For pages without reviews the
+    returned schema has no 'review' (old rating blocks are removed).
+    """
+    # Extract existing schema
+    original_schema = extract_product_schema(splice.head or '')
     
-    if re.search(pattern, html_content, re.DOTALL):
-        # Replace existing schema
-        html_content = re.sub(pattern, new_script, html_content, flags=re.DOTALL)
-    else:
-        # Add before closing body tag
-        html_content = html_content.replace('</body>', f'{new_script}\n</body>')
+    if not original_schema:
+        return None
+    
+    # Get product name from title or other meta
+    title_match = splice.search(TITLE_RE)
+    product_name = title_match.group(1).split('|')[0].strip() if title_match else None
     
-    return html_content
+    # Create enhanced schema
+    enhanced_schema = create_enhanced_schema(original_schema, slug, product_name, index)
+    
+    # Inject back into <head>
+    if enhanced_schema is not original_schema:
+        inject_schema_into_head(splice, enhanced_schema)
+    return enhanced_schema
+
+def enhance_html(html_content, slug, index=None):
+    """Enhance the JSON-LD of one page in memory.
+
+    Returns (new_html, enhanced_schema), or (None, None) when the page has no JSON-LD.
+    """
+    splice = HeadSplice(html_content)
+    enhanced_schema = enhance_head(splice, slug, index)
+    if enhanced_schema is None:
+        return None, None
+    return splice.text(), enhanced_schema
 
-def process_product_page(file_path, is_english=False):
+def process_product_page(file_path, index=None):
     """Process a single product page"""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             html_content = f.read()
         
-        # Extract existing schema
-        original_schema = extract_product_schema(html_content)
+        splice = HeadSplice(html_content)
+        enhanced_schema = enhance_head(splice, Path(file_path).stem, index)
         
-        if not original_schema:
+        if enhanced_schema is None:
             return False, f'No JSON-LD schema found in {file_path}'
+        if not splice.changed:
+            return True, f'- {file_path} - No reviews, left unchanged'
         
-        # Get product name from title or other meta
-        title_match = re.search(r'<title[^>]*>([^<]+)</title>', html_content)
-        product_name = title_match.group(1) if title_match else 'Unknown Product'
+        # Write back (only the <head> was edited); identical pages are not touched
+        if not splice.write(file_path):
+            return True, f'- {file_path} - Reviews already up to date, left unchanged'
+        if 'review' not in enhanced_schema:
+            return True, f'✓ {file_path} - No real reviews, removed aggregateRating and reviews'
         
-        # Create enhanced schema
-        enhanced_schema = create_enhanced_schema(original_schema, product_name, is_english)
-        
-        # Inject back into HTML
-        new_html = inject_schema_into_html(html_content, enhanced_schema)
-        
-        # Write back
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(new_html)
-        
-        return True, f'✓ {file_path} - Added aggregateRating ({enhanced_schema["aggregateRating"]["ratingValue"]}) and {enhanced_schema["aggregateRating"]["ratingCount"]} reviews'
+        return True, f'✓ {file_path} - Added aggregateRating ({enhanced_schema["aggregateRating"]["ratingValue"]}) and {len(enhanced_schema["review"])} of {enhanced_schema["aggregateRating"]["ratingCount"]} reviews'
     
     except Exception as e:
         return False, f'✗ {file_path} - Error: {str(e)}'
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Add aggregateRating and reviews to the product pages JSON-LD')
+    parser.add_argument('--reviews', default=None,
+                        help='reviews.json or unify_reviews.py output, JSON file or NDJSON directory '
+                             f'(default: the first that exists of {", ".join(REVIEWS_SOURCES)})')
+    parser.add_argument('--aggregates', default=AGGREGATES_FILE,
+                        help=f'rating aggregates index written by unify_reviews.py (default: {AGGREGATES_FILE})')
+    parser.add_argument('--max-reviews', type=int, default=MAX_REVIEWS_PER_PAGE,
+                        help='maximum reviews per page in the JSON-LD (default: all)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main execution function"""
+    args = parse_args(argv)
     print('\n' + '='*70)
     print('JSON-LD Schema Enhancement Tool')
     print('Adding aggregateRating and reviews to product pages')
     print('='*70 + '\n')
     
+    index = ReviewIndex.load(args.reviews, args.max_reviews, args.aggregates)
+    print(f'Loaded reviews for {len(index)} products from: {args.reviews or default_reviews_path()}\n')
+    
     log_entries = []
     processed = 0
     
@@ -190,7 +329,7 @@ def main():
         for file_name in os.listdir(PRODUCT_PAGES_DIR):
             if file_name.endswith('.html'):
                 file_path = os.path.join(PRODUCT_PAGES_DIR, file_name)
-                success, message = process_product_page(file_path, is_english=False)
+                success, message = process_product_page(file_path, index)
                 log_entries.append(message)
                 print(f'  {message}')
                 if success:
@@ -202,7 +341,7 @@ def main():
         for file_name in os.listdir(EN_PRODUCT_PAGES_DIR):
             if file_name.endswith('.html'):
                 file_path = os.path.join(EN_PRODUCT_PAGES_DIR, file_name)
-                success, message = process_product_page(file_path, is_english=True)
+                success, message = process_product_page(file_path, index)
                 log_entries.append(message)
                 print(f'  {message}')
                 if success:
@@ -6,130 +6,292 @@ import re
 from pathlib import Path
 from urllib.parse import quote
 
-# Get all HTML files from products folder
-products_dir = Path('products')
-if not products_dir.exists():
-    print("❌ Products directory not found")
-    exit(1)
-
-html_files = sorted(products_dir.glob('*.html'))
-print(f"📂 Found {len(html_files)} product pages\n")
-
-scroll_count = 0
-for html_file in html_files:
-    scroll_count += 1
-    print(f"[{scroll_count}/{len(html_files)}] Processing: {html_file.name}")
-    
-    with open(html_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Extract product info from the file
+from head_splice import HeadSplice
+from page_keys import page_key
+from rating_aggregates import RatingAggregates, AGGREGATES_FILE
+
+SITE_URL = "https://emirates-gifts.arabsad.com"
+CATALOG_FILE = Path('data/products.json')
+RATINGS_FILE = Path('data/ratings.json')
+# Catalog categories -> breadcrumb names used on the product pages
+CATEGORY_NAMES = {"Perfumes": "عطور", "Watches": "ساعات"}
+# Used when neither ratings.json nor the catalog has reviews for a product
+DEFAULT_RATING = {"ratingValue": "4.7", "reviewCount": "62"}
+WORD_RE = re.compile(r'\w+')
+OLD_PLACEHOLDERS_RE = re.compile(
+    r'<!-- (?:Product Schema|Product Schema JSON-LD|LocalBusiness Schema|LocalBusiness Schema JSON-LD) \(Auto\) -->\s*'
+)
+OLD_PRODUCT_BLOCK_RE = re.compile(
+    r'<script type="application/ld\+json">\s*\{[^}]*"@type":\s*"Product"[^}]*\}\s*</script>',
+    re.DOTALL
+)
+# The block written by a previous run (OLD_PRODUCT_BLOCK_RE cannot match its
+# nested objects, so without this every run added one more copy)
+AUTO_SCHEMA_BLOCK_RE = re.compile(
+    r'<!-- Product & Breadcrumb Schema \(Auto Generated\) -->.*?<!-- /Schema -->\n?',
+    re.DOTALL
+)
+
+
+def _number(value):
+    """Catalog number as it appears on the page (281 -> "281", 281.5 -> "281.5")"""
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _words(text):
+    return set(WORD_RE.findall(text.lower()))
+
+
+def index_ratings(products, ratings):
+    """Map ratings.json entries to catalog ids.
+
+    ratings.json uses the bare product number ("1"), which is shared by
+    perfume_1 and watch_1, so each entry goes to the candidate whose title
+    shares the most words with the review text (the first one on a tie).
+    Repeated entries for the same product are merged into one aggregate.
+    """
+    by_number = {}
+    for product in products:
+        by_number.setdefault(str(product["id"]).rsplit("_", 1)[-1], []).append(product)
+
+    totals = {}
+    for entry in ratings:
+        candidates = by_number.get(str(entry["id"]))
+        if not candidates or not entry.get("count"):
+            continue
+        text = _words(f"{entry.get('review', '')} {entry.get('professional_review', '')}")
+        product = max(candidates, key=lambda p: len(text & _words(p["title"])))
+        count, total = totals.get(product["id"], (0, 0.0))
+        totals[product["id"]] = (count + entry["count"], total + entry["rating"] * entry["count"])
+
+    return {
+        product_id: {"ratingValue": _number(round(total / count, 1)), "reviewCount": str(count)}
+        for product_id, (count, total) in totals.items()
+    }
+
+
+class CatalogIndex:
+    """In-memory index of data/products.json for O(1) lookups by page stem, slug or id"""
+
+    def __init__(self, products=(), ratings=(), aggregates=None):
+        self.products = list(products)
+        self.aggregates = aggregates or RatingAggregates()
+        self.by_key = {}
+        for product in self.products:
+            self.by_key.setdefault(str(product["id"]), product)
+            self.by_key.setdefault(product["url"].rstrip("/").rsplit("/", 1)[-1], product)
+            # Duplicate titles get "-1", "-2"... like the generated page names
+            base = key = page_key(product.get("title_ar") or product["title"])
+            i = 1
+            while key in self.by_key:
+                key = f"{base}-{i}"
+                i += 1
+            self.by_key[key] = product
+        self.ratings = index_ratings(self.products, ratings)
+
+    @classmethod
+    def load(cls, catalog_path=CATALOG_FILE, ratings_path=RATINGS_FILE, aggregates_path=AGGREGATES_FILE):
+        """Load the catalog, ratings and review aggregates once; missing files give an empty index"""
+        data = []
+        for path in (catalog_path, ratings_path):
+            path = Path(path)
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    data.append(json.load(f))
+            else:
+                data.append([])
+        return cls(*data, RatingAggregates.load(aggregates_path))
+
+    def __len__(self):
+        return len(self.products)
+
+    def lookup(self, stem):
+        """Catalog entry for a page stem, slug or product id (None if unknown)"""
+        return self.by_key.get(stem) or self.by_key.get(page_key(stem))
+
+    def rating(self, product):
+        """Real aggregate for a product: the review aggregates index first, then ratings.json, then the catalog's own counts"""
+        summary = self.aggregates.rating(product["id"])
+        if summary:
+            return {"ratingValue": _number(summary[0]), "reviewCount": str(summary[1])}
+        if product["id"] in self.ratings:
+            return self.ratings[product["id"]]
+        if product.get("review_count"):
+            return {"ratingValue": _number(product["rating"]), "reviewCount": str(product["review_count"])}
+        return DEFAULT_RATING
+
+    def fields(self, stem, lang="ar"):
+        """Schema fields for a page from the catalog, or None if the page is not in it"""
+        product = self.lookup(stem)
+        if product is None:
+            return None
+        price = product.get("sale_price") or product["price"]
+        category = product.get("category")
+        return {
+            "product_name": product.get(f"title_{lang}") or product["title"],
+            "price": _number(price),
+            "image_url": product.get("image_link", ""),
+            "description": product.get(f"description_{lang}") or product.get("description", ""),
+            "category": CATEGORY_NAMES.get(category, category) if lang == "ar" else category,
+            "rating": self.rating(product),
+            "source": "catalog",
+        }
+
+
+_DEFAULT_INDEX = None
+
+
+def default_index():
+    """The catalog index loaded from data/ on first use"""
+    global _DEFAULT_INDEX
+    if _DEFAULT_INDEX is None:
+        _DEFAULT_INDEX = CatalogIndex.load()
+    return _DEFAULT_INDEX
+
+
+def extract_category(content):
+    """Get category from breadcrumb or og:description"""
+    category_match = re.search(r'<a[^>]*href="[^"]*"[^>]*>([^<]+)</a>\s*/\s*<a[^>]*>([^<]+)</a>', content)
+    return category_match.group(2) if category_match else "منتج"
+
+
+def extract_page_fields(content):
+    """Extract product info from the file"""
     # Get product name from title
     title_match = re.search(r'<h1[^>]*class="product-title"[^>]*>([^<]+)</h1>', content)
     if not title_match:
         title_match = re.search(r'<title>([^|]+)', content)
     product_name = title_match.group(1).strip() if title_match else 'Product'
-    
+
     # Get price
     price_match = re.search(r'<span[^>]*class="current-price"[^>]*>([0-9.]+)', content)
     price = price_match.group(1) if price_match else "0"
-    
+
     # Get image URL
     image_match = re.search(r'<img[^>]*src="([^"]+)"[^>]*class="product-main-image"', content)
     if not image_match:
         image_match = re.search(r'og:image"[^>]*content="([^"]+)"', content)
     image_url = image_match.group(1) if image_match else ""
-    
+
     # Get description
     desc_match = re.search(r'<meta[^>]*name="description"[^>]*content="([^"]+)"', content)
     description = desc_match.group(1) if desc_match else f"Product {product_name}"
-    
-    # Get category from breadcrumb or og:description
-    category_match = re.search(r'<a[^>]*href="[^"]*"[^>]*>([^<]+)</a>\s*/\s*<a[^>]*>([^<]+)</a>', content)
-    category = category_match.group(2) if category_match else "منتج"
-    
-    # Create complete Product Schema
-    product_schema = {
+
+    return {
+        "product_name": product_name,
+        "price": price,
+        "image_url": image_url,
+        "description": description,
+        "category": extract_category(content),
+        "source": "page",
+    }
+
+
+def page_fields(content, stem, index=None, lang="ar"):
+    """Schema fields from the catalog index, falling back to the page HTML"""
+    fields = (index or default_index()).fields(stem, lang)
+    if fields is None:
+        fields = extract_page_fields(content)
+    elif not fields["category"]:
+        fields["category"] = extract_category(content)
+    return fields
+
+
+def product_page_url(stem, lang="ar"):
+    """Published URL of a product page (English pages live under /en/)"""
+    prefix = "/en" if lang == "en" else ""
+    return f"{SITE_URL}{prefix}/products/{stem}.html"
+
+
+def build_product_schema(stem, fields, lang="ar"):
+    """Create complete Product Schema
+
+    Shared with seo_pipeline.py, so both write the same Product JSON-LD for a page.
+    """
+    rating = fields.get("rating", DEFAULT_RATING)
+    page_url = product_page_url(stem, lang)
+    return {
         "@context": "https://schema.org/",
         "@type": "Product",
-        "@id": f"https://emirates-gifts.arabsad.com/products/{html_file.stem}.html#product",
-        "name": product_name,
+        "@id": f"{page_url}#product",
+        "name": fields["product_name"],
         "image": [
-            image_url
+            fields["image_url"]
         ],
-        "description": description,
+        "description": fields["description"],
         "brand": {
             "@type": "Brand",
-            "@id": "https://emirates-gifts.arabsad.com/#brand",
+            "@id": f"{SITE_URL}/#brand",
             "name": "Emirates Gifts | متجر هدايا الإمارات"
         },
-        "category": category,
+        "category": fields["category"],
         "offers": {
             "@type": "Offer",
-            "@id": f"https://emirates-gifts.arabsad.com/products/{html_file.stem}.html#offer",
-            "url": f"https://emirates-gifts.arabsad.com/products/{html_file.stem}.html",
+            "@id": f"{page_url}#offer",
+            "url": page_url,
             "priceCurrency": "AED",
-            "price": price,
+            "price": fields["price"],
             "priceValidUntil": "2026-12-31",
             "itemCondition": "https://schema.org/NewCondition",
             "availability": "https://schema.org/InStock",
             "seller": {
                 "@type": "Organization",
-                "@id": "https://emirates-gifts.arabsad.com/#organization",
+                "@id": f"{SITE_URL}/#organization",
                 "name": "Emirates Gifts"
             }
         },
         "aggregateRating": {
             "@type": "AggregateRating",
-            "ratingValue": "4.7",
-            "reviewCount": "62",
+            "ratingValue": rating["ratingValue"],
+            "reviewCount": rating["reviewCount"],
             "bestRating": "5",
             "worstRating": "1"
         },
-        "url": f"https://emirates-gifts.arabsad.com/products/{html_file.stem}.html"
+        "url": page_url
     }
-    
-    # Create BreadcrumbList Schema
-    breadcrumb_schema = {
+
+
+def build_breadcrumb_schema(page_url, product_name, category, site_url=SITE_URL):
+    """Create BreadcrumbList Schema"""
+    return {
         "@context": "https://schema.org",
         "@type": "BreadcrumbList",
-        "@id": f"https://emirates-gifts.arabsad.com/products/{html_file.stem}.html#breadcrumb",
+        "@id": f"{page_url}#breadcrumb",
         "itemListElement": [
             {
                 "@type": "ListItem",
                 "position": 1,
                 "name": "الرئيسية",
-                "item": "https://emirates-gifts.arabsad.com"
+                "item": site_url
             },
             {
                 "@type": "ListItem",
                 "position": 2,
                 "name": category,
-                "item": f"https://emirates-gifts.arabsad.com/category/{quote(category)}"
+                "item": f"{site_url}/category/{quote(category)}"
             },
             {
                 "@type": "ListItem",
                 "position": 3,
                 "name": product_name,
-                "item": f"https://emirates-gifts.arabsad.com/products/{html_file.stem}.html"
+                "item": page_url
             }
         ]
     }
-    
-    # Remove old schema placeholders
-    content = re.sub(r'<!-- Product Schema \(Auto\) -->\s*', '', content)
-    content = re.sub(r'<!-- Product Schema JSON-LD \(Auto\) -->\s*', '', content)
-    content = re.sub(r'<!-- LocalBusiness Schema \(Auto\) -->\s*', '', content)
-    content = re.sub(r'<!-- LocalBusiness Schema JSON-LD \(Auto\) -->\s*', '', content)
-    
-    # Remove multiple schema blocks
-    content = re.sub(
-        r'<script type="application/ld\+json">\s*\{[^}]*"@type":\s*"Product"[^}]*\}\s*</script>',
-        '',
-        content,
-        flags=re.DOTALL
+
+
+def apply_product_schema(splice, html_file, fields):
+    """Replace the Product & Breadcrumb schema inside <head> only"""
+    product_schema = build_product_schema(html_file.stem, fields)
+    breadcrumb_schema = build_breadcrumb_schema(
+        product_page_url(html_file.stem), fields["product_name"], fields["category"]
     )
-    
+
+    # Remove old schema placeholders and multiple schema blocks
+    splice.sub(OLD_PLACEHOLDERS_RE, '')
+    splice.sub(OLD_PRODUCT_BLOCK_RE, '')
+    splice.sub(AUTO_SCHEMA_BLOCK_RE, '')
+
     # Create new schema block
     schema_block = f'''<!-- Product & Breadcrumb Schema (Auto Generated) -->
 <script type="application/ld+json">
@@ -140,25 +302,71 @@ for html_file in html_files:
 {json.dumps(breadcrumb_schema, ensure_ascii=False, indent=2)}
 </script>
 <!-- /Schema -->\n'''
-    
-    # Find the right place to insert schema (before closing </head>)
-    if '</head>' in content:
-        content = content.replace('</head>', schema_block + '</head>', 1)
-    else:
+
+    # Insert schema before closing </head>
+    if not splice.insert_before_close(schema_block):
         print(f"⚠️  Warning: No </head> tag found in {html_file.name}")
-    
-    # Write updated content
-    with open(html_file, 'w', encoding='utf-8') as f:
-        f.write(content)
-    
-    print(f"✅ Schema updated for: {product_name}")
-
-print(f"\n{'='*60}")
-print(f"✨ تم ضبط schema لـ {scroll_count} صفحة منتج!")
-print(f"{'='*60}")
-print("\n🚀 الآن كل صفحة فيها:")
-print("  ✓ Product Schema (مهم جداً لـ Google)")
-print("  ✓ BreadcrumbList Schema")
-print("  ✓ Rating & Offer data")
-print("  ✓ Image metadata")
-print("\n📊 التحديثات موجودة الآن في كل الملفات!")
+
+
+def fix_product_schema(content, html_file, index=None):
+    """Replace the Product & Breadcrumb schema of one page; returns (content, fields)
+
+    Fields come from the catalog index (data/products.json + data/ratings.json);
+    the HTML regexes are only used for pages that are not in the catalog.
+    """
+    fields = page_fields(content, Path(html_file).stem, index)
+    splice = HeadSplice(content)
+    apply_product_schema(splice, html_file, fields)
+    return splice.text(), fields
+
+
+def main():
+    # Get all HTML files from products folder
+    products_dir = Path('products')
+    if not products_dir.exists():
+        print("❌ Products directory not found")
+        exit(1)
+
+    html_files = sorted(products_dir.glob('*.html'))
+    print(f"📂 Found {len(html_files)} product pages\n")
+
+    index = default_index()
+    print(f"📇 Catalog: {len(index)} products, {len(index.ratings)} with ratings\n")
+    sources = {"catalog": 0, "page": 0}
+    unchanged = 0
+
+    scroll_count = 0
+    for html_file in html_files:
+        scroll_count += 1
+        print(f"[{scroll_count}/{len(html_files)}] Processing: {html_file.name}")
+
+        with open(html_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        fields = page_fields(content, html_file.stem, index)
+        sources[fields["source"]] += 1
+        splice = HeadSplice(content)
+        apply_product_schema(splice, html_file, fields)
+
+        # Write updated content (pages that already match are not touched)
+        if splice.write(html_file):
+            print(f"✅ Schema updated for: {fields['product_name']}")
+        else:
+            unchanged += 1
+            print(f"- Schema already up to date for: {fields['product_name']}")
+
+    print(f"\n{'='*60}")
+    print(f"✨ تم ضبط schema لـ {scroll_count} صفحة منتج!")
+    print(f"📇 من الكتالوج: {sources['catalog']} | من HTML: {sources['page']}")
+    print(f"📝 تم تعديل: {scroll_count - unchanged} | بدون تغيير: {unchanged}")
+    print(f"{'='*60}")
+    print("\n🚀 الآن كل صفحة فيها:")
+    print("  ✓ Product Schema (مهم جداً لـ Google)")
+    print("  ✓ BreadcrumbList Schema")
+    print("  ✓ Rating & Offer data")
+    print("  ✓ Image metadata")
+    print("\n📊 التحديثات موجودة الآن في كل الملفات!")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+import re
+import csv
 import json
+import hashlib
 import html
 import pathlib
 import sys
 import logging
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 
-import pandas as pd
-from slugify import slugify
+# numpy و pandas و slugify تُستورد داخل الدوال التي تحتاجها فقط، حتى لا يدفع
+# كل تشغيل (مثل --help أو القراءة المتدفقة) زمن استيرادها
 
 # Input Excel (try data/ then root)
 CANDIDATES = [
@@ -23,6 +32,15 @@ logger = logging.getLogger(__name__)
 TEMPLATE_FILE = pathlib.Path(__file__).parent / "product_template.html"
 OUTPUT_DIR = pathlib.Path("products")
 DEFAULT_AVAIL = "https://schema.org/InStock"
+SLUG_REGISTRY_FILE = pathlib.Path("data/slug-registry.json")
+CACHE_DIR = pathlib.Path(".cache/catalog")
+# يجب زيادته عند تغيير normalize_catalog أو أعمدتها حتى تُهمل النسخ القديمة
+CATALOG_CACHE_VERSION = 2
+# الأعمدة التي تميّز المنتج بشكل ثابت (بالترتيب)، لربطه بنفس الـ slug في كل تشغيل
+PRODUCT_KEY_COLUMNS = ("id", "sku", "link", "image")
+# حجم الدفعة الافتراضي عند القراءة المتدفقة أو التوليد التسلسلي
+DEFAULT_CHUNK_SIZE = 256
+PLACEHOLDER_RE = re.compile(r"\{\{([^{}]*)\}\}")
 
 def find_excel():
     for p in CANDIDATES:
@@ -39,15 +57,219 @@ def load_config():
         config = json.load(f)
     return config
 
+def _cell_text(val):
+    """نص الخلية كما يظهر في Excel: الأعداد الصحيحة التي يقرؤها pandas كـ float
+    (120.0) تُكتب 120 كما يعيدها openpyxl، حتى يتطابق الوضعان العادي و --stream."""
+    if isinstance(val, float) and val.is_integer():
+        return str(int(val))
+    return str(val)
+
 def clean_price(val):
-    if pd.isna(val):
+    if val is None or val != val:  # None أو NaN
         return None
-    s = str(val).strip()
+    s = _cell_text(val).strip()
     keep = "".join(ch for ch in s if ch.isdigit() or ch in ".,")
     if not keep:
         return None
     return keep.replace(",", ".")
 
+def _text_column(df, name, default=""):
+    """عمود نصي من الجدول (أو عمود فارغ إذا لم يكن موجودًا)، مع تعويض القيم الفارغة."""
+    if name not in df.columns:
+        import pandas as pd
+        return pd.Series(default, index=df.index, dtype=object)
+    col = df[name].astype(object).where(df[name].astype(bool), default)
+    return col.map(_cell_text).str.strip()
+
+def normalize_catalog(df, default_brand, default_currency):
+    """تنظيف جدول المنتجات دفعة واحدة (عمودًا بعمود) بدلًا من المرور على كل صف.
+
+    يعيد جدولًا مضغوطًا بالحقول التي تحتاجها مرحلة التوليد فقط، بعد
+    حذف الصفوف التي بلا عنوان. النتيجة مطابقة لـ clean_price والمعالجة
+    السابقة لكل صف.
+    """
+    import pandas as pd
+
+    records = pd.DataFrame({
+        "title": _text_column(df, "title"),
+        "desc": _text_column(df, "desc"),
+        "image": _text_column(df, "image"),
+        "link": _text_column(df, "link"),
+        "currency": _text_column(df, "currency", default_currency),
+        "brand": _text_column(df, "brand", default_brand),
+        "availability": _text_column(df, "availability", "InStock"),
+        "custom_slug": _text_column(df, "slug"),
+        "id": _text_column(df, "id"),
+        "sku": _text_column(df, "sku"),
+    }, index=df.index)
+    records = records[records["title"] != ""]
+
+    # السعر: الإبقاء على الأرقام و "." و "," فقط ثم تحويل "," إلى "."
+    if "price" in df.columns:
+        raw_price = df.loc[records.index, "price"].astype(object)
+        price = raw_price.where(raw_price.notna(), "").map(_cell_text).str.strip()
+        price = price.str.replace(r"[^\d.,]", "", regex=True).str.replace(",", ".", regex=False)
+        records["price"] = price.astype(object).where(price != "", None)
+    else:
+        records["price"] = None
+
+    availability = records["availability"]
+    records["availability"] = availability.where(
+        availability.str.contains("schema.org", regex=False),
+        "https://schema.org/" + availability,
+    )
+    return records.reset_index(drop=True)
+
+def _text_value(row, name, default=""):
+    return _cell_text(row.get(name) or default).strip()
+
+def normalize_row(row, default_brand, default_currency):
+    """نفس normalize_catalog لكن لصف واحد (للقراءة المتدفقة)؛ تعيد None إذا لم يكن للصف عنوان."""
+    title = _text_value(row, "title")
+    if not title:
+        return None
+    availability = _text_value(row, "availability", "InStock")
+    if "schema.org" not in availability:
+        availability = f"https://schema.org/{availability}"
+    return {
+        "title": title,
+        "desc": _text_value(row, "desc"),
+        "image": _text_value(row, "image"),
+        "link": _text_value(row, "link"),
+        "currency": _text_value(row, "currency", default_currency),
+        "brand": _text_value(row, "brand", default_brand),
+        "availability": availability,
+        "custom_slug": _text_value(row, "slug"),
+        "id": _text_value(row, "id"),
+        "sku": _text_value(row, "sku"),
+        "price": clean_price(row.get("price")),
+    }
+
+def iter_sheet_rows(path):
+    """قراءة صفوف الجدول صفًا بصف كقواميس (CSV أو openpyxl بوضع read-only)."""
+    path = pathlib.Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+def iter_catalog_records(path, default_brand, default_currency):
+    """سجلات المنتجات المنظّفة بشكل كسول؛ الذاكرة لا تعتمد على حجم الجدول."""
+    for row in iter_sheet_rows(path):
+        record = normalize_row(row, default_brand, default_currency)
+        if record:
+            yield record
+
+def read_sheet(path):
+    """قراءة الجدول كاملًا في DataFrame (Excel أو CSV)."""
+    import pandas as pd
+
+    path = pathlib.Path(path)
+    if path.suffix.lower() == ".csv":
+        return pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    return pd.read_excel(path, engine="openpyxl").fillna("")  # requires openpyxl
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _write_catalog_cache(catalog, data_path):
+    """حفظ الجدول المنظّف كمصفوفات نصية في ملف npz مضغوط (بدون pickle).
+
+    مصفوفات numpy النصية بعرض ثابت (UCS-4 بطول أطول خلية في العمود)، فبدون
+    ضغط يصبح الملف أكبر بكثير من ملف Excel نفسه.
+    """
+    import numpy as np
+
+    arrays = {
+        column: np.array(["" if v is None else v for v in catalog[column].tolist()], dtype=str)
+        for column in catalog.columns
+    }
+    tmp_path = data_path.with_name(data_path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, data_path)
+
+def _read_catalog_cache(data_path, columns):
+    import numpy as np
+    import pandas as pd
+
+    with np.load(data_path, allow_pickle=False) as arrays:
+        catalog = pd.DataFrame({column: arrays[column].astype(object) for column in columns})
+        # السعر الفارغ يُحفظ كـ ""؛ where(..., None) تعيده NaN في pandas الحديثة
+        # ("nan AED" و "price": NaN في الصفحة)، لذلك نعيده None صراحةً كما في normalize_catalog
+        catalog["price"] = pd.Series([p if p != "" else None for p in arrays["price"].tolist()], dtype=object)
+    return catalog
+
+def load_catalog(excel_path, default_brand, default_currency, cache_dir=CACHE_DIR, use_cache=True):
+    """قراءة ملف Excel وتنظيفه، مع ذاكرة مؤقتة ثنائية أمام pd.read_excel.
+
+    المفتاح هو حجم الملف و mtime و SHA-256 (مع القيم الافتراضية)؛ إذا تغيّر
+    الحجم أو الوقت فقط يُحسب الـ hash، وإذا تطابق يُعاد استخدام النسخة المحفوظة.
+    """
+    excel_path = pathlib.Path(excel_path)
+    meta_path = cache_dir / "catalog.json"
+    data_path = cache_dir / "catalog.npz"
+    st = excel_path.stat()
+    defaults = [default_brand, default_currency]
+
+    meta = None
+    if use_cache and meta_path.exists() and data_path.exists():
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            meta = None
+
+    sha256 = None
+    if meta and meta.get("version") == CATALOG_CACHE_VERSION and meta.get("defaults") == defaults \
+            and meta.get("source") == str(excel_path) and meta.get("size") == st.st_size:
+        fresh = meta.get("mtime_ns") == st.st_mtime_ns
+        if not fresh:
+            sha256 = _file_sha256(excel_path)
+            fresh = meta.get("sha256") == sha256
+        if fresh:
+            try:
+                catalog = _read_catalog_cache(data_path, meta["columns"])
+                if meta.get("mtime_ns") != st.st_mtime_ns:
+                    meta["mtime_ns"] = st.st_mtime_ns
+                    meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+                logger.info(f"⚡ تم تحميل {len(catalog)} منتج من الذاكرة المؤقتة: {data_path}")
+                return catalog
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ الذاكرة المؤقتة غير صالحة، سيتم إعادة بنائها: {e}")
+
+    catalog = normalize_catalog(read_sheet(excel_path), default_brand, default_currency)
+    if use_cache:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        _write_catalog_cache(catalog, data_path)
+        meta = {
+            "version": CATALOG_CACHE_VERSION,
+            "source": str(excel_path),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": sha256 or _file_sha256(excel_path),
+            "defaults": defaults,
+            "columns": list(catalog.columns),
+        }
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    return catalog
+
 def build_jsonld(product_data, config):
     """بناء سكيما JSON-LD كاملة للمنتج."""
     product_defaults = config.get("product_defaults", {})
@@ -79,21 +301,334 @@ def build_jsonld(product_data, config):
         }
     return json.dumps(data, ensure_ascii=False, indent=2)
 
+class CompiledTemplate:
+    """قالب HTML مُجزّأ مسبقًا إلى نصوص ثابتة وخانات متغيرات.
+
+    يتم تحليل القالب مرة واحدة فقط، ثم تُبنى كل صفحة بعملية join واحدة
+    بدلًا من استدعاء str.replace مرتين لكل متغير على القالب كاملًا.
+    """
+
+    def __init__(self, template_content):
+        # split يعيد [نص، اسم، نص، اسم، ...، نص]
+        self._parts = PLACEHOLDER_RE.split(template_content)
+        self._slots = [(i, self._parts[i]) for i in range(1, len(self._parts), 2)]
+        for i, name in self._slots:
+            # الخانات غير المعروفة تبقى كما هي في الناتج
+            self._parts[i] = f"{{{{{name}}}}}"
+
+    def render(self, context):
+        values = {}
+        for key, value in context.items():
+            text = str(value or '')
+            # {{key}} مشفّر لـ HTML، و {{key_raw}} بدون تشفير (مثل JSON-LD)؛
+            # أول مفتاح يطابق الخانة هو الذي يُستخدم، كما في الاستبدال المتتالي سابقًا
+            values.setdefault(key, html.escape(text, quote=True))
+            values.setdefault(f"{key}_raw", text)
+        out = self._parts[:]
+        for i, name in self._slots:
+            if name in values:
+                out[i] = values[name]
+        return "".join(out)
+
+@lru_cache(maxsize=8)
+def compile_template(template_content):
+    """تحويل نص القالب إلى CompiledTemplate (مع تخزين مؤقت)."""
+    return CompiledTemplate(template_content)
+
 def render_html(template_content, context):
     """تعويض المتغيرات في قالب HTML."""
-    content = template_content
-    for key, value in context.items():
-        # تحويل القيم إلى نص وتشفيرها لـ HTML
-        safe_value = html.escape(str(value or ''), quote=True)
-        content = content.replace(f"{{{{{key}}}}}", safe_value)
-        # للمتغيرات التي لا تحتاج تشفير (مثل JSON-LD)
-        content = content.replace(f"{{{{{key}_raw}}}}}", str(value or ''))
-    return content
-
-def main():
+    return compile_template(template_content).render(context)
+
+@lru_cache(maxsize=None)
+def cached_slugify(title):
+    from slugify import slugify
+    return slugify(title)
+
+class SlugRegistry:
+    """سجل دائم (مفتاح المنتج -> slug) حتى لا تتغير روابط المنتجات بين التشغيلات.
+
+    مفتاح المنتج هو أول قيمة غير فارغة من PRODUCT_KEY_COLUMNS، وإلا العنوان؛
+    والمفاتيح المكررة تُميَّز برقم تكرارها. عند التعارض تُضاف لاحقة من عدّاد
+    خاص بكل slug أساسي بدلًا من تجربة -1، -2، ... من البداية في كل مرة.
+    """
+
+    def __init__(self, path=SLUG_REGISTRY_FILE):
+        self.path = pathlib.Path(path)
+        self.slugs = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.slugs = json.load(f).get("slugs", {})
+        self._used = set()
+        self._next_suffix = {}
+
+    @staticmethod
+    def product_key(record, seen):
+        for column in PRODUCT_KEY_COLUMNS:
+            if record.get(column):
+                key = f"{column}:{record[column]}"
+                break
+        else:
+            key = f"title:{record['title']}"
+        # المفاتيح المكررة في نفس الجدول تُميَّز برقم التكرار
+        n = seen[key] = seen.get(key, 0) + 1
+        return key if n == 1 else f"{key}#{n}"
+
+    @staticmethod
+    def _keeps(known, custom):
+        """هل ما زال الـ slug المسجل صالحًا مع الـ slug المخصص في الجدول؟"""
+        return not custom or known == custom or known.startswith(f"{custom}-")
+
+    def _claim(self, base, reserved=()):
+        slug = base
+        if slug in self._used or slug in reserved:
+            i = self._next_suffix.get(base, 1)
+            while f"{base}-{i}" in self._used or f"{base}-{i}" in reserved:
+                i += 1
+            slug = f"{base}-{i}"
+            self._next_suffix[base] = i + 1
+        self._used.add(slug)
+        return slug
+
+    def _reserved(self, records):
+        """الروابط المسجلة للمنتجات الموجودة في هذا الجدول؛ لا يأخذها منتج جديد يسبق صاحبها.
+
+        روابط المنتجات التي لم تعد في الجدول (أو تغيّر مفتاحها بعد تعديل الصورة
+        أو الرابط) لا تُحجز، فيستعيد المنتج رابطه المنشور إذا بقي عنوانه كما هو.
+        """
+        seen = {}
+        reserved = set()
+        for record in records:
+            known = self.slugs.get(self.product_key(record, seen))
+            if known and self._keeps(known, record["custom_slug"]):
+                reserved.add(known)
+        return reserved
+
+    def _assign_one(self, record, key, reserved):
+        known = self.slugs.get(key)
+        custom = record.pop("custom_slug")
+        if known and self._keeps(known, custom) and known not in self._used:
+            self._used.add(known)
+            record["slug"] = known
+        else:
+            record["slug"] = self._claim(custom or cached_slugify(record["title"]), reserved)
+            self.slugs[key] = record["slug"]
+        return record
+
+    def assign(self, records):
+        """تحديد slug لكل سجل (في العملية الرئيسية فقط) مع الحفاظ على الروابط المسجلة."""
+        reserved = self._reserved(records)
+        seen = {}
+        return [self._assign_one(record, self.product_key(record, seen), reserved) for record in records]
+
+    def assign_stream(self, records, scan):
+        """مثل assign لكن لسجلات تصل تباعًا (القراءة المتدفقة).
+
+        scan قراءة أولى لنفس الجدول تُستخدم لمعرفة الروابط المحجوزة فقط (مفاتيح
+        المنتجات بدون الاحتفاظ بالسجلات)، فتكون النتيجة مطابقة لـ assign.
+        """
+        reserved = self._reserved(scan)
+        seen = {}
+        for record in records:
+            yield self._assign_one(record, self.product_key(record, seen), reserved)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"slugs": dict(sorted(self.slugs.items()))}, ensure_ascii=False, indent=2)
+        write_if_changed(self.path, data.encode("utf-8"))
+
+def assign_slugs(catalog, registry):
+    """تحديد slug لكل منتج بترتيب الجدول.
+
+    تتم في العملية الرئيسية فقط حتى تبقى الروابط ثابتة مهما كان عدد العمليات.
+    """
+    return registry.assign(catalog.to_dict("records"))
+
+def render_product(product_record, template, config):
+    """توليد صفحة HTML لمنتج واحد، مع مدخلته في products.json."""
+    price = product_record["price"]
+    json_ld_str = build_jsonld(product_record, config)
+    display_price = f"{price} {product_record['currency']}" if price else ""
+
+    html_context = {
+        "title": product_record["title"],
+        "description": product_record["desc"],
+        "image_url": product_record["image"],
+        "buy_link": product_record["link"],
+        "display_price": display_price,
+        "json_ld_raw": json_ld_str
+    }
+    html_page = template.render(html_context)
+
+    index_entry = {
+        "title": product_record["title"],
+        "price": display_price,
+        "image": product_record["image"],
+        "link": product_record["link"],
+        "slug": product_record["slug"],
+        "desc": product_record["desc"]
+    }
+    return html_page, index_entry
+
+def write_if_changed(path, data):
+    """كتابة الملف فقط إذا تغيّر محتواه؛ تعيد created أو updated أو unchanged.
+
+    الملفات المتطابقة لا تُلمس، فلا يتغير mtime (الذي يعتمد عليه الـ sitemap)
+    ولا تظهر في git diff أو في إبطال ذاكرة الـ CDN.
+    """
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return "unchanged"
+        status = "updated"
+    except FileNotFoundError:
+        status = "created"
+    path.write_bytes(data)
+    return status
+
+def write_product_pages(records, template, config, output_dir):
+    """توليد وكتابة صفحات مجموعة من المنتجات.
+
+    تعيد مدخلات products.json بنفس الترتيب، مع عدّاد لحالات الكتابة.
+    """
+    entries = []
+    stats = Counter()
+    for product_record in records:
+        html_page, index_entry = render_product(product_record, template, config)
+        data = html_page.encode("utf-8", errors="xmlcharrefreplace")
+        stats[write_if_changed(output_dir / f"{product_record['slug']}.html", data)] += 1
+        entries.append(index_entry)
+    return entries, stats
+
+def prune_orphaned_pages(output_dir, slugs, delete=False):
+    """صفحات HTML في مجلد الإخراج لم يعد لها منتج في الجدول."""
+    orphans = sorted(p for p in output_dir.glob("*.html") if p.stem not in slugs)
+    if delete:
+        for path in orphans:
+            path.unlink()
+    return orphans
+
+# حالة كل عملية فرعية: القالب والإعدادات تُرسل مرة واحدة عند بدء العملية
+_WORKER_STATE = {}
+
+def _init_worker(template_content, config, output_dir):
+    _WORKER_STATE["template"] = compile_template(template_content)
+    _WORKER_STATE["config"] = config
+    _WORKER_STATE["output_dir"] = output_dir
+
+def _write_chunk(records):
+    return write_product_pages(records, _WORKER_STATE["template"], _WORKER_STATE["config"], _WORKER_STATE["output_dir"])
+
+def _chunked(records, size):
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def generate_product_pages(records, template_content, config, output_dir, jobs=1, chunk_size=None):
+    """توليد وكتابة الصفحات على دفعات، وإرجاع (المدخلات، العدّاد) لكل دفعة بالترتيب.
+
+    records يمكن أن تكون قائمة أو مولّدًا كسولًا. مع jobs > 1 تُوزع الدفعات على
+    ProcessPoolExecutor مع نافذة محدودة من الدفعات المعلّقة، فلا تُقرأ كل السجلات
+    إلى الذاكرة مسبقًا، وتبقى products.json بترتيب الجدول الأصلي.
+    """
+    if not chunk_size:
+        if jobs > 1 and isinstance(records, list):
+            # عدة دفعات لكل عملية لتوزيع الحمل بشكل متوازن
+            chunk_size = max(1, -(-len(records) // (jobs * 4)))
+        else:
+            chunk_size = DEFAULT_CHUNK_SIZE
+    chunks = _chunked(records, chunk_size)
+
+    if jobs <= 1:
+        template = compile_template(template_content)
+        for chunk in chunks:
+            yield write_product_pages(chunk, template, config, output_dir)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(template_content, config, output_dir)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_write_chunk, chunk))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class ProductsIndexWriter:
+    """كتابة products.json مدخلةً بمدخلة، بنفس تنسيق json.dumps(indent=2).
+
+    يُكتب الملف في ملف مؤقت ولا يستبدل الملف الحالي إلا إذا تغيّر محتواه.
+    يُستخدم مع with: إذا فشل التوليد في المنتصف يُغلق الملف المؤقت ويُحذف
+    ويبقى products.json السابق كما هو.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._f = open(self._tmp_path, 'w', encoding='utf-8')
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def add(self, entry):
+        text = json.dumps(entry, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self._f.write(("[\n  " if self.count == 0 else ",\n  ") + text)
+        self.count += 1
+
+    def close(self):
+        try:
+            self._f.write("\n]" if self.count else "[]")
+        except BaseException:
+            self.abort()
+            raise
+        self._f.close()
+        if self.path.exists() and self.path.read_bytes() == self._tmp_path.read_bytes():
+            self._tmp_path.unlink()
+            return "unchanged"
+        os.replace(self._tmp_path, self.path)
+        return "updated"
+
+    def abort(self):
+        """إغلاق الملف المؤقت وحذفه بدون لمس products.json."""
+        self._f.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="توليد صفحات المنتجات من ملف Excel.")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="عدد العمليات المتوازية للتوليد والكتابة (0 = عدد الأنوية)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="عدد المنتجات في كل دفعة ترسل لعملية فرعية")
+    parser.add_argument("--slug-registry", type=pathlib.Path, default=SLUG_REGISTRY_FILE,
+                        help="ملف سجل الروابط الثابتة (مفتاح المنتج -> slug)")
+    parser.add_argument("--input", type=pathlib.Path, default=None,
+                        help="ملف المنتجات (xlsx أو csv)؛ الافتراضي data/products-template.xlsx")
+    parser.add_argument("--stream", action="store_true",
+                        help="قراءة الجدول صفًا بصف وتوليد الصفحات فورًا بذاكرة ثابتة (لملفات الموردين الكبيرة)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="تجاهل الذاكرة المؤقتة للجدول (.cache/catalog) وقراءة ملف Excel مباشرة")
+    parser.add_argument("--prune", action="store_true",
+                        help="حذف صفحات products/*.html التي لم يعد لها صف في الجدول")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
     try:
         config = load_config()
-        excel_path = find_excel()
+        excel_path = args.input or find_excel()
+        if not excel_path.exists():
+            raise FileNotFoundError(f"ملف المنتجات غير موجود: {excel_path}")
         if not TEMPLATE_FILE.exists():
             raise FileNotFoundError(f"ملف القالب غير موجود: {TEMPLATE_FILE}")
         template_str = TEMPLATE_FILE.read_text(encoding="utf-8")
@@ -104,71 +639,38 @@ def main():
     default_brand = config.get("brand_name", "Emirates Gifts")
     default_currency = config.get("product_defaults", {}).get("currency", "AED")
 
-    df = pd.read_excel(excel_path, engine="openpyxl").fillna("")  # requires openpyxl
+    registry = SlugRegistry(args.slug_registry)
+    if args.stream:
+        records = registry.assign_stream(iter_catalog_records(excel_path, default_brand, default_currency),
+                                         iter_catalog_records(excel_path, default_brand, default_currency))
+    else:
+        catalog = load_catalog(excel_path, default_brand, default_currency, use_cache=not args.no_cache)
+        records = assign_slugs(catalog, registry)
     OUTPUT_DIR.mkdir(exist_ok=True)
 
-    products = []
-    used_slugs = set()
-
-    for _, row in df.iterrows():
-        title = (row.get("title") or "").strip()
-        if not title:
-            continue
-
-        desc = (row.get("desc") or "").strip()
-        image = (row.get("image") or "").strip()
-        link = (row.get("link") or "").strip()
-        price = clean_price(row.get("price"))
-        currency = (row.get("currency") or default_currency).strip()
-        brand = (row.get("brand") or default_brand).strip()
-        availability_raw = (row.get("availability") or "InStock").strip()
-        availability = f"https://schema.org/{availability_raw}" if "schema.org" not in availability_raw else availability_raw
-        
-        # slug
-        custom_slug = (row.get("slug") or "").strip()
-        slug = custom_slug or slugify(title)
-        base = slug
-        i = 1
-        while slug in used_slugs:
-            slug = f"{base}-{i}"
-            i += 1
-        used_slugs.add(slug)
+    stats = Counter()
+    slugs = set()
+    with ProductsIndexWriter(OUTPUT_DIR / "products.json") as index_writer:
+        for entries, chunk_stats in generate_product_pages(records, template_str, config, OUTPUT_DIR, jobs, args.chunk_size):
+            stats.update(chunk_stats)
+            for entry in entries:
+                index_writer.add(entry)
+                slugs.add(entry["slug"])
+    products_count = index_writer.count
 
-        product_record = {
-            "title": title, "desc": desc, "image": image, "link": link,
-            "price": price, "currency": currency, "brand": brand,
-            "availability": availability, "slug": slug
-        }
+    orphans = prune_orphaned_pages(OUTPUT_DIR, slugs, delete=args.prune)
+    if args.prune:
+        stats["removed"] = len(orphans)
+    elif orphans:
+        logger.info(f"ℹ️ {len(orphans)} صفحة بدون صف في الجدول (استخدم --prune لحذفها)")
 
-        json_ld_str = build_jsonld(product_record, config)
-        display_price = f"{price} {currency}" if price else ""
+    registry.save()
 
-        html_context = {
-            "title": title,
-            "description": desc,
-            "image_url": image,
-            "buy_link": link,
-            "display_price": display_price,
-            "json_ld_raw": json_ld_str
-        }
-        html_page = render_html(template_str, html_context)
-
-        # write HTML
-        (OUTPUT_DIR / f"{slug}.html").write_text(html_page, encoding="utf-8", errors="xmlcharrefreplace")
-
-        # accumulate JSON for index
-        products.append({
-            "title": title,
-            "price": display_price,
-            "image": image,
-            "link": link,
-            "slug": slug,
-            "desc": desc
-        })
-
-    # write products.json
-    (OUTPUT_DIR / "products.json").write_text(json.dumps(products, ensure_ascii=False, indent=2), encoding="utf-8")
-    logger.info(f"✅ تم إنشاء {len(products)} صفحة منتج في المجلد: {OUTPUT_DIR}")
+    logger.info(f"✅ تم إنشاء {products_count} صفحة منتج في المجلد: {OUTPUT_DIR}")
+    logger.info(
+        f"📊 جديد: {stats['created']} | محدّث: {stats['updated']} | "
+        f"بدون تغيير: {stats['unchanged']} | محذوف: {stats['removed']}"
+    )
 
 if __name__ == "__main__":
     main()
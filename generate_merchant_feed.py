@@ -1,169 +1,497 @@
 #!/usr/bin/env python3
 """
 Emirates Gifts - Google Merchant Feed Generator
-Generates Excel files for Google Merchant Center in English and Arabic
+Generates the Google Merchant Center feeds in English and Arabic from the real
+catalog (data/products.json)
+
+Each product is read from the catalog once and written to every output at the
+same time; nothing is collected in memory (no DataFrame), so memory use stays
+the same as the catalog grows.
+
+A fingerprint of every emitted item is kept per feed (format and language) in
+.cache/merchant-feed/. Once it exists for every requested feed, a run writes
+only supplemental (delta) feeds with the items that were added, changed or
+removed since that feed was last uploaded; --full rebuilds the full feeds.
+
+A run only records its fingerprints as pending. They become the delta
+baseline when the upload is confirmed with --confirm-upload, so runs between
+two uploads write cumulative deltas and no change is lost.
 
 Usage:
     python generate_merchant_feed.py
+    python generate_merchant_feed.py --full
+    python generate_merchant_feed.py --formats tsv,xlsx --langs en
+    python generate_merchant_feed.py --confirm-upload
 
-Output:
-    - Emirates_Gifts_Merchant_Feed_EN.xlsx (206 products, English)
-    - Emirates_Gifts_Merchant_Feed_AR.xlsx (206 products, Arabic)
+Output (by default):
+    - google_merchant_feed_en.tsv / google_merchant_feed_ar.tsv
+    - product-feed-en.xml / product-feed.xml (Atom with g: attributes)
+    - product-feed-en.json / product-feed.json
+    - Emirates_Gifts_Merchant_Feed_EN.xlsx / Emirates_Gifts_Merchant_Feed_AR.xlsx
+    - In delta runs: the same names with .delta before the extension
 """
 
-import pandas as pd
-from datetime import datetime
-
-def generate_products():
-    """Generate 206 products (100 perfumes + 106 watches)"""
-    
-    perfume_brands = [
-        "Chanel", "Dior", "Tom Ford", "Guerlain", "Creed", "Versace",
-        "Giorgio Armani", "Prada", "Yves Saint Laurent", "Givenchy",
-        "Burberry", "Calvin Klein", "Dolce & Gabbana", "Hermès", "Cartier",
-        "Penhaligons", "Frederic Malle", "Maison Francis Kurkdjian", "Acqua di Parma"
-    ]
-    
-    perfume_types = [
-        "Eau de Parfum", "Eau de Toilette", "Eau de Cologne", "Fragrance", "Perfume",
-        "Luxury Fragrance", "Premium Perfume", "Signature Scent", "Exclusive Fragrance"
-    ]
-    
-    perfume_notes = [
-        "Floral", "Woody", "Oriental", "Fruity", "Citrus", "Fresh", "Spicy",
-        "Vanilla", "Musk", "Amber", "Rose", "Jasmine", "Sandalwood", "Patchouli"
-    ]
-    
-    watch_brands = [
-        "Rolex", "Omega", "Tag Heuer", "Breitling", "IWC", "Patek Philippe",
-        "Cartier", "Longines", "Tudor", "Tissot", "Hamilton", "Seiko",
-        "Citizen", "Bulova", "Movado", "Raymond Weil", "Zenith", "Hublot"
-    ]
-    
-    watch_styles = [
-        "Luxury", "Sport", "Classic", "Dress", "Casual", "Aviation",
-        "Diving", "Chronograph", "Skeleton", "Automatic", "Mechanical"
-    ]
-    
-    watch_colors = [
-        "Black", "Silver", "Gold", "Rose Gold", "Blue", "Green",
-        "White", "Bronze", "Steel", "Titanium"
-    ]
-    
-    products = []
-    
-    # Generate 100 perfumes
-    print("Generating 100 perfumes...")
-    for i in range(100):
-        brand = perfume_brands[i % len(perfume_brands)]
-        frag_type = perfume_types[i % len(perfume_types)]
-        note = perfume_notes[i % len(perfume_notes)]
-        price = 250 + (i * 2 % 150)
-        sale_price = int(price * 0.85)
-        
-        products.append({
-            "id": f"perfume_{i+1:03d}",
-            "title": f"{brand} {frag_type} - {note} Collection {i+1} 100ML",
-            "description": f"Premium {brand} {note} fragrance. {frag_type} 100ML bottle. Long-lasting scent with top notes of {note}. Perfect gift for perfume lovers.",
-            "link": f"https://emirates-gifts.ae/en/product-details.html?id=perfume_{i+1:03d}&category=perfume",
-            "image_link": f"https://via.placeholder.com/300x300/D4AF37/FFFFFF?text={brand}+{i+1}",
-            "price": f"{price:.2f}",
-            "sale_price": f"{sale_price:.2f}",
-            "availability": "in stock",
-            "brand": brand,
-            "category": "Perfume & Fragrance",
-            "condition": "new",
-            "gtin": f"850000{i+1:05d}",
-            "mpn": f"{brand}-{note}-{i+1}",
-            "shipping": "AED 15",
-            "quantity": "100 ML",
-            "material": "Eau de Parfum",
-            "gender": "Unisex"
-        })
-    
-    # Generate 106 watches
-    print("Generating 106 watches...")
-    for i in range(106):
-        brand = watch_brands[i % len(watch_brands)]
-        style = watch_styles[i % len(watch_styles)]
-        color = watch_colors[i % len(watch_colors)]
-        price = 300 + (i * 2 % 200)
-        sale_price = int(price * 0.80)
-        
-        products.append({
-            "id": f"watch_{i+1:03d}",
-            "title": f"{brand} {style} Watch {color} - {i+1} Premium Collection",
-            "description": f"Premium {brand} {style} watch in {color}. Authentic timepiece with Swiss movement. Water resistant up to 100m. Includes warranty and gift box.",
-            "link": f"https://emirates-gifts.ae/en/product-details.html?id=watch_{i+1:03d}&category=watch",
-            "image_link": f"https://via.placeholder.com/300x300/D4AF37/FFFFFF?text={brand}+Watch+{i+1}",
-            "price": f"{price:.2f}",
-            "sale_price": f"{sale_price:.2f}",
-            "availability": "in stock",
-            "brand": brand,
-            "category": "Watches & Accessories",
-            "condition": "new",
-            "gtin": f"860000{i+1:05d}",
-            "mpn": f"{brand}-{style}-{i+1}",
-            "shipping": "AED 20",
-            "quantity": "1",
-            "material": f"{color} Case",
-            "gender": "Unisex"
-        })
-    
-    return products
-
-def create_excel_files():
-    """Create Excel files for English and Arabic versions"""
-    
-    products = generate_products()
-    df = pd.DataFrame(products)
-    
-    # English version
-    print("\nCreating English Excel file...")
-    df.to_excel("Emirates_Gifts_Merchant_Feed_EN.xlsx", sheet_name="Products", index=False)
-    print("✅ Created: Emirates_Gifts_Merchant_Feed_EN.xlsx")
-    
-    # Arabic version
-    print("Creating Arabic Excel file...")
-    df_ar = df.copy()
-    
-    # Translate column headers to Arabic
-    headers_ar = {
-        "id": "معرف",
-        "title": "العنوان",
-        "description": "الوصف",
-        "link": "الرابط",
-        "image_link": "رابط الصورة",
-        "price": "السعر",
-        "sale_price": "سعر البيع",
-        "availability": "التوفر",
-        "brand": "العلامة التجارية",
-        "category": "الفئة",
-        "condition": "الحالة",
-        "gtin": "GTIN",
-        "mpn": "MPN",
-        "shipping": "الشحن",
-        "quantity": "الكمية",
-        "material": "المادة",
-        "gender": "الجنس"
+import os
+import sys
+import csv
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+from json_stream import iter_json_array
+
+CATALOG_FILE = "data/products.json"
+FINGERPRINTS_FILE = ".cache/merchant-feed/fingerprints.json"
+FINGERPRINTS_VERSION = 2
+SITE_URL = "https://emirates-gifts.arabsad.com"
+# Landing page of a catalog item, as in the published product-feed.xml; the
+# catalog "url" field (/products/<id>) is not served by the site
+PRODUCT_PAGES = {"ar": f"{SITE_URL}/product-details.html", "en": f"{SITE_URL}/en/product-details.html"}
+CURRENCY = "AED"
+
+FEED_COLUMNS = [
+    "id", "title", "description", "link", "image_link", "price", "sale_price",
+    "availability", "brand", "google_product_category", "product_type",
+    "condition", "identifier_exists", "shipping",
+]
+
+# Translate column headers to Arabic
+HEADERS_AR = {
+    "id": "معرف",
+    "title": "العنوان",
+    "description": "الوصف",
+    "link": "الرابط",
+    "image_link": "رابط الصورة",
+    "price": "السعر",
+    "sale_price": "سعر البيع",
+    "availability": "التوفر",
+    "brand": "العلامة التجارية",
+    "google_product_category": "فئة Google",
+    "product_type": "الفئة",
+    "condition": "الحالة",
+    "identifier_exists": "يوجد معرف",
+    "shipping": "الشحن",
+}
+
+# Catalog category -> (Google product category, shipping cost, name in AR, name in EN)
+CATEGORIES = {
+    "Perfumes": ("Health & Beauty > Personal Care > Cosmetics > Perfume & Cologne", 15, "عطور", "Perfumes"),
+    "Watches": ("Apparel & Accessories > Jewelry > Watches", 20, "ساعات", "Watches"),
+}
+DEFAULT_CATEGORY = ("Arts & Entertainment > Party & Celebration > Gift Giving", 15, "هدايا", "Gifts")
+
+FEED_INFO = {
+    "ar": {
+        "title": "متجر هدايا الإمارات - كتالوج المنتجات",
+        "description": "جميع منتجات متجر هدايا الإمارات عالية الجودة",
+        "language": "ar-AE",
+    },
+    "en": {
+        "title": "Emirates Gifts Store - Product Feed",
+        "description": "Complete product feed for all Emirates Gifts products including perfumes and watches",
+        "language": "en-AE",
+    },
+}
+
+OUTPUT_FILES = {
+    ("tsv", "en"): "google_merchant_feed_en.tsv",
+    ("tsv", "ar"): "google_merchant_feed_ar.tsv",
+    ("xml", "en"): "product-feed-en.xml",
+    ("xml", "ar"): "product-feed.xml",
+    ("json", "en"): "product-feed-en.json",
+    ("json", "ar"): "product-feed.json",
+    ("xlsx", "en"): "Emirates_Gifts_Merchant_Feed_EN.xlsx",
+    ("xlsx", "ar"): "Emirates_Gifts_Merchant_Feed_AR.xlsx",
+}
+FORMATS = ["tsv", "xml", "json", "xlsx"]
+LANGS = ["en", "ar"]
+
+
+def format_price(value):
+    return f"{float(value):.2f} {CURRENCY}"
+
+
+def product_brand(product):
+    """The catalog brand, or "" when it only repeats a category label ("Perfumes")"""
+    brand = (product.get("brand") or "").strip()
+    if brand in CATEGORIES or brand == product.get("category"):
+        return ""
+    return brand
+
+
+def feed_item(product, lang):
+    """One catalog product as a merchant feed item in the given language"""
+    google_category, shipping, name_ar, name_en = CATEGORIES.get(product.get("category"), DEFAULT_CATEGORY)
+    title = product.get(f"title_{lang}") or product["title"]
+    description = product.get(f"description_{lang}") or product.get("description") or title
+    price = product.get("price")
+    sale_price = product.get("sale_price")
+    if not price:
+        price, sale_price = sale_price, None
+    # Merchant Center rejects items whose sale price is not below the price
+    if sale_price and not float(sale_price) < float(price):
+        sale_price = None
+    return {
+        "id": product["id"],
+        "title": title,
+        "description": description,
+        "link": f"{PRODUCT_PAGES[lang]}?id={quote(str(product['id']))}",
+        "image_link": product.get("image_link", ""),
+        "price": format_price(price or 0),
+        "sale_price": format_price(sale_price) if sale_price else "",
+        "availability": "in stock",
+        # identifier_exists=no allows items without a brand
+        "brand": product_brand(product),
+        "google_product_category": google_category,
+        "product_type": name_ar if lang == "ar" else name_en,
+        "condition": "new",
+        # The catalog has no GTIN/MPN
+        "identifier_exists": "no",
+        "shipping": f"AE:::{shipping:.2f} {CURRENCY}",
+    }
+
+
+def removed_item(item_id):
+    """Supplemental feed row for an item that left the catalog"""
+    item = dict.fromkeys(FEED_COLUMNS, "")
+    item.update(id=item_id, availability="out of stock")
+    return item
+
+
+def delta_path(path):
+    base, ext = os.path.splitext(path)
+    return f"{base}.delta{ext}"
+
+
+def feed_key(fmt, lang):
+    return f"{fmt}/{lang}"
+
+
+def pending_path(path):
+    base, ext = os.path.splitext(path)
+    return f"{base}.pending{ext}"
+
+
+class FeedFingerprints:
+    """
+    Fingerprint of every item emitted per feed: {"tsv/en": {id: fingerprint}}.
+
+    The fingerprint covers all feed fields (price, sale_price, availability,
+    title, image_link, ...), so any change to an item is seen as 'changed'.
+    Each format has its own baseline: a run with --formats tsv must not
+    advance the baseline of the xml feed it did not write.
+
+    save() writes the fingerprints of the run next to the baseline as
+    pending; confirm_upload() makes them the baseline once the files the
+    run wrote were uploaded.
+    """
+
+    def __init__(self, path=FINGERPRINTS_FILE):
+        self.path = path
+        self.previous = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == FINGERPRINTS_VERSION:
+                    self.previous = data.get("items", {})
+            except (OSError, json.JSONDecodeError):
+                self.previous = {}
+        self.current = {}
+
+    def has_baseline(self, feeds):
+        return all(feed in self.previous for feed in feeds)
+
+    @staticmethod
+    def fingerprint(item):
+        data = json.dumps([item[column] for column in FEED_COLUMNS], ensure_ascii=False)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+    def update(self, feed, item_id, fingerprint):
+        """Records the item and returns 'added', 'changed' or None (unchanged)."""
+        self.current.setdefault(feed, {})[item_id] = fingerprint
+        old = self.previous.get(feed, {}).get(item_id)
+        if old is None:
+            return "added"
+        return None if old == fingerprint else "changed"
+
+    def removed(self, feed):
+        current = self.current.get(feed, {})
+        return [item_id for item_id in self.previous.get(feed, {}) if item_id not in current]
+
+    def save(self):
+        items = dict(self.previous, **self.current)
+        path = pending_path(self.path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": FINGERPRINTS_VERSION, "items": items}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def confirm_upload(path=FINGERPRINTS_FILE):
+        """Makes the pending fingerprints of the last run the baseline; False if there are none."""
+        if not os.path.exists(pending_path(path)):
+            return False
+        os.replace(pending_path(path), path)
+        return True
+
+
+def iter_catalog(path=CATALOG_FILE):
+    """Catalog products one at a time, without loading the whole file"""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_json_array(f)
+
+
+class FeedSink:
+    """One output file; written to <path>.tmp and moved into place on success."""
+
+    def __init__(self, path, lang, updated):
+        self.path = path
+        self.lang = lang
+        self.updated = updated
+        self.count = 0
+        self.tmp_path = f"{path}.tmp"
+
+    def open(self):
+        self.f = open(self.tmp_path, "w", encoding="utf-8", newline="")
+        self.begin()
+
+    def write(self, item):
+        self.write_item(item)
+        self.count += 1
+
+    def close(self, ok=True):
+        if ok:
+            self.end()
+        self.f.close()
+        self.finish(ok)
+
+    def finish(self, ok):
+        if ok:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+    def begin(self):
+        pass
+
+    def end(self):
+        pass
+
+
+class TsvSink(FeedSink):
+    def begin(self):
+        self.writer = csv.writer(self.f, delimiter="\t", lineterminator="\n")
+        self.writer.writerow(FEED_COLUMNS)
+
+    def write_item(self, item):
+        # Tabs and newlines are not allowed inside TSV feed values
+        self.writer.writerow([" ".join(str(item[column]).split()) for column in FEED_COLUMNS])
+
+
+class AtomSink(FeedSink):
+    # Feed item field -> g: element
+    G_FIELDS = ["price", "sale_price", "availability", "condition", "brand",
+                "google_product_category", "product_type", "identifier_exists", "image_link"]
+
+    def begin(self):
+        info = FEED_INFO[self.lang]
+        self_link = f"{SITE_URL}/{os.path.basename(self.path)}"
+        self.f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.f.write(f'<feed xmlns="http://www.w3.org/2005/Atom" xmlns:g="http://base.google.com/ns/1.0" xml:lang="{self.lang}">\n')
+        self.f.write(f'  <id>{escape(self_link)}</id>\n')
+        self.f.write(f'  <title>{escape(info["title"])}</title>\n')
+        self.f.write(f'  <link href={quoteattr(SITE_URL + "/")} rel="alternate" type="text/html"/>\n')
+        self.f.write(f'  <link href={quoteattr(self_link)} rel="self" type="application/atom+xml"/>\n')
+        self.f.write(f'  <updated>{self.updated}</updated>\n')
+        self.f.write('  <author>\n    <name>Emirates Gifts Store</name>\n  </author>\n')
+        self.f.write(f'  <subtitle>{escape(info["description"])}</subtitle>\n')
+
+    def write_item(self, item):
+        lines = [
+            "  <entry>",
+            f"    <id>{escape(item['link'])}</id>",
+            f"    <g:id>{escape(item['id'])}</g:id>",
+            f"    <title>{escape(item['title'])}</title>",
+            f"    <link href={quoteattr(item['link'])} rel=\"alternate\" type=\"text/html\"/>",
+            f"    <updated>{self.updated}</updated>",
+            f"    <summary>{escape(item['description'])}</summary>",
+        ]
+        for field in self.G_FIELDS:
+            if item[field]:
+                lines.append(f"    <g:{field}>{escape(item[field])}</g:{field}>")
+        if item["shipping"]:
+            country, _, _, cost = item["shipping"].split(":")
+            lines.append(f"    <g:shipping><g:country>{country}</g:country><g:price>{escape(cost)}</g:price></g:shipping>")
+        lines.append("  </entry>\n")
+        self.f.write("\n".join(lines))
+
+    def end(self):
+        self.f.write("</feed>\n")
+
+
+class JsonSink(FeedSink):
+    # Same layout as json.dumps(..., indent=2) of {"feed_info": ..., "products": [...]},
+    # with the item keys product-feed.json consumers already read
+    # (product key -> feed item field)
+    ITEM_KEYS = {
+        "id": "id", "title": "title", "description": "description", "price": "price",
+        "sale_price": "sale_price", "brand": "brand", "category": "product_type",
+        "image": "image_link", "link": "link", "availability": "availability",
     }
-    
-    df_ar.rename(columns=headers_ar, inplace=True)
-    df_ar.to_excel("Emirates_Gifts_Merchant_Feed_AR.xlsx", sheet_name="المنتجات", index=False)
-    print("✅ Created: Emirates_Gifts_Merchant_Feed_AR.xlsx")
-    
+
+    def begin(self):
+        info = dict(FEED_INFO[self.lang], link=f"{SITE_URL}/", last_updated=self.updated)
+        self.f.write('{\n  "feed_info": ')
+        self.f.write(json.dumps(info, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+        self.f.write(',\n  "products": [')
+
+    def write_item(self, item):
+        self.f.write("," if self.count else "")
+        product = {key: item[field] for key, field in self.ITEM_KEYS.items()}
+        self.f.write("\n    " + json.dumps(product, ensure_ascii=False, indent=2).replace("\n", "\n    "))
+
+    def end(self):
+        self.f.write("\n  ]\n}\n" if self.count else "]\n}\n")
+
+
+class XlsxSink(FeedSink):
+    """Write-only workbook: rows are streamed to disk instead of kept in memory"""
+
+    def open(self):
+        from openpyxl import Workbook
+
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("المنتجات" if self.lang == "ar" else "Products")
+        if self.lang == "ar":
+            self.sheet.sheet_view.rightToLeft = True
+            self.sheet.append([HEADERS_AR[column] for column in FEED_COLUMNS])
+        else:
+            self.sheet.append(FEED_COLUMNS)
+
+    def write_item(self, item):
+        self.sheet.append([item[column] for column in FEED_COLUMNS])
+
+    def close(self, ok=True):
+        # Saving also finishes the streamed sheet; the file is dropped again if the run failed
+        self.workbook.save(self.tmp_path)
+        self.finish(ok)
+
+
+SINKS = {"tsv": TsvSink, "xml": AtomSink, "json": JsonSink, "xlsx": XlsxSink}
+
+
+def generate_feeds(catalog_path=CATALOG_FILE, formats=FORMATS, langs=LANGS, output_dir=".",
+                   full=False, fingerprints_path=FINGERPRINTS_FILE):
+    """Stream every catalog product once into all the requested feed files.
+
+    Without a fingerprint baseline for every requested feed (or with
+    full=True) the full feeds are written; otherwise only the .delta feeds
+    with the items added, changed and removed since each feed was last
+    written. Returns (mode, sinks, changes), changes keyed by "fmt/lang".
+    """
+    fingerprints = FeedFingerprints(fingerprints_path)
+    feeds = {feed_key(fmt, lang): (fmt, lang) for fmt in formats for lang in langs}
+    mode = "full" if full or not fingerprints.has_baseline(feeds) else "delta"
+    updated = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    sinks = {}
+    for feed, (fmt, lang) in feeds.items():
+        path = os.path.join(output_dir, OUTPUT_FILES[(fmt, lang)])
+        sinks[feed] = SINKS[fmt](delta_path(path) if mode == "delta" else path, lang, updated)
+    changes = {feed: {"added": 0, "changed": 0, "removed": 0} for feed in feeds}
+
+    opened = []
+    ok = False
+    try:
+        for sink in sinks.values():
+            sink.open()
+            opened.append(sink)
+        for product in iter_catalog(catalog_path):
+            for lang in langs:
+                item = feed_item(product, lang)
+                fingerprint = fingerprints.fingerprint(item)
+                for feed, sink in sinks.items():
+                    if sink.lang != lang:
+                        continue
+                    status = fingerprints.update(feed, item["id"], fingerprint)
+                    if status:
+                        changes[feed][status] += 1
+                    if mode == "full" or status:
+                        sink.write(item)
+        for feed, sink in sinks.items():
+            removed = fingerprints.removed(feed)
+            changes[feed]["removed"] = len(removed)
+            if mode == "delta":
+                for item_id in removed:
+                    sink.write(removed_item(item_id))
+        ok = True
+    finally:
+        for sink in opened:
+            sink.close(ok)
+    fingerprints.save()
+    return mode, list(sinks.values()), changes
+
+
+def _name_list(choices):
+    def parse(value):
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in choices]
+        if unknown:
+            raise argparse.ArgumentTypeError(f"unknown: {', '.join(unknown)} (choices: {', '.join(choices)})")
+        return names
+    return parse
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the Google Merchant feeds from data/products.json")
+    parser.add_argument("--catalog", default=CATALOG_FILE, help=f"catalog JSON array (default: {CATALOG_FILE})")
+    parser.add_argument("--formats", type=_name_list(FORMATS), default=FORMATS,
+                        help=f"comma separated output formats (default: {','.join(FORMATS)})")
+    parser.add_argument("--langs", type=_name_list(LANGS), default=LANGS,
+                        help=f"comma separated feed languages (default: {','.join(LANGS)})")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--full", action="store_true",
+                        help="write the full feeds even when a fingerprint baseline exists")
+    parser.add_argument("--fingerprints", default=FINGERPRINTS_FILE,
+                        help=f"per-item fingerprints of the last uploaded feeds (default: {FINGERPRINTS_FILE})")
+    parser.add_argument("--confirm-upload", action="store_true",
+                        help="the files of the last run were uploaded: make its fingerprints the delta baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.confirm_upload:
+        if not FeedFingerprints.confirm_upload(args.fingerprints):
+            print(f"❌ No pending fingerprints in {pending_path(args.fingerprints)}; run the generator first")
+            return 1
+        print(f"✅ Delta baseline advanced: {args.fingerprints}")
+        return 0
+
+    print(f"Generating merchant feeds from {args.catalog}...")
+    mode, sinks, changes = generate_feeds(args.catalog, args.formats, args.langs, args.output_dir,
+                                          args.full, args.fingerprints)
+
     print("\n" + "="*60)
-    print("✅ Excel files generated successfully!")
+    print(f"✅ {'Full' if mode == 'full' else 'Supplemental (delta)'} feed files generated successfully!")
     print("="*60)
+    for feed, counts in changes.items():
+        print(f"  {feed.upper()}: {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed")
     print(f"\nFiles created:")
-    print(f"  📊 Emirates_Gifts_Merchant_Feed_EN.xlsx (206 products)")
-    print(f"  📊 Emirates_Gifts_Merchant_Feed_AR.xlsx (206 products)")
+    for sink in sinks:
+        print(f"  📊 {sink.path} ({sink.count} products)")
     print(f"\nDate: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("After uploading these files, run with --confirm-upload to advance the delta baseline.")
+    return 0
+
 
 if __name__ == "__main__":
     try:
-        create_excel_files()
+        sys.exit(main())
     except Exception as e:
         print(f"❌ Error: {e}")
-        print("\nMake sure you have pandas installed:")
-        print("  pip install pandas openpyxl")
+        print("\nMake sure you have openpyxl installed:")
+        print("  pip install openpyxl")
@@ -2,6 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import sys
+import os
+import re
+import gzip
+import hashlib
+import argparse
 import pathlib
 import json
 import subprocess
@@ -9,14 +14,114 @@ from datetime import datetime, timezone
 from urllib.parse import urljoin, quote
 from xml.etree.ElementTree import Element, SubElement, tostring as xml_tostring
 from xml.dom import minidom
+from xml.sax.saxutils import escape as xml_escape, quoteattr as xml_quoteattr
 
 BASE_URL = ""
+DIST_DIR = pathlib.Path("dist")
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+XHTML_NS = "http://www.w3.org/1999/xhtml"
+# حدود بروتوكول sitemaps.org لكل ملف (قبل الضغط)
+MAX_URLS_PER_SITEMAP = 50000
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+# سجل البصمات (URL -> hash -> lastmod) في .cache/ مع باقي الذاكرة المؤقتة (لا يُنشر ولا يُرفع إلى git)
+MANIFEST_PATH = pathlib.Path(".cache/sitemap/manifest.json")
+# مكانه القديم في المجلد الحالي: يُقرأ مرة واحدة حتى لا تتغير قيم lastmod، ثم يُحذف
+LEGACY_MANIFEST_PATH = pathlib.Path(".sitemap-manifest.json")
+MANIFEST_VERSION = 1
+
+# أجزاء الصفحة التي لا تغيّر المحتوى المرئي (سكيما، سكربتات، تعليقات)
+_INVISIBLE_RE = re.compile(
+    rb"<!--.*?-->|<script\b[^>]*>.*?</script\s*>|<style\b[^>]*>.*?</style\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+_BETWEEN_TAGS_RE = re.compile(rb">\s+<")
+_WHITESPACE_RE = re.compile(rb"\s+")
 
 def get_file_mtime_iso(path: pathlib.Path) -> str:
     """Return file modification time in ISO-8601 UTC format."""
     dt = datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc).replace(microsecond=0)
     return dt.isoformat()
 
+def normalize_page_content(raw: bytes) -> bytes:
+    """Strips comments, scripts, styles and formatting whitespace from a page."""
+    content = _INVISIBLE_RE.sub(b"", raw)
+    content = _BETWEEN_TAGS_RE.sub(b"><", content)
+    return _WHITESPACE_RE.sub(b" ", content).strip()
+
+def page_content_hash(path: pathlib.Path) -> str:
+    """SHA-256 of the normalized page content."""
+    return hashlib.sha256(normalize_page_content(path.read_bytes())).hexdigest()
+
+class SitemapManifest:
+    """Persisted URL -> content hash -> lastmod map used for incremental runs.
+
+    lastmod is only bumped when the normalized content of a page changes,
+    so bulk rewrites of products/*.html by the schema scripts do not touch
+    it. Pages whose size and mtime did not change are not re-read at all.
+    Shard digests let SitemapWriter leave unchanged sitemap files alone.
+    """
+
+    def __init__(self, path: pathlib.Path = MANIFEST_PATH):
+        self.path = path
+        self.urls = {}
+        self.shards = {}
+        self._old_urls = {}
+        self._old_shards = {}
+        if not path.exists() and path == MANIFEST_PATH and LEGACY_MANIFEST_PATH.exists():
+            path = LEGACY_MANIFEST_PATH
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Warning: ignoring unreadable manifest {path}: {e}", file=sys.stderr)
+                data = {}
+            if data.get("version") == MANIFEST_VERSION:
+                self._old_urls = data.get("urls", {})
+                self._old_shards = data.get("shards", {})
+
+    def lastmod_for(self, loc: str, path: pathlib.Path) -> str:
+        """Returns the lastmod of a page, bumping it only on content changes."""
+        st = path.stat()
+        old = self._old_urls.get(loc)
+        if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+            content_hash = old["hash"]
+        else:
+            content_hash = page_content_hash(path)
+
+        if old and old.get("hash") == content_hash:
+            lastmod = old["lastmod"]
+        else:
+            lastmod = get_file_mtime_iso(path)
+
+        self.urls[loc] = {
+            "hash": content_hash,
+            "lastmod": lastmod,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+        return lastmod
+
+    def previous_shard(self, name: str) -> dict:
+        return self._old_shards.get(name, {})
+
+    def record_shard(self, name: str, digest: str, lastmod: str):
+        self.shards[name] = {"digest": digest, "lastmod": lastmod}
+
+    def save(self):
+        data = {
+            "version": MANIFEST_VERSION,
+            "urls": dict(sorted(self.urls.items())),
+            "shards": dict(sorted(self.shards.items())),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        if self.path == MANIFEST_PATH and LEGACY_MANIFEST_PATH.exists():
+            LEGACY_MANIFEST_PATH.unlink()
+
 def ensure_trailing_slash(u: str) -> str:
     return u if u.endswith("/") else u + "/"
 
@@ -31,12 +136,213 @@ def build_url(base_url: str, products_dir: pathlib.Path, file_path: pathlib.Path
     products_base = urljoin(ensure_trailing_slash(base_url), "product/")
     return urljoin(products_base, quote(rel_path, safe="/-_.~"))
 
+def product_loc(products_dir: pathlib.Path, file_path: pathlib.Path, lang_prefix: str = "") -> str:
+    """Builds the public URL of a product page.
+
+    Nested pages (products/watch/watch_1/index.html) map to the clean
+    /product/watch/watch_1/ route; flat pages (products/ARIAF.html) keep
+    their /products/ARIAF.html path. lang_prefix is "en/" for English pages.
+    """
+    base = urljoin(ensure_trailing_slash(BASE_URL), lang_prefix)
+    if file_path.name == "index.html" and file_path.parent != products_dir:
+        rel_path = file_path.relative_to(products_dir).parent.as_posix()
+        return urljoin(base, f"product/{quote(rel_path, safe='/-_.~')}/")
+    rel_path = file_path.relative_to(products_dir).as_posix()
+    return urljoin(base, f"products/{quote(rel_path, safe='/-_.~')}")
+
+def product_slug(products_dir: pathlib.Path, file_path: pathlib.Path) -> str:
+    """Language-independent key of a product page (path without .html / index)."""
+    rel_path = file_path.relative_to(products_dir)
+    if rel_path.name == "index.html" and rel_path.parent != pathlib.Path("."):
+        return rel_path.parent.as_posix()
+    return rel_path.with_suffix("").as_posix()
+
+def build_product_pairing_index(language_dirs: dict) -> dict:
+    """Scans every language tree once and pairs pages by slug.
+
+    language_dirs maps a hreflang code to its products directory, e.g.
+    {"ar": products/, "en": en/products/}. Returns {slug: {lang: path}}
+    sorted by slug.
+    """
+    index = {}
+    for lang, products_dir in language_dirs.items():
+        if not products_dir.exists():
+            continue
+        for f in products_dir.rglob("*.html"):
+            index.setdefault(product_slug(products_dir, f), {})[lang] = f
+    return dict(sorted(index.items()))
+
+def report_unpaired_products(index: dict, languages, limit: int = 10):
+    """Prints the product pages that have no counterpart in another language."""
+    for lang in languages:
+        missing = [slug for slug, pages in index.items() if lang not in pages]
+        if not missing:
+            continue
+        print(f"Warning: {len(missing)} product page(s) have no '{lang}' version:", file=sys.stderr)
+        for slug in missing[:limit]:
+            print(f"  - {slug}", file=sys.stderr)
+        if len(missing) > limit:
+            print(f"  ... and {len(missing) - limit} more", file=sys.stderr)
+
+class SitemapWriter:
+    """Streams <url> entries straight to disk, one shard at a time.
+
+    A new shard is started whenever the next entry would exceed
+    MAX_URLS_PER_SITEMAP or MAX_SITEMAP_BYTES, so memory use does not
+    depend on the number of URLs. Shards are named <stem>.xml,
+    <stem>-2.xml, ... (with a .gz suffix when gzip output is enabled).
+
+    Each shard is written to a temporary file and only moved into place
+    when its entries differ from the digest recorded in the manifest.
+    """
+
+    def __init__(self, out_dir: pathlib.Path, stem: str, use_gzip: bool = False,
+                 with_xhtml: bool = False, max_urls: int = MAX_URLS_PER_SITEMAP,
+                 max_bytes: int = MAX_SITEMAP_BYTES, manifest: SitemapManifest = None):
+        self.out_dir = out_dir
+        self.manifest = manifest
+        self.stem = stem
+        self.use_gzip = use_gzip
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        ns = f' xmlns="{SITEMAP_NS}"'
+        if with_xhtml:
+            ns += f' xmlns:xhtml="{XHTML_NS}"'
+        self._header = f'<?xml version="1.0" encoding="utf-8"?>\n<urlset{ns}>\n'.encode("utf-8")
+        self._footer = b"</urlset>\n"
+        self._fh = None
+        self._raw = None
+        self._path = None
+        self._tmp_path = None
+        self._digest = None
+        self._lastmod = ""
+        self._urls = 0
+        self._bytes = 0
+        self.shards = []
+        self.shard_lastmods = {}
+        self.total_urls = 0
+        self.skipped_shards = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _shard_path(self, number: int) -> pathlib.Path:
+        suffix = ".xml.gz" if self.use_gzip else ".xml"
+        name = self.stem if number == 1 else f"{self.stem}-{number}"
+        return self.out_dir / f"{name}{suffix}"
+
+    def _open_shard(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._path = self._shard_path(len(self.shards) + 1)
+        self._tmp_path = self._path.with_name(self._path.name + ".tmp")
+        self._raw = open(self._tmp_path, "wb")
+        # mtime=0 keeps gzip output byte-stable between runs
+        self._fh = gzip.GzipFile(filename="", mode="wb", fileobj=self._raw, mtime=0) if self.use_gzip else self._raw
+        self._fh.write(self._header)
+        self._digest = hashlib.sha256()
+        self._lastmod = ""
+        self._urls = 0
+        self._bytes = len(self._header) + len(self._footer)
+
+    def _close_shard(self):
+        if self._fh is None:
+            return
+        self._fh.write(self._footer)
+        self._fh.close()
+        if self._raw is not self._fh:
+            self._raw.close()
+
+        name = self._path.name
+        digest = self._digest.hexdigest()
+        lastmod = self._lastmod
+        previous = self.manifest.previous_shard(name) if self.manifest else {}
+        if previous.get("digest") == digest and self._path.exists():
+            # نفس المدخلات: لا داعي لإعادة كتابة الملف
+            self._tmp_path.unlink()
+            lastmod = previous.get("lastmod") or lastmod
+            self.skipped_shards += 1
+        else:
+            os.replace(self._tmp_path, self._path)
+        if self.manifest:
+            self.manifest.record_shard(name, digest, lastmod)
+
+        self.shards.append(self._path)
+        self.shard_lastmods[self._path] = lastmod
+        self._fh = None
+        self._raw = None
+        self._path = None
+        self._tmp_path = None
+
+    def add(self, loc: str, lastmod: str = None, changefreq: str = None,
+            priority: str = None, alternates=()):
+        """Writes one <url> entry; alternates is an iterable of (hreflang, href)."""
+        parts = ["  <url>\n", f"    <loc>{xml_escape(loc)}</loc>\n"]
+        if lastmod:
+            parts.append(f"    <lastmod>{xml_escape(lastmod)}</lastmod>\n")
+        if changefreq:
+            parts.append(f"    <changefreq>{xml_escape(changefreq)}</changefreq>\n")
+        if priority:
+            parts.append(f"    <priority>{xml_escape(priority)}</priority>\n")
+        for hreflang, href in alternates:
+            parts.append(
+                f'    <xhtml:link rel="alternate" hreflang={xml_quoteattr(hreflang)} href={xml_quoteattr(href)}/>\n'
+            )
+        parts.append("  </url>\n")
+        entry = "".join(parts).encode("utf-8")
+
+        if self._fh is not None and (self._urls >= self.max_urls or self._bytes + len(entry) > self.max_bytes):
+            self._close_shard()
+        if self._fh is None:
+            self._open_shard()
+        self._fh.write(entry)
+        self._digest.update(entry)
+        if lastmod and lastmod > self._lastmod:
+            self._lastmod = lastmod
+        self._urls += 1
+        self._bytes += len(entry)
+        self.total_urls += 1
+
+    def close(self):
+        """Finishes the current shard and returns the list of shard paths."""
+        self._close_shard()
+        return self.shards
+
 def prettify_xml(elem: Element) -> bytes:
     """Renders an XML element to a pretty-printed string."""
     rough_string = xml_tostring(elem, 'utf-8')
     reparsed = minidom.parseString(rough_string)
     return reparsed.toprettyxml(indent="  ", encoding="utf-8")
 
+def write_if_changed(path: pathlib.Path, data: bytes) -> bool:
+    """Writes data unless the file already holds the same bytes."""
+    if path.exists() and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return True
+
+def sitemap_url(path: pathlib.Path) -> str:
+    """Public URL of a generated sitemap file, as listed in the index."""
+    return urljoin(ensure_trailing_slash(BASE_URL), path.name)
+
+def remove_stale_shards(out_dir: pathlib.Path, stem: str, listed_urls) -> list:
+    """Deletes <stem>.xml / <stem>-N.xml shards (or .xml.gz) the index no longer lists.
+
+    A smaller catalog, or switching --gzip on or off, leaves the old shards
+    in dist/ where they would still be published with outdated URLs.
+    """
+    shard_re = re.compile(rf"{re.escape(stem)}(?:-\d+)?\.xml(?:\.gz)?")
+    listed = set(listed_urls)
+    removed = []
+    for path in sorted(out_dir.glob(f"{stem}*")):
+        if shard_re.fullmatch(path.name) and sitemap_url(path) not in listed:
+            path.unlink()
+            removed.append(path)
+    return removed
+
 def get_base_url_from_config():
     """Reads the base_url from seo_config.json."""
     global BASE_URL
@@ -51,39 +357,56 @@ def get_base_url_from_config():
         print("Error: base_url not found in seo_config.json", file=sys.stderr)
         sys.exit(1)
 
-def generate_product_sitemap():
-    """Generates sitemap for product detail pages."""
-    products_dir = pathlib.Path("products")
-    if not products_dir.exists():
+def generate_product_sitemap(manifest: SitemapManifest, use_gzip: bool = False):
+    """Generates sitemap shards for Arabic and English product detail pages.
+
+    products/ and en/products/ are scanned once and paired by slug; paired
+    pages get ar/en/x-default xhtml:link alternates on both entries.
+    """
+    language_dirs = {
+        "ar": pathlib.Path("products"),
+        "en": pathlib.Path("en") / "products",
+    }
+    lang_prefixes = {"ar": "", "en": "en/"}
+    if not language_dirs["ar"].exists():
         print("Warning: Missing products/ directory, skipping product sitemap.", file=sys.stderr)
         return []
 
-    urlset = Element("urlset", attrib={"xmlns": "http://www.sitemaps.org/schemas/sitemap/0.9"})
-    
-    product_files = sorted(products_dir.rglob("*.html"))
-    if not product_files:
+    index = build_product_pairing_index(language_dirs)
+    if not index:
         print("No product HTML files found, skipping product sitemap.", file=sys.stderr)
         return []
 
-    for f in product_files:
-        # Generate clean URL: /product/watch/watch_1/
-        rel_path = f.relative_to(products_dir).parent.as_posix()
-        loc = urljoin(ensure_trailing_slash(BASE_URL), f"product/{rel_path}/")
-        
-        lastmod = get_file_mtime_iso(f)
-        
-        url_element = SubElement(urlset, "url")
-        SubElement(url_element, "loc").text = loc
-        SubElement(url_element, "lastmod").text = lastmod
-        SubElement(url_element, "changefreq").text = "weekly"
-        SubElement(url_element, "priority").text = "0.8"
-
-    sitemap_path = pathlib.Path("dist/sitemap-products.xml")
-    sitemap_path.write_bytes(prettify_xml(urlset))
-    print(f"Generated {len(product_files)} URLs in {sitemap_path}")
-    return [urljoin(BASE_URL, sitemap_path.name)]
-
-def generate_static_pages_sitemap():
+    paired = 0
+    with SitemapWriter(DIST_DIR, "sitemap-products", use_gzip=use_gzip,
+                       with_xhtml=True, manifest=manifest) as writer:
+        for slug, pages in index.items():
+            locs = {
+                lang: product_loc(language_dirs[lang], path, lang_prefixes[lang])
+                for lang, path in pages.items()
+            }
+            alternates = ()
+            if len(locs) > 1:
+                paired += 1
+                alternates = [("en", locs["en"]), ("ar", locs["ar"]), ("x-default", locs["ar"])]
+            for lang, path in pages.items():
+                writer.add(
+                    locs[lang],
+                    lastmod=manifest.lastmod_for(locs[lang], path),
+                    changefreq="weekly",
+                    priority="0.8",
+                    alternates=alternates,
+                )
+
+    present = [lang for lang, d in language_dirs.items() if d.exists()]
+    for lang in language_dirs.keys() - set(present):
+        print(f"Note: {language_dirs[lang]}/ not found, no '{lang}' alternates emitted.", file=sys.stderr)
+    report_unpaired_products(index, present)
+    print(f"Generated {writer.total_urls} URLs ({paired} ar/en pairs) in {len(writer.shards)}"
+          f" product sitemap file(s) ({writer.skipped_shards} unchanged)")
+    return [(sitemap_url(path), writer.shard_lastmods[path]) for path in writer.shards]
+
+def generate_static_pages_sitemap(manifest: SitemapManifest):
     """Generates sitemap for static pages like index.html, about.html, etc."""
     urlset = Element("urlset", attrib={"xmlns": "http://www.sitemaps.org/schemas/sitemap/0.9", "xmlns:xhtml": "http://www.w3.org/1999/xhtml"})
     
@@ -97,6 +420,7 @@ def generate_static_pages_sitemap():
         {"path": "return-policy.html", "priority": "0.5", "freq": "monthly"},
     ]
 
+    newest = ""
     for page in static_pages:
         ar_path = pathlib.Path(page["path"])
         en_path = pathlib.Path("en") / page["path"]
@@ -108,7 +432,8 @@ def generate_static_pages_sitemap():
             # Entry for Arabic URL
             url_ar = SubElement(urlset, "url")
             SubElement(url_ar, "loc").text = ar_loc
-            SubElement(url_ar, "lastmod").text = get_file_mtime_iso(ar_path)
+            ar_lastmod = manifest.lastmod_for(ar_loc, ar_path)
+            SubElement(url_ar, "lastmod").text = ar_lastmod
             SubElement(url_ar, "changefreq").text = page["freq"]
             SubElement(url_ar, "priority").text = page["priority"]
             SubElement(url_ar, "xhtml:link", rel="alternate", hreflang="en", href=en_loc)
@@ -118,51 +443,71 @@ def generate_static_pages_sitemap():
             # Entry for English URL
             url_en = SubElement(urlset, "url")
             SubElement(url_en, "loc").text = en_loc
-            SubElement(url_en, "lastmod").text = get_file_mtime_iso(en_path)
+            en_lastmod = manifest.lastmod_for(en_loc, en_path)
+            SubElement(url_en, "lastmod").text = en_lastmod
             SubElement(url_en, "changefreq").text = page["freq"]
             SubElement(url_en, "priority").text = page["priority"]
             SubElement(url_en, "xhtml:link", rel="alternate", hreflang="en", href=en_loc)
             SubElement(url_en, "xhtml:link", rel="alternate", hreflang="ar", href=ar_loc)
             SubElement(url_en, "xhtml:link", rel="alternate", hreflang="x-default", href=ar_loc)
+            newest = max(newest, ar_lastmod, en_lastmod)
 
-    sitemap_path = pathlib.Path("dist/sitemap-pages.xml")
-    sitemap_path.write_bytes(prettify_xml(urlset))
+    sitemap_path = DIST_DIR / "sitemap-pages.xml"
+    write_if_changed(sitemap_path, prettify_xml(urlset))
     print(f"Generated {len(static_pages) * 2} static page URLs in {sitemap_path}")
-    return [urljoin(BASE_URL, sitemap_path.name)]
+    return [(sitemap_url(sitemap_path), newest)]
 
 def generate_sitemap_index(sitemap_files: list):
-    """Generates the main sitemap index file."""
+    """Generates the main sitemap index file from (url, lastmod) pairs.
+
+    Returns False when there is nothing to index (no index is written).
+    """
     if not sitemap_files:
         print("No sitemaps to index.", file=sys.stderr)
-        return
+        return False
 
     sitemapindex = Element("sitemapindex", attrib={"xmlns": "http://www.sitemaps.org/schemas/sitemap/0.9"})
     
-    for sitemap_url in sitemap_files:
+    for loc, lastmod in sitemap_files:
         sitemap_element = SubElement(sitemapindex, "sitemap")
-        SubElement(sitemap_element, "loc").text = sitemap_url
-        # lastmod is optional in sitemap index, but good practice
-        # For simplicity, we use today's date
-        SubElement(sitemap_element, "lastmod").text = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        SubElement(sitemap_element, "loc").text = loc
+        # lastmod comes from the newest entry of each sitemap, so it only
+        # moves when one of its pages actually changed
+        if lastmod:
+            SubElement(sitemap_element, "lastmod").text = lastmod
 
-    index_path = pathlib.Path("dist/sitemap-index.xml")
-    index_path.write_bytes(prettify_xml(sitemapindex))
+    index_path = DIST_DIR / "sitemap-index.xml"
+    write_if_changed(index_path, prettify_xml(sitemapindex))
     print(f"Generated sitemap index at {index_path} with {len(sitemap_files)} entries.")
+    return True
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate sitemap files into dist/.")
+    parser.add_argument("--gzip", action="store_true",
+                        help="write product sitemap shards as .xml.gz")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
     print("🚀 Starting sitemap generation...")
     get_base_url_from_config()
     
+    manifest = SitemapManifest(MANIFEST_PATH)
     all_sitemaps = []
-    all_sitemaps.extend(generate_static_pages_sitemap())
-    all_sitemaps.extend(generate_product_sitemap())
+    all_sitemaps.extend(generate_static_pages_sitemap(manifest))
+    all_sitemaps.extend(generate_product_sitemap(manifest, use_gzip=args.gzip))
     
     # Add other sitemaps if they exist
-    hreflang_path = pathlib.Path("dist/hreflang-sitemap.xml")
+    hreflang_path = DIST_DIR / "hreflang-sitemap.xml"
     if hreflang_path.exists():
-        all_sitemaps.append(urljoin(BASE_URL, hreflang_path.name))
+        all_sitemaps.append((sitemap_url(hreflang_path), get_file_mtime_iso(hreflang_path)))
 
-    generate_sitemap_index(all_sitemaps)
+    if generate_sitemap_index(all_sitemaps):
+        # Only once the new index is in place, so it never lists a missing shard
+        removed = remove_stale_shards(DIST_DIR, "sitemap-products", (loc for loc, _ in all_sitemaps))
+        if removed:
+            print(f"Removed {len(removed)} stale product sitemap file(s): {', '.join(p.name for p in removed)}")
+    manifest.save()
     print("✅ Sitemap generation complete.")
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تعديل منطقة <head> فقط في نص صفحة HTML.
+
+السكربتات التي تعدّل السكيما بالتعابير النمطية (fix-product-schema.py و
+enhance-jsonld-schema.py) كانت تشغّل كل re.sub على الصفحة كاملة وتعيد بناء النص
+عدة مرات. HeadSplice يحدد موضع <head> مرة واحدة، وتعمل كل عمليات البحث والحذف
+والإضافة على نص <head> فقط، ثم تُكتب الصفحة بلصق واحد: ما قبل <head>، ثم <head>
+الجديد، ثم باقي الصفحة كما هو بدون البحث فيه.
+"""
+
+import re
+
+HEAD_OPEN_RE = re.compile(r'<head(?:\s[^>]*)?>', re.IGNORECASE)
+HEAD_CLOSE_RE = re.compile(r'</head\s*>', re.IGNORECASE)
+
+
+def find_head_region(html_text):
+    """موضع <head>...</head> في النص، أو None إذا لم يوجد."""
+    open_m = HEAD_OPEN_RE.search(html_text)
+    if not open_m:
+        return None
+    close_m = HEAD_CLOSE_RE.search(html_text, open_m.end())
+    if not close_m:
+        return None
+    return open_m.start(), close_m.end()
+
+
+class HeadSplice:
+    """نص <head> قابل للتعديل، مع موضعه في الصفحة الأصلية."""
+
+    def __init__(self, html_text):
+        self.html = html_text
+        region = find_head_region(html_text)
+        if region is None:
+            self.start = self.end = None
+            self.head = None
+            self._close_at = None
+        else:
+            self.start, self.end = region
+            self.head = html_text[self.start:self.end]
+            self._close_at = self.head.rfind('</')
+        self.changed = False
+
+    @property
+    def found(self):
+        return self.head is not None
+
+    def search(self, pattern, flags=0):
+        if self.head is None:
+            return None
+        return re.search(pattern, self.head, flags)
+
+    def findall(self, pattern, flags=0):
+        if self.head is None:
+            return []
+        return re.findall(pattern, self.head, flags)
+
+    def sub(self, pattern, repl, flags=0):
+        """re.sub داخل <head> فقط؛ تعيد عدد الاستبدالات."""
+        if self.head is None:
+            return 0
+        head, count = re.subn(pattern, repl, self.head, flags=flags)
+        if count:
+            self._set(head)
+        return count
+
+    def insert_before_close(self, text):
+        """إضافة نص قبل </head> مباشرة. تعيد False إذا لم يوجد <head>."""
+        if self.head is None:
+            return False
+        self._set(self.head[:self._close_at] + text + self.head[self._close_at:])
+        return True
+
+    def _set(self, head):
+        self.head = head
+        self._close_at = head.rfind('</')
+        self.changed = True
+
+    def text(self):
+        """نص الصفحة كاملًا بعد التعديل."""
+        if not self.changed:
+            return self.html
+        return self.html[:self.start] + self.head + self.html[self.end:]
+
+    def write(self, path):
+        """كتابة الصفحة بلصق واحد، بدون بناء نص الصفحة كاملًا في الذاكرة.
+
+        مثل write_if_changed في generate_from_excel.py: إذا كان الملف على القرص
+        مطابقًا بايت ببايت لا يُلمس، فلا يتغير mtime (الذي يعتمد عليه الـ sitemap).
+        تعيد True إذا كُتب الملف.
+        """
+        if self.changed:
+            parts = [self.html[:self.start], self.head, self.html[self.end:]]
+        else:
+            parts = [self.html]
+        parts = [part.encode('utf-8') for part in parts]
+        try:
+            with open(path, 'rb') as f:
+                existing = f.read()
+        except FileNotFoundError:
+            existing = None
+        if existing is not None and _same_bytes(existing, parts):
+            return False
+        with open(path, 'wb') as f:
+            for part in parts:
+                f.write(part)
+        return True
+
+
+def _same_bytes(data, parts):
+    """هل data تساوي ربط parts؟ (بدون نسخها في نص واحد)"""
+    if len(data) != sum(len(part) for part in parts):
+        return False
+    pos = 0
+    for part in parts:
+        if not data.startswith(part, pos):
+            return False
+        pos += len(part)
+    return True
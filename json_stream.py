@@ -0,0 +1,77 @@
+"""
+Streaming reader for large top-level JSON arrays (reviews, catalog).
+
+Kept apart from the scripts that use it so that importing it is cheap.
+"""
+
+import json
+
+READ_CHUNK_SIZE = 1 << 16
+_WHITESPACE = ' \t\n\r'
+_ITEM_END = _WHITESPACE + ',]'
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yields the items of a top-level JSON array one at a time.
+
+    The file is read in chunks and each item is decoded as soon as it is
+    complete, so only one item (plus one chunk) is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    fill()
+    skip_whitespace()
+    if buffer[pos:pos + 1] != '[':
+        raise json.JSONDecodeError("Expected a JSON array", buffer, pos)
+    pos += 1
+
+    first = True
+    while True:
+        skip_whitespace()
+        if buffer[pos:pos + 1] == ']':
+            return
+        if not first:
+            if buffer[pos:pos + 1] != ',':
+                raise json.JSONDecodeError("Expected ',' or ']'", buffer, pos)
+            pos += 1
+            skip_whitespace()
+        first = False
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The item continues in the next chunk
+                if eof:
+                    raise
+                fill()
+                continue
+            # A number cut by the chunk boundary ("1.5" of "1.5e3") decodes too,
+            # so the item is complete only once a delimiter follows it
+            if not eof and (end == len(buffer) or buffer[end] not in _ITEM_END):
+                fill()
+                continue
+            break
+        pos = end
+        yield item
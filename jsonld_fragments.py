@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+أجزاء JSON-LD مشتركة تُسلسل مرة واحدة في كل تشغيل.
+
+سكيما LocalBusiness وكائنات brand/seller تعتمد على seo_config.json فقط، وكتلة
+المراجعات في enhance-jsonld-schema.py تعتمد على الفئة فقط؛ لذلك تُبنى مرة واحدة
+عبر shared()، ويحفظ كل جزء نصه المُسلسل لكل مستوى إزاحة. dumps() تسلسل باقي
+السكيما الخاصة بالصفحة ثم تلصق نصوص الأجزاء الجاهزة في أماكنها، والناتج مطابق
+بايت ببايت لـ json.dumps(schema, ensure_ascii=False, indent=2).
+
+الوضع المضغوط (compact=True) يكتب JSON بدون إزاحة أو مسافات لتصغير <head>.
+"""
+
+import re
+import json
+
+INDENT = 2
+COMPACT_SEPARATORS = (',', ':')
+# نص مؤقت مكان كل جزء؛ json.dumps يكتب المحرف \0 بصيغة \u0000 فلا يتعارض مع أي نص حقيقي
+PLACEHOLDER_RE = re.compile(r'"\\u0000(\d+)"')
+LEADING_SPACES_RE = re.compile(r' *')
+
+
+class Fragment:
+    """قيمة JSON ثابتة مع نصها المُسلسل مخزنًا لكل (وضع، إزاحة)."""
+
+    def _serialized(self, compact, level):
+        cache = self.__dict__.setdefault('_texts', {})
+        key = (compact, level)
+        if key not in cache:
+            if compact:
+                text = json.dumps(self, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+            else:
+                text = json.dumps(self, ensure_ascii=False, indent=INDENT).replace("\n", "\n" + " " * level)
+            cache[key] = text
+        return cache[key]
+
+
+class DictFragment(Fragment, dict):
+    pass
+
+
+class ListFragment(Fragment, list):
+    pass
+
+
+def freeze(value):
+    """تحويل dict/list إلى جزء ثابت (يبقى dict/list عاديًا عند القراءة)."""
+    if isinstance(value, Fragment):
+        return value
+    return DictFragment(value) if isinstance(value, dict) else ListFragment(value)
+
+
+_SHARED = {}
+
+
+def shared(key, build, owner=None):
+    """الجزء المشترك للمفتاح key، يُبنى بـ build() عند أول طلب فقط.
+
+    build() تعيد dict/list (يصبح جزءًا ثابتًا) أو tuple من أجزاء جاهزة.
+
+    owner (مثل كائن الإعدادات) يُحفظ مع الجزء، ويُعاد البناء إذا تغير.
+    """
+    cached = _SHARED.get(key)
+    if cached is None or cached[0] is not owner:
+        value = build()
+        if isinstance(value, (dict, list)):
+            value = freeze(value)
+        cached = _SHARED[key] = (owner, value)
+    return cached[1]
+
+
+def _swap(value, fragments):
+    if isinstance(value, Fragment):
+        fragments.append(value)
+        return f"\0{len(fragments) - 1}"
+    if isinstance(value, dict):
+        return {k: _swap(v, fragments) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_swap(v, fragments) for v in value]
+    return value
+
+
+def dumps(schema, compact=False):
+    """تسلسل السكيما مع لصق الأجزاء المشتركة الجاهزة بدل إعادة تسلسلها."""
+    if isinstance(schema, Fragment):
+        return schema._serialized(compact, 0)
+    fragments = []
+    swapped = _swap(schema, fragments)
+    if compact:
+        text = json.dumps(swapped, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+    else:
+        text = json.dumps(swapped, ensure_ascii=False, indent=INDENT)
+    if not fragments:
+        return text
+
+    def splice(m):
+        level = 0
+        if not compact:
+            line_start = text.rfind("\n", 0, m.start()) + 1
+            level = LEADING_SPACES_RE.match(text, line_start).end() - line_start
+        return fragments[int(m.group(1))]._serialized(compact, level)
+
+    return PLACEHOLDER_RE.sub(splice, text)
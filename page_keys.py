@@ -0,0 +1,15 @@
+"""
+Lookup keys shared by the schema scripts (fix-product-schema.py and
+enhance-jsonld-schema.py), so both match a page to the same catalog entry.
+"""
+
+import re
+
+PAGE_KEY_DROP_RE = re.compile(r'[^\w\s-]')
+PAGE_KEY_SPACE_RE = re.compile(r'[\s_-]+')
+
+
+def page_key(text):
+    """Normalize a page stem, slug or product title to one key ("Couple Rolex watch - gold&black" -> "couple-rolex-watch-goldblack")"""
+    text = PAGE_KEY_DROP_RE.sub('', text).strip().lower()
+    return PAGE_KEY_SPACE_RE.sub('-', text).strip('-')
@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+
+AGGREGATES_FILE = 'data/rating-aggregates.json'
+HASH_BLOCK_SIZE = 1 << 20
+
+
+class RatingAggregates:
+    """
+    Compact per-product rating aggregates: productId -> count, sum,
+    histogram (1..5 stars) and last review date.
+
+    The index remembers how far it has read each NDJSON review file and the
+    SHA-256 of everything before that offset, so refresh() only parses
+    reviews appended since the last run. A file that was rewritten (truncated,
+    or changed anywhere before the read offset) makes refresh() rebuild the
+    whole index from its sources.
+    """
+
+    def __init__(self, products=None, sources=None):
+        self.products = products or {}
+        self.sources = sources or {}
+
+    @classmethod
+    def load(cls, path=AGGREGATES_FILE):
+        """The saved index, or an empty one if there is none yet."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get("products"), data.get("sources"))
+
+    def save(self, path=AGGREGATES_FILE):
+        data = {"products": dict(sorted(self.products.items())), "sources": self.sources}
+        # Written next to the index and moved into place, so an interrupted
+        # save never leaves a half-written index for the next refresh
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        self.products = {}
+        self.sources = {}
+
+    def add(self, review):
+        """Counts one unified review (needs productId, rating and date)."""
+        product_id = review.get("productId")
+        rating = review.get("rating")
+        if not product_id or not isinstance(rating, (int, float)) or not 1 <= rating <= 5:
+            return False
+        entry = self.products.setdefault(product_id, {
+            "count": 0, "sum": 0, "histogram": [0, 0, 0, 0, 0], "last_date": None,
+        })
+        entry["count"] += 1
+        entry["sum"] += rating
+        entry["histogram"][int(round(rating)) - 1] += 1
+        date = review.get("date")
+        if date and date != "0000-00-00" and (entry["last_date"] is None or date > entry["last_date"]):
+            entry["last_date"] = date
+        return True
+
+    def rating(self, product_id):
+        """(average rounded to one decimal, review count), or None if the product has no reviews."""
+        entry = self.products.get(product_id)
+        if not entry or not entry["count"]:
+            return None
+        return round(entry["sum"] / entry["count"], 1), entry["count"]
+
+    def _read_new(self, path):
+        """Counts the reviews appended to one NDJSON file; False if it was rewritten."""
+        source = self.sources.get(path, {"offset": 0, "sha256": None})
+        offset = source["offset"]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < offset:
+                return False
+            # The already counted prefix is hashed again (no JSON parsing), so
+            # an edit anywhere in it is noticed
+            remaining = offset
+            while remaining:
+                block = f.read(min(remaining, HASH_BLOCK_SIZE))
+                digest.update(block)
+                remaining -= len(block)
+            if offset and digest.hexdigest() != source.get("sha256"):
+                return False
+            for line in f:
+                # A line without its newline is still being written
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                digest.update(line)
+                if line.strip():
+                    self.add(json.loads(line))
+        self.sources[path] = {"offset": offset, "sha256": digest.hexdigest()}
+        return True
+
+    def refresh(self, paths):
+        """
+        Brings the index up to date with the given NDJSON review files.
+
+        Returns 'incremental' when only appended reviews were read, or
+        'rebuilt' when a source was rewritten and everything was recounted.
+        Sources saved by an older version (without sha256) are rebuilt too,
+        and so are counts that did not come from these files (an index filled
+        from a unified JSON run has products but no sources): reading the
+        files from offset 0 on top of them would count every review twice.
+        """
+        paths = [os.path.normpath(path) for path in paths if os.path.exists(path)]
+        untracked = self.products and set(paths) - set(self.sources)
+        if untracked or set(self.sources) - set(paths) or not all(self._read_new(path) for path in paths):
+            self.reset()
+            for path in paths:
+                self._read_new(path)
+            return 'rebuilt'
+        return 'incremental'
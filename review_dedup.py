@@ -0,0 +1,175 @@
+import re
+import zlib
+import hashlib
+import unicodedata
+
+import numpy as np
+
+# Arabic diacritics (tashkeel), superscript alef, Quranic marks and tatweel
+ARABIC_MARKS_RE = re.compile(r'[ؐ-ًؚ-ٰٟۖ-ۭـ]')
+ARABIC_LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+})
+# Emoji, punctuation and symbols: everything that is not a letter, digit or space
+NON_WORD_RE = re.compile(r'[^\w\s]|_')
+# "رائعععع" -> "رائع"
+REPEATED_LETTER_RE = re.compile(r'([^\W\d_])\1{2,}')
+WHITESPACE_RE = re.compile(r'\s+')
+
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+BANDS = 16
+DEFAULT_SIMILARITY = 0.8
+# Comments shorter than this (in words after normalization) are never matched:
+# empty, emoji-only and one or two word comments ("ممتاز") are shared by many
+# different customers, so they say nothing about duplication
+MIN_TOKENS = 3
+# Smallest prime above 2**32; with 31-bit coefficients a * h + b fits in uint64
+_PRIME = np.uint64(4294967311)
+
+
+def normalize_arabic(text):
+    """
+    Returns the comparison form of a review comment.
+
+    Removes diacritics, tatweel, emoji and punctuation, unifies alef, ya and
+    ta-marbuta variants, collapses letters repeated for emphasis and whitespace.
+    """
+    text = unicodedata.normalize('NFKC', text or '')
+    text = ARABIC_MARKS_RE.sub('', text).translate(ARABIC_LETTER_VARIANTS).lower()
+    text = NON_WORD_RE.sub(' ', text)
+    text = REPEATED_LETTER_RE.sub(r'\1', text)
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Character n-grams of the normalized text (the whole text if shorter)."""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def review_ref(review):
+    """Identifies a unified review (review ids are only unique per product)."""
+    return {"productId": review.get("productId"), "id": review.get("id")}
+
+
+def _permutations(num_perm):
+    # Fixed coefficients, so signatures are comparable between runs
+    a, b = [], []
+    for i in range(num_perm):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=8).digest()
+        a.append(int.from_bytes(digest[:4], 'little') >> 1 | 1)
+        b.append(int.from_bytes(digest[4:], 'little') >> 1)
+    return np.array(a, dtype=np.uint64)[:, None], np.array(b, dtype=np.uint64)[:, None]
+
+
+class ReviewDeduplicator:
+    """
+    Drops exact and near-duplicate reviews across the whole corpus.
+
+    Reviews are checked one at a time in input order, and the first review of
+    each cluster is kept. Exact duplicates (same normalized text) are found by
+    hash. Near duplicates are found with MinHash signatures over character
+    shingles: the signature is split into bands, and only reviews sharing at
+    least one band bucket are compared, so the work is not quadratic in the
+    number of reviews. A candidate is a duplicate when the estimated Jaccard
+    similarity of the two texts is at least `similarity`.
+
+    Reviews whose normalized comment has fewer than `min_tokens` words are
+    always kept and not indexed.
+
+    Only the id and signature of each kept review are held (not the review
+    itself), so memory stays small when the reviews are streamed.
+    """
+
+    def __init__(self, similarity=DEFAULT_SIMILARITY, num_perm=NUM_PERM, bands=BANDS, min_tokens=MIN_TOKENS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.similarity = similarity
+        self.num_perm = num_perm
+        self.bands = bands
+        self.min_tokens = min_tokens
+        self.rows = num_perm // bands
+        self._a, self._b = _permutations(num_perm)
+        self.exact = {}
+        self.buckets = [{} for _ in range(bands)]
+        self.kept = []
+        self.short = 0
+        self.clusters = {}
+
+    def signature(self, text):
+        """MinHash signature: for each hash function, the minimum over all shingles."""
+        encoded = [shingle.encode('utf-8') for shingle in shingles(text)]
+        hashes = np.fromiter(map(zlib.crc32, encoded), dtype=np.uint64, count=len(encoded))
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[i * rows:(i + 1) * rows].tobytes() for i in range(self.bands)]
+
+    def _estimate(self, sig_a, sig_b):
+        return float(np.count_nonzero(sig_a == sig_b)) / self.num_perm
+
+    def check(self, review):
+        """
+        Returns None if the review is kept, or (kept_id, reason, similarity)
+        for the review it duplicates. kept_id is review_ref() of that review,
+        reason is 'exact' or 'near'.
+        """
+        text = normalize_arabic(review.get("comment"))
+        if len(text.split()) < self.min_tokens:
+            self.short += 1
+            return None
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        if digest in self.exact:
+            return self._drop(self.exact[digest], review, 'exact', 1.0)
+
+        signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+        best, best_similarity = None, 0.0
+        seen = set()
+        for band, key in enumerate(band_keys):
+            for index in self.buckets[band].get(key, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                similarity = self._estimate(signature, self.kept[index][1])
+                if similarity > best_similarity:
+                    best, best_similarity = index, similarity
+        if best is not None and best_similarity >= self.similarity:
+            return self._drop(best, review, 'near', best_similarity)
+
+        index = len(self.kept)
+        self.kept.append((review_ref(review), signature))
+        self.exact[digest] = index
+        for band, key in enumerate(band_keys):
+            self.buckets[band].setdefault(key, []).append(index)
+        return None
+
+    def _drop(self, index, review, reason, similarity):
+        kept_id = self.kept[index][0]
+        self.clusters.setdefault(index, []).append({
+            "review": review,
+            "reason": reason,
+            "similarity": round(similarity, 3),
+        })
+        return kept_id, reason, similarity
+
+    def report(self):
+        """The dropped clusters: each kept review id with the duplicates removed in its favour."""
+        return [
+            {"kept": self.kept[index][0], "dropped": dropped}
+            for index, dropped in sorted(self.clusters.items())
+        ]
+
+    @property
+    def kept_count(self):
+        return len(self.kept) + self.short
+
+    @property
+    def dropped_count(self):
+        return sum(len(dropped) for dropped in self.clusters.values())
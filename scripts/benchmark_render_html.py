@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emirates Gifts - Benchmark for generate_from_excel.render_html
+
+يقارن سرعة توليد الصفحات (صفحة/ثانية) بين الطريقة القديمة
+(str.replace مرتين لكل متغير) والقالب المُجمّع CompiledTemplate،
+ويتأكد أن الناتج متطابق بايت ببايت.
+
+Usage:
+    python scripts/benchmark_render_html.py --rows 12000 --pad-kb 200
+"""
+
+import sys
+import html
+import time
+import argparse
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from generate_from_excel import TEMPLATE_FILE, build_jsonld, compile_template  # noqa: E402
+
+CONFIG = {
+    "brand_name": "Emirates Gifts",
+    "product_defaults": {"currency": "AED", "condition": "https://schema.org/NewCondition"},
+}
+
+
+def legacy_render_html(template_content, context):
+    """نسخة render_html قبل التجميع المسبق (للمقارنة فقط).
+
+    الأصل كان يحتوي على قوس زائد في f-string الخاص بـ {{key_raw}}؛ هنا النسخة المقصودة.
+    """
+    content = template_content
+    for key, value in context.items():
+        safe_value = html.escape(str(value or ''), quote=True)
+        content = content.replace(f"{{{{{key}}}}}", safe_value)
+        content = content.replace(f"{{{{{key}_raw}}}}", str(value or ''))
+    return content
+
+
+def build_contexts(rows):
+    """إنشاء كتالوج تجريبي بنفس حقول صفحات المنتجات."""
+    contexts = []
+    for i in range(rows):
+        title = f"عطر فاخر رقم {i} - Luxury Perfume \"{i}\" & Co"
+        record = {
+            "title": title,
+            "desc": f"{title} - هدية فريدة <مميزة> من Emirates Gifts",
+            "image": f"https://example.com/images/{i}.webp",
+            "link": f"https://example.com/products/{i}?ref=feed&utm=1",
+            "price": f"{250 + i % 300}.00",
+            "currency": "AED",
+            "brand": "Emirates Gifts",
+            "availability": "https://schema.org/InStock",
+        }
+        contexts.append({
+            "title": title,
+            "description": record["desc"],
+            "image_url": record["image"],
+            "buy_link": record["link"],
+            "display_price": f"{record['price']} AED",
+            "json_ld_raw": build_jsonld(record, CONFIG),
+        })
+    return contexts
+
+
+def run(label, render, contexts):
+    start = time.perf_counter()
+    pages = [render(ctx) for ctx in contexts]
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<10} {len(contexts) / elapsed:>12,.0f} pages/sec  ({elapsed:.3f}s)")
+    return pages, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark render_html before/after template compilation.")
+    parser.add_argument("--rows", type=int, default=12000, help="عدد المنتجات في الكتالوج التجريبي")
+    parser.add_argument("--template", type=Path, default=TEMPLATE_FILE, help="ملف القالب")
+    parser.add_argument("--pad-kb", type=int, default=0,
+                        help="تكبير القالب بمحتوى عربي ثابت (KB) لمحاكاة القوالب الكبيرة")
+    args = parser.parse_args()
+
+    template_str = args.template.read_text(encoding="utf-8")
+    if args.pad_kb:
+        filler = "<p>هدايا الإمارات - عطور وساعات فاخرة مع توصيل سريع لكل الإمارات</p>\n"
+        pad = filler * (args.pad_kb * 1024 // len(filler.encode("utf-8")) + 1)
+        template_str = template_str.replace("</body>", pad + "</body>", 1)
+
+    contexts = build_contexts(args.rows)
+    print(f"📦 {args.rows} rows, template {len(template_str.encode('utf-8')) / 1024:.1f} KB")
+
+    template = compile_template(template_str)
+    before, t_before = run("before", lambda ctx: legacy_render_html(template_str, ctx), contexts)
+    after, t_after = run("after", template.render, contexts)
+
+    if before != after:
+        print("❌ Output differs between legacy and compiled renderer")
+        return 1
+    print(f"✅ Byte-identical output, speedup x{t_before / t_after:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emirates Gifts - Benchmark for seo_emirates_gifts_products engines
+
+يشغّل محرك bs4 (الأصلي) ومحرك lxml (إعادة كتابة <head> فقط) على نسختين
+من صفحات products/، ويقيس الزمن، ويتأكد أن نتيجة الميتا والـ canonical
+و JSON-LD في <head> متطابقة بين المحركين.
+
+Usage:
+    python scripts/benchmark_seo_engines.py [--products-dir products]
+"""
+
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from seo_emirates_gifts_products import load_config, process_file  # noqa: E402
+
+META_KEYS = [
+    ('name', 'description'), ('name', 'keywords'),
+    ('property', 'og:title'), ('property', 'og:description'), ('property', 'og:image'),
+    ('property', 'og:url'), ('property', 'og:site_name'),
+    ('name', 'twitter:card'), ('name', 'twitter:title'),
+    ('name', 'twitter:description'), ('name', 'twitter:image'),
+]
+
+
+def head_summary(path):
+    """ملخص نتيجة SEO في <head>: العنوان، الميتا، canonical، و JSON-LD.
+
+    يُستخدم html.parser لأنه لا يعيد ترتيب العناصر (محلل lxml ينهي <head>
+    عند أول نص، ومحرك bs4 يضع تعليق Auto-generated كنص مُشفّر).
+    """
+    soup = BeautifulSoup(path.read_text(encoding="utf-8"), 'html.parser')
+    head = soup.head
+    title = head.find('title')
+    summary = {'title': title.get_text().strip() if title else None}
+    for attr, key in META_KEYS:
+        tag = head.find('meta', {attr: key})
+        summary[key] = tag.get('content') if tag else None
+    canonical = head.find('link', rel='canonical')
+    summary['canonical'] = canonical.get('href') if canonical else None
+    summary['json_ld'] = [json.loads(s.string) for s in head.find_all('script', type='application/ld+json')]
+    return summary
+
+
+def run_engine(engine, files, config):
+    failed = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for fp in files:
+            if not process_file(fp, config, engine):
+                failed += 1
+    elapsed = time.perf_counter() - start
+    print(f"  {engine:<5} {elapsed:8.2f}s  {len(files) / elapsed:8.1f} pages/sec  (failed: {failed})")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare bs4 and lxml SEO engines on product pages.")
+    parser.add_argument("--products-dir", type=Path, default=ROOT_DIR / "products")
+    args = parser.parse_args()
+
+    config = load_config(ROOT_DIR / "seo_config.json")
+    sources = sorted(args.products_dir.glob("*.html"))
+    print(f"📦 {len(sources)} pages from {args.products_dir}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs = {}
+        for engine in ("bs4", "lxml"):
+            dirs[engine] = Path(tmp) / engine / "products"
+            shutil.copytree(args.products_dir, dirs[engine], ignore=shutil.ignore_patterns("*.json"))
+
+        timings = {}
+        for engine in ("bs4", "lxml"):
+            timings[engine] = run_engine(engine, sorted(dirs[engine].glob("*.html")), config)
+
+        mismatches = 0
+        for src in sources:
+            bs4_result = head_summary(dirs["bs4"] / src.name)
+            lxml_result = head_summary(dirs["lxml"] / src.name)
+            if bs4_result != lxml_result:
+                mismatches += 1
+                keys = [k for k in bs4_result if bs4_result[k] != lxml_result[k]]
+                print(f"  ≠ {src.name}: {', '.join(keys)}")
+
+    print(f"⚡ speedup x{timings['bs4'] / timings['lxml']:.1f}")
+    if mismatches:
+        print(f"❌ {mismatches} pages differ")
+        return 1
+    print("✅ Same meta/canonical/JSON-LD result on every page")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
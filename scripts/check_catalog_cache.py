@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emirates Gifts - Check for the catalog cache of generate_from_excel
+
+يقرأ نفس الجدول مرتين عبر load_catalog: مرة بدون ذاكرة مؤقتة (cache miss)
+ومرة منها (cache hit)، ويتأكد أن الصفحات و products.json الناتجة متطابقة
+بايت ببايت. الجدول التجريبي يحتوي أسعارًا فارغة وخلايا فارغة، وهي الحالات
+التي تختلف فيها القيم بعد الحفظ في npz.
+
+Usage:
+    python scripts/check_catalog_cache.py
+    python scripts/check_catalog_cache.py --input data/products-template.xlsx
+"""
+
+import csv
+import sys
+import json
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from generate_from_excel import (  # noqa: E402
+    TEMPLATE_FILE, SlugRegistry, assign_slugs, compile_template, load_catalog, load_config, render_product,
+)
+
+
+def write_sample_catalog(path, rows):
+    """جدول تجريبي فيه أسعار فارغة وأوصاف بأطوال مختلفة."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "desc", "price", "image", "link", "availability"])
+        for i in range(rows):
+            writer.writerow([
+                f"p{i}",
+                f"عطر رقم {i}",
+                "وصف " * (i % 7),
+                "" if i % 3 == 0 else f"{100 + i},50 AED",
+                f"https://example.com/{i}.webp" if i % 2 else "",
+                "",
+                "" if i % 4 else "OutOfStock",
+            ])
+
+
+def render_all(catalog, registry_path, template, config):
+    """الصفحات ومدخلات products.json لكل منتج، بالبايت."""
+    records = assign_slugs(catalog, SlugRegistry(registry_path))
+    pages = {}
+    entries = []
+    for record in records:
+        html_page, entry = render_product(record, template, config)
+        pages[record["slug"]] = html_page.encode("utf-8", errors="xmlcharrefreplace")
+        entries.append(entry)
+    return pages, json.dumps(entries, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="مقارنة صفحات cache miss و cache hit لـ load_catalog.")
+    parser.add_argument("--input", type=Path, default=None, help="ملف المنتجات (الافتراضي: جدول تجريبي)")
+    parser.add_argument("--rows", type=int, default=60, help="عدد صفوف الجدول التجريبي")
+    args = parser.parse_args(argv)
+
+    config = load_config()
+    brand = config.get("brand_name", "Emirates Gifts")
+    currency = config.get("product_defaults", {}).get("currency", "AED")
+    template = compile_template(TEMPLATE_FILE.read_text(encoding="utf-8"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = args.input
+        if source is None:
+            source = tmp / "catalog.csv"
+            write_sample_catalog(source, args.rows)
+        cache_dir = tmp / "cache"
+
+        cold = load_catalog(source, brand, currency, cache_dir=cache_dir)
+        warm = load_catalog(source, brand, currency, cache_dir=cache_dir)
+        cold_pages, cold_index = render_all(cold, tmp / "registry-cold.json", template, config)
+        warm_pages, warm_index = render_all(warm, tmp / "registry-warm.json", template, config)
+
+    differ = sorted(slug for slug in cold_pages.keys() | warm_pages.keys()
+                    if cold_pages.get(slug) != warm_pages.get(slug))
+    if cold_index != warm_index:
+        differ.append("products.json")
+    if differ:
+        print(f"❌ {len(differ)} ملف يختلف بين cache miss و cache hit: {', '.join(differ[:10])}")
+        return 1
+    print(f"✅ {len(cold_pages)} صفحة و products.json متطابقة بايت ببايت (cache miss / cache hit)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emirates Gifts - Check for the rating aggregates of unify_reviews
+
+يشغّل unify_reviews.py بالتسلسل الذي كان يحسب المراجعات مرتين:
+1. تشغيل كامل بـ --ndjson (ملفات الفئات + فهرس التجميعات)
+2. تشغيل كامل بمخرج JSON (يعيد بناء الفهرس من JSON بدون مصادر)
+3. تشغيل --ndjson --append بمراجعات جديدة
+
+ثم يقارن الفهرس الناتج بفهرس يُبنى من الصفر من ملفات NDJSON. أي فرق
+يعني أن مراجعات حُسبت مرتين أو ضاعت.
+
+Usage:
+    python scripts/check_rating_aggregates.py
+    python scripts/check_rating_aggregates.py --input data/reviews.json --new-per-product 2
+"""
+
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from rating_aggregates import RatingAggregates  # noqa: E402
+from unify_reviews import CATEGORIES, category_path  # noqa: E402
+
+UNIFY_SCRIPT = ROOT_DIR / "unify_reviews.py"
+
+
+def split_reviews(products, new_per_product):
+    """آخر new_per_product مراجعة من كل منتج تصبح الدفعة الجديدة، والباقي هو الأصل."""
+    old, new = [], []
+    for product in products:
+        reviews = product.get("reviews", [])
+        cut = max(len(reviews) - new_per_product, 0)
+        old.append(dict(product, reviews=reviews[:cut]))
+        new.append(dict(product, reviews=reviews[cut:]))
+    return old, new
+
+
+def unify(*args):
+    subprocess.run([sys.executable, str(UNIFY_SCRIPT), *map(str, args)],
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def counts(aggregates):
+    return {product_id: entry["count"] for product_id, entry in sorted(aggregates.products.items())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="التحقق من فهرس التجميعات بعد تشغيل JSON ثم --append.")
+    parser.add_argument("--input", type=Path, default=ROOT_DIR / "data" / "reviews.json",
+                        help="ملف المراجعات (الافتراضي: data/reviews.json)")
+    parser.add_argument("--new-per-product", type=int, default=2,
+                        help="عدد المراجعات التي تُضاف لكل منتج في تشغيل --append")
+    args = parser.parse_args(argv)
+
+    products = json.loads(args.input.read_text(encoding="utf-8"))
+    old, new = split_reviews(products, args.new_per_product)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        old_path, new_path = tmp / "old.json", tmp / "new.json"
+        old_path.write_text(json.dumps(old, ensure_ascii=False), encoding="utf-8")
+        new_path.write_text(json.dumps(new, ensure_ascii=False), encoding="utf-8")
+        ndjson_dir, index = tmp / "unified", tmp / "aggregates.json"
+        common = ["--aggregates", index, "--no-dedup"]
+
+        unify(old_path, ndjson_dir, "--ndjson", *common)
+        unify(old_path, tmp / "unified.json", *common)
+        unify(new_path, ndjson_dir, "--ndjson", "--append", *common)
+
+        got = counts(RatingAggregates.load(index))
+        expected = RatingAggregates()
+        expected.refresh([category_path(str(ndjson_dir), category) for category in CATEGORIES])
+        expected = counts(expected)
+
+    if got != expected:
+        print(f"❌ الفهرس بعد JSON ثم --append لا يطابق إعادة البناء:\n   {got}\n   المتوقع: {expected}")
+        return 1
+    print(f"✅ الفهرس يطابق إعادة البناء من NDJSON ({sum(expected.values())} مراجعة، {len(expected)} منتج)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emirates Gifts - Check that generate_from_excel gives the same result with and without --stream
+
+يكتب جدول Excel تجريبيًا ويسجل روابطه (تشغيل أول)، ثم يعدّل الجدول كما يحدث
+عادة: منتج جديد بعنوان منتج موجود يسبقه في الجدول، ومنتج بلا id تغيّرت صورته
+(فتغيّر مفتاحه في السجل). بعدها يحدد الروابط بالوضع العادي (pandas) وبوضع
+--stream (openpyxl) انطلاقًا من نفس السجل، ويتأكد أن الروابط ومدخلات
+products.json (ومنها الأسعار) متطابقة، وأن المنتج الذي تغيّر مفتاحه احتفظ برابطه.
+
+Usage:
+    python scripts/check_slug_modes.py
+"""
+
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from generate_from_excel import (  # noqa: E402
+    TEMPLATE_FILE, SlugRegistry, assign_slugs, compile_template, iter_catalog_records, load_catalog,
+    load_config, render_product,
+)
+
+COLUMNS = ["id", "title", "desc", "price", "image", "link"]
+
+
+def sample_rows(rows):
+    """أسعار صحيحة مع خلايا فارغة (يقرؤها pandas كـ float) ومنتجات بلا id."""
+    return [
+        [
+            i if i % 2 else None,
+            f"ساعة رقم {i % (rows // 2)}",
+            "وصف",
+            None if i % 5 == 0 else 100 + i,
+            f"https://example.com/{i}.webp",
+            None,
+        ]
+        for i in range(1, rows + 1)
+    ]
+
+
+def write_xlsx(path, rows):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def batch_entries(path, registry_path, template, config, brand, currency):
+    catalog = load_catalog(path, brand, currency, use_cache=False)
+    records = assign_slugs(catalog, SlugRegistry(registry_path))
+    return [render_product(record, template, config)[1] for record in records]
+
+
+def stream_entries(path, registry_path, template, config, brand, currency):
+    registry = SlugRegistry(registry_path)
+    records = registry.assign_stream(iter_catalog_records(path, brand, currency),
+                                     iter_catalog_records(path, brand, currency))
+    return [render_product(record, template, config)[1] for record in records]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="مقارنة روابط وأسعار الوضع العادي و --stream.")
+    parser.add_argument("--rows", type=int, default=40, help="عدد صفوف الجدول التجريبي")
+    args = parser.parse_args(argv)
+
+    config = load_config()
+    brand = config.get("brand_name", "Emirates Gifts")
+    currency = config.get("product_defaults", {}).get("currency", "AED")
+    template = compile_template(TEMPLATE_FILE.read_text(encoding="utf-8"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        rows = sample_rows(args.rows)
+        sheet = tmp / "catalog.xlsx"
+        write_xlsx(sheet, rows)
+
+        registry = SlugRegistry(tmp / "registry.json")
+        registry.assign(load_catalog(sheet, brand, currency, use_cache=False).to_dict("records"))
+        registry.save()
+
+        # منتج بلا id تغيّرت صورته، ومنتج جديد بعنوان منتج لاحق في أول الجدول
+        moved = next(i for i, row in enumerate(rows) if row[0] is None and i > 0)
+        rows[moved][4] += "?v=2"
+        rows.insert(0, [None, rows[-1][1], "جديد", 99, "https://example.com/new.webp", None])
+        write_xlsx(sheet, rows)
+        old_slug = registry.slugs[f"image:{rows[moved + 1][4][:-len('?v=2')]}"]
+
+        for mode in ("batch", "stream"):
+            shutil.copy(tmp / "registry.json", tmp / f"registry-{mode}.json")
+        batch = batch_entries(sheet, tmp / "registry-batch.json", template, config, brand, currency)
+        stream = stream_entries(sheet, tmp / "registry-stream.json", template, config, brand, currency)
+
+    failed = False
+    differ = [i for i, (a, b) in enumerate(zip(batch, stream)) if a != b]
+    if len(batch) != len(stream) or differ:
+        failed = True
+        print(f"❌ {len(differ)} منتج يختلف بين الوضع العادي و --stream، مثل:")
+        for i in differ[:3]:
+            print(f"   {json.dumps(batch[i], ensure_ascii=False)}\n   {json.dumps(stream[i], ensure_ascii=False)}")
+    for mode, entries in (("batch", batch), ("stream", stream)):
+        if entries[moved + 1]["slug"] != old_slug:
+            failed = True
+            print(f"❌ {mode}: المنتج الذي تغيّرت صورته فقد رابطه: {old_slug} -> {entries[moved + 1]['slug']}")
+    if failed:
+        return 1
+    print(f"✅ {len(batch)} منتج بنفس الروابط والأسعار في الوضعين، والمنتج الذي تغيّر مفتاحه احتفظ بـ {old_slug}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
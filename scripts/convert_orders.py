@@ -5,7 +5,6 @@ Emirates Gifts - Convert Orders JSONL to Excel
 """
 
 import json
-import pandas as pd
 import os
 from pathlib import Path
 
@@ -39,7 +38,8 @@ def convert_orders_to_excel():
             print('⚠️  No orders found in file')
             return False
         
-        # نقل إلى DataFrame
+        # نقل إلى DataFrame (pandas بطيء الاستيراد، فلا نستورده إلا عند وجود طلبات)
+        import pandas as pd
         df = pd.DataFrame(orders)
         
         # ترتيب الأعمدة
@@ -1,20 +1,42 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-حقن السكيما والميتا تاغ لكل صفحات المنتجات في مجلد products باستخدام BeautifulSoup.
+حقن السكيما والميتا تاغ لكل صفحات المنتجات في مجلد products.
 هذا السكربت يقرأ الإعدادات من ملف JSON خارجي لزيادة المرونة.
+
+محركان متاحان:
+- lxml (الافتراضي): يحلل ويعيد كتابة منطقة <head> فقط، ويُبقي باقي الصفحة كما هو بايت ببايت.
+- bs4: المحرك الأصلي باستخدام BeautifulSoup، يعيد تنسيق الصفحة كاملة.
 """
 
+import os
 import sys
 import re
+import html
 import json
+import hashlib
+import time
+import argparse
+import importlib.util
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
+# bs4 بطيء الاستيراد ولا يُستخدم إلا في المحرك الأصلي أو عند الرجوع إليه،
+# لذلك نتحقق من وجوده فقط ونستورده داخل render_page_bs4
+HAS_BS4 = importlib.util.find_spec("bs4") is not None
+
 try:
-    from bs4 import BeautifulSoup
+    import lxml.html
+    from lxml import etree
 except ImportError:
-    print("مكتبة BeautifulSoup غير مثبتة. يرجى تثبيتها باستخدام: pip install beautifulsoup4")
+    lxml = None
+
+import jsonld_fragments as jsonld
+from head_splice import find_head_region
+
+if not HAS_BS4 and lxml is None:
+    print("لا توجد مكتبة لتحليل HTML. يرجى تثبيت lxml أو beautifulsoup4 باستخدام: pip install lxml")
     sys.exit(1)
 
 # --- ثوابت ---
@@ -25,6 +47,20 @@ PRICE_REGEX_PATTERNS = [
     r'([\d,]+(?:\.\d{1,2})?)\s*د\.إ',
     r'([\d,]+(?:\.\d{1,2})?)\s*درهم',
 ]
+# كل الأنماط في تعبير واحد: رقم المجموعة المطابقة (lastindex) هو ترتيب النمط
+PRICE_RE = re.compile("|".join(PRICE_REGEX_PATTERNS), re.IGNORECASE)
+# فاصل بين نصوص مناطق السعر: ليس رقمًا ولا مسافة، فلا يلتصق رقم منطقة بعملة المنطقة التالية
+PRICE_REGION_SEPARATOR = "\0"
+AUTO_GENERATED_MARKER = "Auto-generated SEO and Schema"
+WARNING_MESSAGES = {
+    "missing_title": "لم يتم العثور على عنوان، سيتم استخدام قيمة افتراضية.",
+    "missing_image": "لم يتم العثور على صورة، سيتم استخدام صورة افتراضية.",
+    "missing_price": "لم يتم العثور على سعر، سيتم استخدام القيمة 0.0.",
+}
+# خارج products/ حتى لا يُنشر مع الصفحات
+DEFAULT_SUMMARY_FILE = Path(".cache/seo/summary.json")
+EXTRACT_CACHE_FILE = Path(".cache/seo/extract.json")
+EXTRACT_CACHE_VERSION = 1
 
 
 def get_script_and_root_dirs():
@@ -50,106 +86,185 @@ def load_config(config_path):
         sys.exit(1)
 
 
-def extract_product_info(soup, config):
-    """استخراج معلومات المنتج من كائن BeautifulSoup."""
+def _price_value(raw):
+    """تحويل نص السعر إلى رقم، أو None إذا لم يكن صالحًا."""
+    try:
+        # إزالة فاصل الآلاف (,)
+        return float(raw.replace(',', ''))
+    except ValueError:
+        # محاولة بديلة للتعامل مع صيغة مثل 1,23
+        try:
+            return float(raw.replace(',', '.'))
+        except ValueError:
+            return None
+
+
+def _parse_price(html_text):
+    """البحث عن السعر في النص بمسح واحد بـ PRICE_RE.
+
+    تبقى الأولوية لترتيب PRICE_REGEX_PATTERNS: أول تطابق للنمط الأعلى أولوية
+    هو السعر، ويُتوقف عن المسح بمجرد أن تُحسم النتيجة.
+    """
+    firsts = {}
+    for m in PRICE_RE.finditer(html_text):
+        index = m.lastindex
+        if index in firsts:
+            continue
+        firsts[index] = _price_value(m.group(index))
+        if firsts[index] is not None and all(i in firsts for i in range(1, index)):
+            break
+    for index in sorted(firsts):
+        if firsts[index] is not None:
+            return firsts[index]
+    return 0.0
+
+
+def _warn(warnings, code):
+    """تسجيل تحذير: يُضاف إلى القائمة إن وُجدت، وإلا يُطبع مباشرة كما في السابق."""
+    if warnings is None:
+        print(f"   ⚠️ {WARNING_MESSAGES[code]}")
+    else:
+        warnings.append(code)
+
+
+def _absolute_image_url(src, config):
+    return src if src.startswith('http') else f"{config['base_url']}{src if src.startswith('/') else '/' + src}"
+
+
+def _has_class(value, name):
+    if isinstance(value, str):
+        value = value.split()
+    return name in (value or ())
+
+
+def _is_price_region(classes, el_id, itemprop):
+    """عنصر يحمل السعر: class أو id يحتوي على price، أو itemprop="price"."""
+    if isinstance(classes, str):
+        classes = classes.split()
+    return any('price' in c for c in classes or ()) or 'price' in (el_id or '') or itemprop == 'price'
+
+
+def _product_info(title_string, h1_string, src, price, config, warnings):
+    """تجميع معلومات المنتج من نتائج المسح (مشتركة بين المحركين)."""
     info = {}
-    # استخراج العنوان
-    title_tag = soup.find('title')
-    h1_tag = soup.find('h1')
-    if title_tag and title_tag.string:
-        info['title'] = title_tag.string.split('|')[0].strip()
-    elif h1_tag and h1_tag.string:
-        info['title'] = h1_tag.string.strip()
+    if title_string:
+        info['title'] = title_string.split('|')[0].strip()
+    elif h1_string:
+        info['title'] = h1_string.strip()
     else:
         info['title'] = DEFAULT_PRODUCT_TITLE
-        print("   ⚠️ لم يتم العثور على عنوان، سيتم استخدام قيمة افتراضية.")
+        _warn(warnings, "missing_title")
 
-    # استخراج الصورة
-    img_tag = soup.select_one(MAIN_IMAGE_SELECTOR) or soup.find('img')
-    if img_tag and img_tag.get('src'):
-        src = img_tag['src']
-        info['image'] = src if src.startswith('http') else f"{config['base_url']}{src if src.startswith('/') else '/' + src}"
+    if src:
+        info['image'] = _absolute_image_url(src, config)
     else:
         info['image'] = f"{config['base_url']}{config['default_image']}"
-        print("   ⚠️ لم يتم العثور على صورة، سيتم استخدام صورة افتراضية.")
-    
-    # استخراج السعر
-    html_text = soup.get_text()
-    price = 0.0
-    for pattern in PRICE_REGEX_PATTERNS:
-        m = re.search(pattern, html_text, re.IGNORECASE)
-        if m:
-            try:
-                # إزالة فاصل الآلاف (,) ثم تحويل فاصل العشرية (إذا كان ,) إلى .
-                price_str = m.group(1).replace(',', '')
-                price = float(price_str)
-                break
-            except ValueError:
-                # محاولة بديلة للتعامل مع صيغة مثل 1,23
-                try:
-                    price = float(m.group(1).replace(',', '.'))
-                    break
-                except ValueError:
-                    continue
-                continue
+        _warn(warnings, "missing_image")
+
     info['price'] = price
     if price == 0.0:
-        print("   ⚠️ لم يتم العثور على سعر، سيتم استخدام القيمة 0.0.")
-
+        _warn(warnings, "missing_price")
     return info
 
 
+def extract_product_info(soup, config, warnings=None):
+    """استخراج معلومات المنتج من كائن BeautifulSoup بمرور واحد على العناصر.
+
+    يجمع المرور أول title وأول h1، والصورة الرئيسية (MAIN_IMAGE_SELECTOR ثم أول img)،
+    ومناطق السعر؛ ولا يُبحث في نص الصفحة كاملًا إلا إذا لم يوجد سعر فيها.
+    """
+    title_tag = h1_tag = main_img = first_img = None
+    regions = []
+    for el in soup.find_all(True):
+        name = el.name
+        if name == 'title' and title_tag is None:
+            title_tag = el
+        elif name == 'h1' and h1_tag is None:
+            h1_tag = el
+        elif name == 'img' and first_img is None:
+            first_img = el
+        classes = el.get('class')
+        if main_img is None and (el.get('id') == 'product-image' or name == 'img' and (
+                _has_class(classes, 'product-image')
+                or any(_has_class(p.get('class'), 'main-product-image') for p in el.parents))):
+            main_img = el
+        if _is_price_region(classes, el.get('id'), el.get('itemprop')) \
+                and not (regions and any(p is regions[-1] for p in el.parents)):
+            regions.append(el)
+
+    img_tag = main_img or first_img
+    price = _parse_price(PRICE_REGION_SEPARATOR.join(r.get_text() for r in regions)) if regions else 0.0
+    if price == 0.0:
+        price = _parse_price(soup.get_text())
+    return _product_info(
+        title_tag.string if title_tag else None,
+        h1_tag.string if h1_tag else None,
+        img_tag.get('src') if img_tag else None,
+        price, config, warnings,
+    )
+
+
 def build_product_url(file_path, base_url):
     """بناء رابط المنتج الكامل."""
     return f"{base_url}/products/{file_path.name}"
 
 
+def price_valid_until():
+    """تاريخ priceValidUntil في سكيما المنتج: بعد سنة من اليوم."""
+    return (datetime.now() + timedelta(days=365)).strftime('%Y-%m-%d')
+
+
 def create_product_schema(info, url, config):
     """إنشاء سكيما المنتج بصيغة JSON-LD."""
-    price_valid_until = (datetime.now() + timedelta(days=365)).strftime('%Y-%m-%d')
     schema = {
         "@context": "https://schema.org/",
         "@type": "Product",
         "name": info['title'],
         "image": [info['image']],
         "description": f"{info['title']} - هدايا فريدة من {config['brand_name']} مع توصيل سريع",
-        "brand": {
+        "brand": jsonld.shared(("brand", config['brand_name']), lambda: {
             "@type": "Brand",
             "name": config['brand_name']
-        },
+        }),
         "offers": {
             "@type": "Offer",
             "url": url,
             "priceCurrency": config['product_defaults']['currency'],
             "price": str(info['price']),
-            "priceValidUntil": price_valid_until,
+            "priceValidUntil": price_valid_until(),
             "itemCondition": config['product_defaults']['condition'],
             "availability": config['product_defaults']['availability'],
-            "seller": {
+            "seller": jsonld.shared(("seller", config['brand_name']), lambda: {
                 "@type": "Organization",
                 "name": config['brand_name']
-            }
+            })
         }
     }
     return schema
 
 
 def create_local_business_schema(config):
-    """إنشاء سكيما النشاط التجاري المحلي بصيغة JSON-LD."""
-    details = config['business_details']
-    schema = {
-        "@context": "https://schema.org",
-        "@type": "LocalBusiness",
-        "name": details['name'],
-        "image": f"{config['base_url']}{config['default_image']}",
-        "url": config['base_url'],
-        "telephone": details['telephone'],
-        "address": details['address'],
-        "geo": details['geo'],
-        "openingHours": details['openingHours'],
-        "priceRange": details['priceRange']
-    }
-    return schema
+    """إنشاء سكيما النشاط التجاري المحلي بصيغة JSON-LD (مرة واحدة لكل ملف إعدادات)."""
+    def build():
+        details = config['business_details']
+        return {
+            "@context": "https://schema.org",
+            "@type": "LocalBusiness",
+            "name": details['name'],
+            "image": f"{config['base_url']}{config['default_image']}",
+            "url": config['base_url'],
+            "telephone": details['telephone'],
+            "address": details['address'],
+            "geo": details['geo'],
+            "openingHours": details['openingHours'],
+            "priceRange": details['priceRange']
+        }
+    return jsonld.shared("local-business", build, owner=config)
+
+
+def json_ld_compact(config):
+    """هل تُكتب JSON-LD مضغوطة (بدون إزاحة)؟ يُفعَّل بـ --compact."""
+    return bool(config.get('json_ld_compact'))
 
 
 def update_meta_tag(soup, name, content, is_property=False):
@@ -209,10 +324,10 @@ def inject_seo(soup, info, url, config):
     local_schema = create_local_business_schema(config)
 
     product_script = soup.new_tag('script', type='application/ld+json')
-    product_script.string = json.dumps(product_schema, ensure_ascii=False, indent=2)
+    product_script.string = jsonld.dumps(product_schema, json_ld_compact(config))
     
     local_script = soup.new_tag('script', type='application/ld+json')
-    local_script.string = json.dumps(local_schema, ensure_ascii=False, indent=2)
+    local_script.string = jsonld.dumps(local_schema, json_ld_compact(config))
 
     soup.head.append(soup.new_string("\n<!-- Auto-generated SEO and Schema -->\n"))
     soup.head.append(product_script)
@@ -221,37 +336,499 @@ def inject_seo(soup, info, url, config):
     soup.head.append("\n")
 
 
-def process_file(file_path, config):
-    """معالجة ملف HTML واحد."""
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            soup = BeautifulSoup(f, 'html.parser')
+# --- محرك lxml: إعادة كتابة <head> فقط ---
+
+# نص الصفحة كما يراه soup.get_text() (بدون script/style/template)
+VISIBLE_TEXT_XPATH = "//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]"
+REGION_TEXT_XPATH = "." + VISIBLE_TEXT_XPATH
+
+
+def _tag_string(el):
+    """مكافئ tag.string في BeautifulSoup: النص إذا كان للعنصر ابن نصي واحد فقط."""
+    if el is None:
+        return None
+    if len(el) == 0:
+        return el.text or None
+    if len(el) == 1 and not el.text and not el[0].tail and isinstance(el[0].tag, str):
+        return _tag_string(el[0])
+    return None
+
+
+def extract_product_info_lxml(doc, config, warnings=None):
+    """استخراج معلومات المنتج من شجرة lxml بمرور واحد (نفس نتيجة extract_product_info)."""
+    title_el = h1_el = main_img = first_img = None
+    regions = []
+    for el in doc.iter(etree.Element):
+        tag = el.tag
+        if tag == 'title' and title_el is None:
+            title_el = el
+        elif tag == 'h1' and h1_el is None:
+            h1_el = el
+        elif tag == 'img' and first_img is None:
+            first_img = el
+        classes = el.get('class')
+        if main_img is None and (el.get('id') == 'product-image' or tag == 'img' and (
+                _has_class(classes, 'product-image')
+                or any(_has_class(a.get('class'), 'main-product-image') for a in el.iterancestors()))):
+            main_img = el
+        if _is_price_region(classes, el.get('id'), el.get('itemprop')) \
+                and not (regions and any(a is regions[-1] for a in el.iterancestors())):
+            regions.append(el)
+
+    img = main_img if main_img is not None else first_img
+    price = _parse_price(PRICE_REGION_SEPARATOR.join("".join(r.xpath(REGION_TEXT_XPATH)) for r in regions)) if regions else 0.0
+    if price == 0.0:
+        price = _parse_price("".join(doc.xpath(VISIBLE_TEXT_XPATH)))
+    return _product_info(
+        _tag_string(title_el), _tag_string(h1_el),
+        img.get('src') if img is not None else None,
+        price, config, warnings,
+    )
 
-        product_info = extract_product_info(soup, config)
-        product_url = build_product_url(file_path, config['base_url'])
-        
-        inject_seo(soup, product_info, product_url, config)
 
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(str(soup.prettify(formatter='html5')))
+def _new_child(head, tag, text=None, **attrs):
+    el = etree.SubElement(head, tag, **attrs)
+    el.text = text
+    el.tail = "\n"
+    return el
+
+
+def update_meta_tag_lxml(head, name, content, is_property=False):
+    """تحديث أو إنشاء ميتا تاغ داخل <head>."""
+    attr = 'property' if is_property else 'name'
+    for tag in head.iter('meta'):
+        if tag.get(attr) == name:
+            break
+    else:
+        tag = _new_child(head, 'meta', **{attr: name})
+    tag.set('content', content)
+
+
+def clear_auto_generated_lxml(head):
+    """إزالة العلامات والسكيما التي أنشأها هذا السكربت سابقًا من <head>."""
+    for comment in head.xpath('.//comment()[contains(., "Auto-generated")]'):
+        comment.drop_tree()
+    for script in head.xpath('.//script[@type="application/ld+json"]'):
+        script.drop_tree()
+
 
-        print(f"   ✅ {file_path.name}")
+def update_head_meta_lxml(head, info, url, config):
+    """تحديث العنوان والميتا تاغ (description/OG/Twitter) و canonical داخل <head>."""
+    title = next(head.iter('title'), None)
+    if title is not None:
+        for child in list(title):
+            title.remove(child)
+        title.text = f"{info['title']} - {config['brand_name']} | هدايا فريدة وعروض حصرية"
+    else:
+        _new_child(head, 'title', f"{info['title']} - {config['brand_name']}")
+
+    desc = f"{info['title']} - هدايا فريدة من {config['brand_name']} مع توصيل سريع لكل الإمارات"
+    desc = (desc[:152] + '...') if len(desc) > 155 else desc
+
+    update_meta_tag_lxml(head, 'description', desc)
+    update_meta_tag_lxml(head, 'keywords', f"{info['title']}, {config['brand_name']}, هدايا, تسوق اونلاين, الإمارات")
+    update_meta_tag_lxml(head, 'og:title', f"{info['title']} - {config['brand_name']}", is_property=True)
+    update_meta_tag_lxml(head, 'og:description', desc, is_property=True)
+    update_meta_tag_lxml(head, 'og:image', info['image'], is_property=True)
+    update_meta_tag_lxml(head, 'og:url', url, is_property=True)
+    update_meta_tag_lxml(head, 'og:site_name', config['brand_name'], is_property=True)
+    update_meta_tag_lxml(head, 'twitter:card', 'summary_large_image')
+    update_meta_tag_lxml(head, 'twitter:title', f"{info['title']} - {config['brand_name']}")
+    update_meta_tag_lxml(head, 'twitter:description', desc)
+    update_meta_tag_lxml(head, 'twitter:image', info['image'])
+
+    if not head.xpath(".//link[contains(concat(' ', normalize-space(@rel), ' '), ' canonical ')]"):
+        _new_child(head, 'link', rel='canonical', href=url)
+
+
+def append_json_ld_lxml(head, schemas, compact=False):
+    """إضافة علامة Auto-generated ثم سكربت JSON-LD لكل سكيما في آخر <head>."""
+    marker = etree.Comment(f" {AUTO_GENERATED_MARKER} ")
+    marker.tail = "\n"
+    head.append(marker)
+    for schema in schemas:
+        _new_child(head, 'script', jsonld.dumps(schema, compact), type='application/ld+json')
+
+
+def inject_seo_lxml(head, info, url, config):
+    """نفس inject_seo لكن على عنصر <head> من lxml."""
+    clear_auto_generated_lxml(head)
+    update_head_meta_lxml(head, info, url, config)
+    append_json_ld_lxml(head, [
+        create_product_schema(info, url, config),
+        create_local_business_schema(config),
+    ], json_ld_compact(config))
+
+
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+])
+RAW_TEXT_ELEMENTS = frozenset(['script', 'style'])
+
+
+def serialize_html(el):
+    """تحويل عنصر lxml إلى HTML.
+
+    بديل بسيط لـ lxml.html.tostring، لأن libxml2 يحوّل الأحرف غير اللاتينية
+    في href/src إلى %XX، فتتغير روابط canonical العربية.
+    """
+    parts = []
+
+    def text(value):
+        return html.escape(value, quote=False) if value else ""
+
+    def walk(node, raw):
+        if not isinstance(node.tag, str):
+            if node.tag is etree.Comment:
+                parts.append(f"<!--{node.text or ''}-->")
+            parts.append(text(node.tail))
+            return
+        attrs = "".join(
+            f' {name}="{html.escape(value, quote=True)}"' for name, value in node.attrib.items()
+        )
+        parts.append(f"<{node.tag}{attrs}>")
+        if node.tag not in VOID_ELEMENTS:
+            is_raw = node.tag in RAW_TEXT_ELEMENTS
+            parts.append((node.text or "") if is_raw else text(node.text))
+            for child in node:
+                walk(child, is_raw)
+            parts.append(f"</{node.tag}>")
+        parts.append((node.tail or "") if raw else text(node.tail))
+
+    walk(el, False)
+    return "".join(parts)
+
+
+def parse_head_lxml(html_text):
+    """تحليل منطقة <head> فقط: (البداية، النهاية، عنصر head)، أو None إذا لم يكن ذلك آمنًا.
+
+    غير آمن إذا لم يوجد <head>، أو إذا احتوى على عناصر ينقلها المحلل إلى <body>.
+    """
+    region = find_head_region(html_text)
+    if region is None:
+        return None
+    start, end = region
+
+    head_doc = lxml.html.document_fromstring(f"<html>{html_text[start:end]}</html>")
+    head = head_doc.find('head')
+    body = head_doc.find('body')
+    if head is None or (body is not None and (len(body) or (body.text or '').strip())):
+        return None
+    return start, end, head
+
+
+def splice_head(html_text, start, end, head):
+    """لصق <head> المعدّل مكان القديم، وباقي الصفحة كما هو بايت ببايت."""
+    head.tail = None
+    return html_text[:start] + serialize_html(head) + html_text[end:]
+
+
+class ExtractCache:
+    """ذاكرة مؤقتة دائمة لمعلومات المنتج المستخرجة، مفتاحها sha256 لمحتوى الصفحة.
+
+    تُسجَّل أيضًا بصمة كل صفحة بعد كتابتها مع "done"، فإعادة التشغيل على صفحة لم
+    تتغير منذ آخر تشغيل لا تحلل أي شيء. تُهمل الذاكرة كلها إذا تغيرت الإعدادات أو
+    المحرك (--engine) أو تاريخ priceValidUntil (مرة في اليوم)، وإلا بقيت صفحات
+    "done" على ناتج المحرك السابق وتاريخه. لا يُحفظ إلا ما استُخدم في التشغيل
+    الحالي حتى لا يكبر الملف مع الوقت.
+    """
+
+    def __init__(self, config, engine=None, path=EXTRACT_CACHE_FILE, entries=None):
+        self.path = Path(path) if path else None
+        engine = engine or default_engine()
+        key = json.dumps([EXTRACT_CACHE_VERSION, config, engine, price_valid_until()],
+                         sort_keys=True, ensure_ascii=False)
+        self.fingerprint = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        self.entries = self._load() if entries is None else entries
+        self.used = {}
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        return data.get("entries", {}) if data.get("fingerprint") == self.fingerprint else {}
+
+    def lookup(self, html_text):
+        """(البصمة، المدخل المخزن أو None) لمحتوى الصفحة."""
+        digest = hashlib.sha256(html_text.encode('utf-8')).hexdigest()
+        entry = self.used.get(digest) or self.entries.get(digest)
+        if entry is not None:
+            self.used[digest] = entry
+        return digest, entry
+
+    def add(self, digest, entry):
+        self.used[digest] = entry
+
+    def remember_output(self, html_text, entry):
+        """تسجيل الصفحة بعد كتابتها حتى تُتخطى في التشغيل التالي إذا لم تتغير."""
+        digest = hashlib.sha256(html_text.encode('utf-8')).hexdigest()
+        self.used[digest] = dict(entry, done=True)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": self.fingerprint, "entries": self.used}, f, ensure_ascii=False)
+
+
+def _lookup_page(cache, html_text):
+    return cache.lookup(html_text) if cache is not None else (None, None)
+
+
+def _extract_entry(cache, digest, entry, extract, warnings):
+    """معلومات المنتج من الذاكرة المؤقتة، أو استخراجها وتخزينها. تُعاد التحذيرات في الحالتين."""
+    if entry is None:
+        entry_warnings = []
+        entry = {"info": extract(entry_warnings), "warnings": entry_warnings}
+        if cache is not None:
+            cache.add(digest, entry)
+    for code in entry["warnings"]:
+        _warn(warnings, code)
+    return entry
+
+
+def rewrite_head_lxml(html_text, config, file_path, warnings=None, cache=None, digest=None, entry=None):
+    """معالجة صفحة بمحرك lxml: تعديل <head> فقط ولصقه مكان القديم.
+
+    تعيد None إذا لم يكن من الآمن تعديل الصفحة بهذه الطريقة (لا يوجد <head>،
+    أو يحتوي على عناصر ينقلها المحلل إلى <body>)، ليتم استخدام محرك bs4 بدلًا منه.
+    وإلا تعيد (النص الجديد، مدخل معلومات المنتج).
+    """
+    parsed = parse_head_lxml(html_text)
+    if parsed is None:
+        return None
+    start, end, head = parsed
+
+    # الاستخراج يحتاج الصفحة كاملة (الصورة والسعر في الـ body)، لكن بدون إعادة كتابتها
+    entry = _extract_entry(cache, digest, entry, lambda w: extract_product_info_lxml(
+        lxml.html.document_fromstring(html_text), config, w), warnings)
+    product_url = build_product_url(file_path, config['base_url'])
+    inject_seo_lxml(head, dict(entry["info"]), product_url, config)
+
+    return splice_head(html_text, start, end, head), entry
+
+
+def _replay_done(entry, warnings):
+    """الصفحة ناتج تشغيل سابق بنفس الإعدادات: إعادة تحذيراتها فقط بدون أي تحليل."""
+    if entry is None or not entry.get("done"):
+        return False
+    for code in entry["warnings"]:
+        _warn(warnings, code)
+    return True
+
+
+def render_page_bs4(html_text, config, file_path, warnings=None, cache=None, digest=None, entry=None):
+    """المحرك الأصلي على نص الصفحة: تحليلها كاملة بـ BeautifulSoup وإعادة تنسيقها.
+
+    تعيد (النص الجديد، مدخل معلومات المنتج).
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_text, 'html.parser')
+    entry = _extract_entry(cache, digest, entry, lambda w: extract_product_info(soup, config, w), warnings)
+    product_url = build_product_url(file_path, config['base_url'])
+
+    inject_seo(soup, dict(entry["info"]), product_url, config)
+    return str(soup.prettify(formatter='html5')), entry
+
+
+def rewrite_page(html_text, config, file_path, engine=None, warnings=None):
+    """نتيجة السكربت لصفحة واحدة كنص، بدون قراءة الملف أو كتابته (يستخدمها seo_pipeline)."""
+    engine = engine or default_engine()
+    rewritten = rewrite_head_lxml(html_text, config, file_path, warnings) if engine == "lxml" else None
+    if rewritten is None:
+        if not HAS_BS4:
+            raise ValueError("لا يمكن تعديل <head> بأمان ومكتبة BeautifulSoup غير مثبتة")
+        rewritten = render_page_bs4(html_text, config, file_path, warnings)
+    return rewritten[0]
+
+
+def process_file_bs4(file_path, config, warnings=None, cache=None):
+    """المحرك الأصلي: تحليل الصفحة كاملة بـ BeautifulSoup وإعادة تنسيقها.
+
+    تعيد True إذا تم تخطي الصفحة لأنها لم تتغير منذ آخر تشغيل.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        html_text = f.read()
+    digest, entry = _lookup_page(cache, html_text)
+    if _replay_done(entry, warnings):
         return True
+
+    new_html, entry = render_page_bs4(html_text, config, file_path, warnings, cache, digest, entry)
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(new_html)
+    if cache is not None:
+        cache.remember_output(new_html, entry)
+    return False
+
+
+def process_file_lxml(file_path, config, warnings=None, cache=None):
+    """محرك lxml: إعادة كتابة <head> فقط، مع الرجوع إلى bs4 عند الحاجة.
+
+    تعيد True إذا تم تخطي الصفحة لأنها لم تتغير منذ آخر تشغيل.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        html_text = f.read()
+    digest, entry = _lookup_page(cache, html_text)
+    if _replay_done(entry, warnings):
+        return True
+
+    rewritten = rewrite_head_lxml(html_text, config, file_path, warnings, cache, digest, entry)
+    if rewritten is None:
+        if not HAS_BS4:
+            raise ValueError("لا يمكن تعديل <head> بأمان ومكتبة BeautifulSoup غير مثبتة")
+        return process_file_bs4(file_path, config, warnings, cache)
+
+    new_html, entry = rewritten
+    if new_html != html_text:
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(new_html)
+    if cache is not None:
+        cache.remember_output(new_html, entry)
+    return False
+
+
+def default_engine():
+    return "lxml" if lxml is not None else "bs4"
+
+
+def process_file_result(file_path, config, engine=None, cache=None):
+    """معالجة ملف HTML واحد وإرجاع النتيجة كقاموس (الحالة، التحذيرات، الخطأ، الزمن) بدل الطباعة."""
+    engine = engine or default_engine()
+    warnings = []
+    cached = False
+    start = time.perf_counter()
+    try:
+        if engine == "lxml":
+            cached = process_file_lxml(file_path, config, warnings, cache)
+        else:
+            cached = process_file_bs4(file_path, config, warnings, cache)
+        status, error = "ok", None
     except Exception as e:
-        print(f"   ❌ {file_path.name}: {e}")
-        return False
+        status, error = "failed", str(e)
+    return {
+        "file": file_path.name,
+        "status": status,
+        "cached": cached,
+        "warnings": warnings,
+        "error": error,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
 
 
-def main():
+def print_result(result):
+    """طباعة نتيجة ملف واحد بنفس شكل المخرجات السابقة."""
+    for code in result["warnings"]:
+        print(f"   ⚠️ {WARNING_MESSAGES[code]}")
+    if result["cached"]:
+        print(f"   ✅ {result['file']} (بدون تغيير)")
+    elif result["status"] == "ok":
+        print(f"   ✅ {result['file']}")
+    else:
+        print(f"   ❌ {result['file']}: {result['error']}")
+
+
+def process_file(file_path, config, engine=None, cache=None):
+    """معالجة ملف HTML واحد."""
+    result = process_file_result(file_path, config, engine, cache)
+    print_result(result)
+    return result["status"] == "ok"
+
+
+_WORKER_STATE = {}
+
+
+def _init_worker(config, engine, cache_entries):
+    _WORKER_STATE["config"] = config
+    _WORKER_STATE["engine"] = engine
+    _WORKER_STATE["cache"] = None if cache_entries is None else ExtractCache(config, engine, None, cache_entries)
+
+
+def _process_in_worker(file_path):
+    cache = _WORKER_STATE["cache"]
+    result = process_file_result(file_path, _WORKER_STATE["config"], _WORKER_STATE["engine"], cache)
+    if cache is not None:
+        # مدخلات الذاكرة المؤقتة لهذا الملف تُعاد للعملية الرئيسية التي تحفظ الملف
+        result["cache_entries"], cache.used = cache.used, {}
+    return result
+
+
+def process_files(html_files, config, engine=None, jobs=1, cache=None):
+    """معالجة كل الملفات وإرجاع النتائج واحدة تلو الأخرى بنفس ترتيب html_files.
+
+    مع jobs > 1 تُوزع الملفات على ProcessPoolExecutor (المعالجة تعتمد على المعالج)،
+    ويحافظ pool.map على الترتيب حتى لو انتهت بعض الملفات قبل غيرها.
+    """
+    if jobs <= 1:
+        for fp in html_files:
+            yield process_file_result(fp, config, engine, cache)
+        return
+
+    # عدة دفعات لكل عملية لتوزيع الحمل بشكل متوازن مع تقليل كلفة التواصل بين العمليات
+    chunksize = max(1, len(html_files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(config, engine, cache.entries if cache is not None else None)) as pool:
+        for result in pool.map(_process_in_worker, html_files, chunksize=chunksize):
+            entries = result.pop("cache_entries", None)
+            if entries:
+                cache.used.update(entries)
+            yield result
+
+
+def write_summary(path, results, engine, jobs, elapsed):
+    """كتابة ملخص JSON قابل للقراءة آليًا لنتائج التشغيل وزمن كل ملف."""
+    summary = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "engine": engine,
+        "jobs": jobs,
+        "total": len(results),
+        "ok": sum(1 for r in results if r["status"] == "ok"),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        "cached": sum(1 for r in results if r["cached"]),
+        "with_warnings": sum(1 for r in results if r["warnings"]),
+        "elapsed_seconds": round(elapsed, 3),
+        "files": results,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="حقن السكيما والميتا تاغ في صفحات المنتجات.")
+    parser.add_argument("--engine", choices=["lxml", "bs4"], default=default_engine(),
+                        help="lxml يعيد كتابة <head> فقط (أسرع)، bs4 هو المحرك الأصلي")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="عدد العمليات المتوازية لمعالجة الصفحات (0 = عدد الأنوية)")
+    parser.add_argument("--products-dir", type=Path, default=None,
+                        help="مجلد صفحات المنتجات (الافتراضي: products/ في المجلد الرئيسي)")
+    parser.add_argument("--summary", type=Path, default=None,
+                        help=f"مسار ملخص JSON للنتائج (الافتراضي: {DEFAULT_SUMMARY_FILE})")
+    parser.add_argument("--compact", action="store_true",
+                        help="كتابة JSON-LD بدون إزاحة أو مسافات (أصغر حجمًا للنشر)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="تجاهل الذاكرة المؤقتة للاستخراج (.cache/seo) وتحليل كل الصفحات")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """الدالة الرئيسية لتشغيل السكربت."""
+    args = parse_args(argv)
     print("\n" + "="*70)
     print("🎁 سكربت سكيما وSEO لجميع المنتجات الثابتة في emirates-gifts 🎁")
     print("="*70 + "\n")
 
     script_dir, root_dir = get_script_and_root_dirs()
     config = load_config(script_dir / "seo_config.json")
+    if args.compact:
+        config['json_ld_compact'] = True
 
-    products_dir = root_dir / "products"
+    products_dir = args.products_dir or root_dir / "products"
     if not products_dir.exists():
         print(f"❌ مجلد products غير موجود في: {products_dir.resolve()}")
         sys.exit(1)
@@ -261,21 +838,31 @@ def main():
         print("❌ لا يوجد أي ملفات HTML داخل products/\n")
         sys.exit(1)
 
-    print(f"📦 {len(html_files)} صفحة منتج في products/\n")
-    ok = 0
-    fail = 0
-    for i, fp in enumerate(html_files, 1):
-        print(f"[{i}/{len(html_files)}] معالجة: {fp.name} ...", end=' ')
-        if process_file(fp, config):
-            ok += 1
-        else:
-            fail += 1
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    print(f"📦 {len(html_files)} صفحة منتج في products/ (jobs={jobs})\n")
+    cache = None if args.no_cache else ExtractCache(config, args.engine)
+    results = []
+    start = time.perf_counter()
+    for i, result in enumerate(process_files(html_files, config, args.engine, jobs, cache), 1):
+        print(f"[{i}/{len(html_files)}] معالجة: {result['file']} ...", end=' ')
+        print_result(result)
+        results.append(result)
+    elapsed = time.perf_counter() - start
+    if cache is not None:
+        cache.save()
+
+    summary_path = args.summary or DEFAULT_SUMMARY_FILE
+    summary = write_summary(summary_path, results, args.engine, jobs, elapsed)
 
     print("\n" + "="*70)
-    print(f"✅ نجح: {ok} ملف")
-    print(f"❌ فشل: {fail} ملف")
+    print(f"✅ نجح: {summary['ok']} ملف")
+    print(f"❌ فشل: {summary['failed']} ملف")
+    print(f"♻️ بدون تغيير: {summary['cached']} ملف")
+    print(f"⚠️ مع تحذيرات: {summary['with_warnings']} ملف")
     if html_files:
-        print(f"📈 نسبة النجاح: {(ok/len(html_files)*100):.1f}%")
+        print(f"📈 نسبة النجاح: {(summary['ok']/len(html_files)*100):.1f}%")
+    print(f"⏱️ الزمن: {elapsed:.2f} ثانية ({len(html_files) / elapsed:.1f} صفحة/ثانية)")
+    print(f"🧾 الملخص: {summary_path}")
     print("="*70)
     print("\n✨ انتهى التنفيذ بنجاح! الآن كل صفحة منتج تحتوي عناصر سكيما JSON-LD حقيقية\n")
 
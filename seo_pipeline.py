@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خط SEO موحّد لصفحات المنتجات: قراءة واحدة، تعديل واحد في الذاكرة، وكتابة واحدة لكل صفحة.
+
+يجمع ما كانت تفعله ثلاثة سكربتات يقرأ كل منها كل الصفحات ويعيد كتابتها، ويجب
+تشغيلها بالترتيب الصحيح:
+- seo_emirates_gifts_products.py: العنوان والميتا تاغ، سكيما Product و LocalBusiness
+- fix-product-schema.py: سكيما Product و BreadcrumbList
+- enhance-jsonld-schema.py: aggregateRating والمراجعات
+
+المراحل (--stages): meta, product, breadcrumb, ratings, local-business
+تعمل كلها على <head> واحد محلل بـ lxml، ويبقى باقي الصفحة كما هو بايت ببايت.
+
+للحصول على نتيجة السكربتات القديمة كما هي، يطبق --legacy seo,fix,enhance
+تحويلاتها بالترتيب المعطى على نص الصفحة في الذاكرة، ثم تُكتب الصفحة مرة واحدة.
+
+Usage:
+    python seo_pipeline.py
+    python seo_pipeline.py --stages meta,product,local-business
+    python seo_pipeline.py --legacy seo,fix,enhance
+"""
+
+import sys
+import time
+import argparse
+import importlib.util
+from pathlib import Path
+
+import lxml.html
+
+import seo_emirates_gifts_products as seo
+
+ROOT_DIR = Path(__file__).resolve().parent
+PRODUCTS_DIR = Path("products")
+EN_PRODUCTS_DIR = Path("en/products")
+
+
+def load_script(filename):
+    """استيراد سكربت اسمه يحتوي على '-' (لا يمكن استيراده بـ import العادي)."""
+    name = Path(filename).stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, ROOT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+fix_schema = load_script("fix-product-schema.py")
+enhance_schema = load_script("enhance-jsonld-schema.py")
+
+
+def product_page_url(path, lang, base_url):
+    prefix = "/en" if lang == "en" else ""
+    return f"{base_url}{prefix}/products/{path.name}"
+
+
+class Page:
+    """صفحة منتج واحدة أثناء المعالجة: نصها، وما تضيفه المراحل من سكيما."""
+
+    def __init__(self, path, html_text, lang, config):
+        self.path = path
+        self.html = html_text
+        self.lang = lang
+        self.config = config
+        self.url = product_page_url(path, lang, config['base_url'])
+        self.product = None
+        self.schemas = []
+        self.warnings = []
+        self._info = None
+        self._fields = None
+
+    @property
+    def info(self):
+        """العنوان والصورة والسعر، تُستخرج مرة واحدة عند أول مرحلة تحتاجها."""
+        if self._info is None:
+            doc = lxml.html.document_fromstring(self.html)
+            self._info = seo.extract_product_info_lxml(doc, self.config, self.warnings)
+            # مرحلة meta تكتب العنوان بصيغة "الاسم - العلامة | ..."، فلا يُضاف اسم العلامة مرة أخرى عند إعادة التشغيل
+            suffix = f" - {self.config['brand_name']}"
+            while self._info['title'].endswith(suffix):
+                self._info['title'] = self._info['title'][:-len(suffix)]
+        return self._info
+
+    @property
+    def fields(self):
+        """حقول سكيما Product من الكتالوج (CatalogIndex في fix-product-schema.py)، أو من الصفحة إن لم تكن فيه."""
+        if self._fields is None:
+            self._fields = fix_schema.page_fields(self.html, self.path.stem, lang=self.lang)
+        return self._fields
+
+
+# --- المراحل: كل مرحلة تعدّل <head> أو تضيف سكيما إلى page.schemas ---
+
+def stage_meta(page, head):
+    seo.update_head_meta_lxml(head, page.info, page.url, page.config)
+
+
+def stage_product(page, head):
+    # نفس سكيما fix-product-schema.py، حتى لا يلغي أحدهما ما يكتبه الآخر عند إعادة التشغيل
+    page.product = fix_schema.build_product_schema(page.path.stem, page.fields, page.lang)
+    page.schemas.append(page.product)
+
+
+def stage_breadcrumb(page, head):
+    page.schemas.append(fix_schema.build_breadcrumb_schema(
+        fix_schema.product_page_url(page.path.stem, page.lang),
+        page.fields["product_name"], page.fields["category"]))
+
+
+def stage_ratings(page, head):
+    enhanced = enhance_schema.create_enhanced_schema(page.product, page.path.stem, page.fields['product_name'])
+    page.schemas[page.schemas.index(page.product)] = page.product = enhanced
+
+
+def stage_local_business(page, head):
+    page.schemas.append(seo.create_local_business_schema(page.config))
+
+
+# الترتيب هنا هو ترتيب التنفيذ، مهما كان ترتيبها في --stages
+STAGES = {
+    "meta": stage_meta,
+    "product": stage_product,
+    "breadcrumb": stage_breadcrumb,
+    "ratings": stage_ratings,
+    "local-business": stage_local_business,
+}
+
+
+def _drop(el):
+    # حذف المسافات بعد العنصر أيضًا حتى لا تتراكم أسطر فارغة مع كل تشغيل
+    if not (el.tail or '').strip():
+        el.tail = None
+    el.drop_tree()
+
+
+def clear_auto_generated(head):
+    """إزالة كل ما أضافته السكربتات الثلاث سابقًا من <head> (التعليقات وسكيما JSON-LD)."""
+    for script in head.xpath('.//script[@type="application/ld+json"]'):
+        _drop(script)
+    for comment in head.xpath('.//comment()'):
+        text = (comment.text or '').strip()
+        if "Auto-generated" in text or "(Auto" in text or text == "/Schema":
+            _drop(comment)
+
+
+def run_stages(page, stage_names):
+    """تطبيق المراحل على <head> وإرجاع النص الجديد، أو None إذا لم يكن تعديل <head> آمنًا."""
+    parsed = seo.parse_head_lxml(page.html)
+    if parsed is None:
+        return None
+    start, end, head = parsed
+
+    clear_auto_generated(head)
+    for name in stage_names:
+        STAGES[name](page, head)
+    if page.schemas:
+        seo.append_json_ld_lxml(head, page.schemas, seo.json_ld_compact(page.config))
+    return seo.splice_head(page.html, start, end, head)
+
+
+# --- وضع التوافق: تحويلات السكربتات القديمة كما هي، على النص في الذاكرة ---
+
+def legacy_seo(page, engine):
+    return seo.rewrite_page(page.html, page.config, page.path, engine, page.warnings)
+
+
+def legacy_fix(page, engine):
+    return fix_schema.fix_product_schema(page.html, page.path)[0]
+
+
+def legacy_enhance(page, engine):
+    new_html, _ = enhance_schema.enhance_html(page.html, page.path.stem)
+    return page.html if new_html is None else new_html
+
+
+# السكربت -> (التحويل، اللغات التي كان يعالجها)
+LEGACY_STEPS = {
+    "seo": (legacy_seo, ("ar",)),
+    "fix": (legacy_fix, ("ar",)),
+    "enhance": (legacy_enhance, ("ar", "en")),
+}
+
+
+def run_legacy(page, steps, engine):
+    for name in steps:
+        transform, langs = LEGACY_STEPS[name]
+        if page.lang in langs:
+            page.html = transform(page, engine)
+    return page.html
+
+
+def process_page(path, lang, config, args):
+    """معالجة صفحة واحدة وإرجاع النتيجة كقاموس (مثل process_file_result)."""
+    start = time.perf_counter()
+    page = None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            original = f.read()
+        page = Page(path, original, lang, config)
+        fallback = None
+        if args.legacy:
+            new_html = run_legacy(page, args.legacy, args.engine)
+        else:
+            new_html = run_stages(page, args.stages)
+            if new_html is None:
+                # <head> غير سليم: معالجة الصفحة كاملة بمحرك bs4 كما يفعل seo_emirates_gifts_products.py
+                # (العنوان والميتا و Product و LocalBusiness فقط)
+                fallback = "bs4"
+                new_html = run_legacy(page, ["seo"], "bs4")
+        changed = new_html != original
+        if changed:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(new_html)
+        status, error = "ok", None
+    except Exception as e:
+        changed, fallback, status, error = False, None, "failed", str(e)
+    return {
+        "file": str(path),
+        "status": status,
+        "changed": changed,
+        "fallback": fallback,
+        "warnings": page.warnings if page else [],
+        "error": error,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def _name_list(choices):
+    def parse(value):
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in choices]
+        if unknown:
+            raise argparse.ArgumentTypeError(
+                f"قيمة غير معروفة: {', '.join(unknown)} (المتاح: {', '.join(choices)})")
+        return names
+    return parse
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="خط SEO موحّد لصفحات المنتجات (قراءة وكتابة واحدة لكل صفحة).")
+    parser.add_argument("--stages", type=_name_list(list(STAGES)), default=list(STAGES),
+                        help=f"المراحل المفعّلة مفصولة بفواصل (الافتراضي: {','.join(STAGES)})")
+    parser.add_argument("--legacy", type=_name_list(list(LEGACY_STEPS)), default=None,
+                        help="تطبيق تحويلات السكربتات القديمة كما هي وبالترتيب المعطى، مثل seo,fix,enhance")
+    parser.add_argument("--engine", choices=["lxml", "bs4"], default=seo.default_engine(),
+                        help="محرك خطوة seo في وضع --legacy")
+    parser.add_argument("--compact", action="store_true",
+                        help="كتابة JSON-LD بدون إزاحة أو مسافات (أصغر حجمًا للنشر)")
+    parser.add_argument("--products-dir", type=Path, default=PRODUCTS_DIR)
+    parser.add_argument("--en-products-dir", type=Path, default=EN_PRODUCTS_DIR)
+    parser.add_argument("--config", type=Path, default=ROOT_DIR / "seo_config.json")
+    args = parser.parse_args(argv)
+    # ترتيب التنفيذ ثابت: ratings تحتاج سكيما Product من مرحلة product
+    args.stages = [name for name in STAGES if name in args.stages]
+    if not args.legacy and "ratings" in args.stages and "product" not in args.stages:
+        parser.error("المرحلة ratings تحتاج المرحلة product")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = seo.load_config(args.config)
+    if args.compact:
+        config['json_ld_compact'] = True
+
+    pages = [(fp, "ar") for fp in sorted(args.products_dir.glob("*.html"))]
+    if args.en_products_dir.exists():
+        pages += [(fp, "en") for fp in sorted(args.en_products_dir.glob("*.html"))]
+    if not pages:
+        print(f"❌ لا يوجد أي ملفات HTML داخل {args.products_dir}")
+        return 1
+
+    mode = f"legacy: {','.join(args.legacy)}" if args.legacy else f"stages: {','.join(args.stages)}"
+    print(f"📦 {len(pages)} صفحة منتج ({mode})\n")
+
+    counts = {"ok": 0, "failed": 0, "changed": 0}
+    start = time.perf_counter()
+    for i, (path, lang) in enumerate(pages, 1):
+        result = process_page(path, lang, config, args)
+        counts[result["status"]] += 1
+        counts["changed"] += result["changed"]
+        for code in result["warnings"]:
+            print(f"   ⚠️ {path.name}: {seo.WARNING_MESSAGES[code]}")
+        if result["fallback"]:
+            print(f"   ↩️ {path.name}: <head> غير سليم، تمت المعالجة بمحرك {result['fallback']}")
+        if result["status"] != "ok":
+            print(f"[{i}/{len(pages)}] ❌ {result['file']}: {result['error']}")
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "="*70)
+    print(f"✅ نجح: {counts['ok']} ملف ({counts['changed']} تم تعديله)")
+    print(f"❌ فشل: {counts['failed']} ملف")
+    print(f"⏱️ الزمن: {elapsed:.2f} ثانية ({len(pages) / elapsed:.1f} صفحة/ثانية)")
+    print("="*70)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
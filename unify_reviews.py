@@ -1,76 +1,250 @@
+import os
 import json
+import argparse
 from datetime import datetime
 
-def unify_and_clean_reviews(input_path, output_path):
+from json_stream import iter_json_array, READ_CHUNK_SIZE
+from review_dedup import ReviewDeduplicator, DEFAULT_SIMILARITY
+from rating_aggregates import RatingAggregates, AGGREGATES_FILE
+
+CATEGORIES = ("watches", "perfumes", "jewelry", "accessories", "general")
+DEFAULT_INPUT = 'data/reviews.json'
+DEFAULT_OUTPUT = 'data/unified-reviews.json'
+DEFAULT_NDJSON_DIR = 'data/unified-reviews'
+DEFAULT_DEDUP_REPORT = 'data/duplicate-reviews.json'
+
+
+def clean_review(review, category, product=None):
+    """Returns one review in the unified format."""
+    product = product or {}
+    # 1. Clean location: Replace null with a default value
+    location = review.get("location") if review.get("location") is not None else "غير محدد"
+
+    # 2. Standardize date format
+    try:
+        date_obj = datetime.fromisoformat(review.get("date"))
+        standard_date = date_obj.strftime('%Y-%m-%d')
+    except (ValueError, TypeError):
+        standard_date = "0000-00-00" # Default for invalid format
+
+    return {
+        "id": review.get("id"),
+        "productId": product.get("productId"),
+        "productSlug": product.get("productSlug"),
+        "productTitle": product.get("productTitle"),
+        "productType": category.rstrip('s'), # 'perfumes' -> 'perfume'
+        "customerName": review.get("author"),
+        "rating": review.get("rating"),
+        "comment": review.get("comment"),
+        "date": standard_date,
+        "verified": review.get("verified"),
+        "helpful": review.get("helpful"),
+        "location": location
+    }
+
+
+def iter_unified_reviews(products, dedup=None):
+    """
+    Yields (category, review) for every cleaned review, product by product.
+
+    - Skips categories not present in the target structure.
+    - Removes duplicate comments for the same product, or, with a
+      ReviewDeduplicator, exact and near duplicates across all products.
+    """
+    for product in products:
+        category = product.get("category")
+        if category not in CATEGORIES:
+            continue
+
+        seen_comments = set()
+        for review in product.get("reviews", []):
+            if dedup is None:
+                comment = review.get("comment")
+                # Skip review if the comment is a duplicate for this product
+                if comment in seen_comments:
+                    continue
+                seen_comments.add(comment)
+            record = clean_review(review, category, product)
+            if dedup is not None and dedup.check(record) is not None:
+                continue
+            yield category, record
+
+
+def write_dedup_report(dedup, path):
+    """Writes the dropped duplicate clusters and prints a short summary."""
+    clusters = dedup.report()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "similarity": dedup.similarity,
+            "kept": dedup.kept_count,
+            "dropped": dedup.dropped_count,
+            "clusters": clusters,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Dropped {dedup.dropped_count} duplicate reviews in {len(clusters)} clusters, report: {path}")
+
+
+def category_path(output_dir, category):
+    return os.path.join(output_dir, f"{category}.ndjson")
+
+
+class NdjsonCategoryWriter:
+    """
+    Writes one <category>.ndjson file per category, one review per line.
+
+    Lines go to temporary files that replace the previous output only when
+    the whole input was processed, so a failed run keeps the old files.
+    With append=True, lines are added to the end of the existing files.
+    """
+
+    def __init__(self, output_dir, append=False):
+        self.output_dir = output_dir
+        self.append = append
+        self.files = {}
+        self.counts = dict.fromkeys(CATEGORIES, 0)
+
+    def __enter__(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        for category in CATEGORIES:
+            if self.append:
+                self.files[category] = open(self._path(category), 'a', encoding='utf-8')
+            else:
+                self.files[category] = open(self._path(category) + '.tmp', 'w', encoding='utf-8')
+        return self
+
+    def _path(self, category):
+        return category_path(self.output_dir, category)
+
+    def write(self, category, review):
+        self.files[category].write(json.dumps(review, ensure_ascii=False) + '\n')
+        self.counts[category] += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        for category, f in self.files.items():
+            f.close()
+            if self.append:
+                continue
+            if exc_type is None:
+                os.replace(self._path(category) + '.tmp', self._path(category))
+            else:
+                os.remove(self._path(category) + '.tmp')
+        return False
+
+
+def unify_and_clean_reviews(input_path, output_path, dedup=None):
     """
     Reads reviews from a nested JSON structure, cleans the data,
     and restructures it by product category.
 
     - Replaces null locations with 'غير محدد'.
     - Standardizes date format to 'YYYY-MM-DD'.
-    - Removes duplicate comments for the same product.
+    - Removes duplicate comments for the same product (or near duplicates
+      across products when a ReviewDeduplicator is given).
     - Groups all reviews into categories in a new unified file.
     """
+    unified_reviews = {category: [] for category in CATEGORIES}
     try:
         with open(input_path, 'r', encoding='utf-8') as f:
-            products_data = json.load(f)
+            for category, review in iter_unified_reviews(iter_json_array(f), dedup):
+                unified_reviews[category].append(review)
     except (FileNotFoundError, json.JSONDecodeError) as e:
         print(f"Error reading or parsing {input_path}: {e}")
         return
 
-    unified_reviews = {
-        "watches": [],
-        "perfumes": [],
-        "jewelry": [],
-        "accessories": [],
-        "general": []
-    }
-
-    for product in products_data:
-        category = product.get("category")
-        if category not in unified_reviews:
-            # Skip categories not present in the target structure
-            continue
-
-        seen_comments = set()
-        for review in product.get("reviews", []):
-            comment = review.get("comment")
-            # Skip review if the comment is a duplicate for this product
-            if comment in seen_comments:
-                continue
-            seen_comments.add(comment)
-
-            # 1. Clean location: Replace null with a default value
-            location = review.get("location") if review.get("location") is not None else "غير محدد"
-
-            # 2. Standardize date format
-            try:
-                date_obj = datetime.fromisoformat(review.get("date"))
-                standard_date = date_obj.strftime('%Y-%m-%d')
-            except (ValueError, TypeError):
-                standard_date = "0000-00-00" # Default for invalid format
-
-            unified_reviews[category].append({
-                "id": review.get("id"),
-                "productType": category.rstrip('s'), # 'perfumes' -> 'perfume'
-                "customerName": review.get("author"),
-                "rating": review.get("rating"),
-                "comment": comment,
-                "date": standard_date,
-                "verified": review.get("verified"),
-                "helpful": review.get("helpful"),
-                "location": location
-            })
-
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(unified_reviews, f, ensure_ascii=False, indent=2)
 
     print(f"Successfully created unified and cleaned reviews at: {output_path}")
+    return unified_reviews
+
+
+def stream_unified_reviews(input_path, output_dir, chunk_size=READ_CHUNK_SIZE, dedup=None, append=False):
+    """
+    Same cleaning as unify_and_clean_reviews(), streamed: products are parsed
+    one at a time and each review is appended to <output_dir>/<category>.ndjson
+    as soon as it is read, so memory use does not grow with the review count.
+
+    With append=True the input holds only new reviews, which are added to the
+    existing category files instead of replacing them.
+    """
+    try:
+        with open(input_path, 'r', encoding='utf-8') as f, NdjsonCategoryWriter(output_dir, append) as writer:
+            for category, review in iter_unified_reviews(iter_json_array(f, chunk_size), dedup):
+                writer.write(category, review)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Error reading or parsing {input_path}: {e}")
+        return None
+
+    summary = ", ".join(f"{category}: {count}" for category, count in writer.counts.items())
+    action = "appended new reviews to" if append else "streamed unified reviews to"
+    print(f"Successfully {action}: {output_dir} ({summary})")
+    return writer.counts
+
+
+def update_aggregates(aggregates, output_dir=None, unified_reviews=None, rebuild=False):
+    """
+    Updates the per-product rating aggregates after a run.
+
+    After an --append run only the reviews appended to the NDJSON category
+    files since the last update are read. A full run (unified JSON output, or
+    NDJSON files rewritten with rebuild=True) is counted again from scratch.
+    """
+    if unified_reviews is not None:
+        aggregates.reset()
+        for reviews in unified_reviews.values():
+            for review in reviews:
+                aggregates.add(review)
+        mode = 'rebuilt'
+    elif rebuild:
+        aggregates.reset()
+        aggregates.refresh([category_path(output_dir, category) for category in CATEGORIES])
+        mode = 'rebuilt'
+    else:
+        mode = aggregates.refresh([category_path(output_dir, category) for category in CATEGORIES])
+    print(f"Rating aggregates {mode}: {len(aggregates.products)} products")
+    return mode
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Clean product reviews and group them by category.")
+    parser.add_argument("input", nargs="?", default=DEFAULT_INPUT,
+                        help=f"reviews JSON array (default: {DEFAULT_INPUT})")
+    parser.add_argument("output", nargs="?", default=None,
+                        help=f"output file, or directory with --ndjson "
+                             f"(default: {DEFAULT_OUTPUT} / {DEFAULT_NDJSON_DIR})")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="stream the reviews into one <category>.ndjson file per category")
+    parser.add_argument("--append", action="store_true",
+                        help="with --ndjson: the input holds only new reviews, add them to the existing files")
+    parser.add_argument("--aggregates", default=AGGREGATES_FILE,
+                        help=f"per-product rating aggregates index (default: {AGGREGATES_FILE})")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="only drop identical comments within the same product")
+    parser.add_argument("--similarity", type=float, default=DEFAULT_SIMILARITY,
+                        help=f"near-duplicate threshold, estimated Jaccard similarity (default: {DEFAULT_SIMILARITY})")
+    parser.add_argument("--dedup-report", default=DEFAULT_DEDUP_REPORT,
+                        help=f"where to write the dropped duplicate clusters (default: {DEFAULT_DEDUP_REPORT})")
+    args = parser.parse_args(argv)
+    if args.append and not args.ndjson:
+        parser.error("--append needs --ndjson")
+    return args
+
 
 if __name__ == '__main__':
-    # Define file paths
-    input_file = '/workspaces/emirates-gifts/data/reviews.json'
-    output_file = '/workspaces/emirates-gifts/data/unified-reviews.json'
-    
-    # Run the cleaning and unification process
-    unify_and_clean_reviews(input_file, output_file)
\ No newline at end of file
+    args = parse_args()
+    # Near duplicates are found against the reviews of the same run, so an
+    # appended batch is only checked for identical comments per product
+    dedup = None if args.no_dedup or args.append else ReviewDeduplicator(args.similarity)
+    aggregates = RatingAggregates.load(args.aggregates)
+    if args.ndjson:
+        output_dir = args.output or DEFAULT_NDJSON_DIR
+        result = stream_unified_reviews(args.input, output_dir, dedup=dedup, append=args.append)
+        if result is not None:
+            update_aggregates(aggregates, output_dir=output_dir, rebuild=not args.append)
+    else:
+        result = unify_and_clean_reviews(args.input, args.output or DEFAULT_OUTPUT, dedup)
+        if result is not None:
+            update_aggregates(aggregates, unified_reviews=result)
+    if result is not None:
+        aggregates.save(args.aggregates)
+    if dedup is not None and result is not None:
+        write_dedup_report(dedup, args.dedup_report)